@@ -60,6 +60,10 @@ def parse_arguments():
         '--plugin', action='append',
         type=lambda arg: arg_is_dir(arg, 'Plugins'),
         help='load plugin modules from directory path')
+    parser.add_argument(
+        '--warm-up', action='store_const', const=True,
+        help=f'open all consoles concurrently before running the tests. With "{CHECK_COMMAND}", '
+        'validate the connection to the target')
     parser.add_argument(
         '-f', '--force', action='store_const', const=True,
         help='force operation instead of prompting')
@@ -105,6 +109,8 @@ def main():
             env_vars = dict(os.environ)
             pluma_context, tests_config = Pluma.create_context_from_files(
                 tests_config_path, target_config_path, env_vars)
+            if args.warm_up:
+                pluma_context.warm_up = True
 
             if command == RUN_COMMAND:
                 success = Pluma.run(pluma_context, tests_config)
@@ -36,6 +36,9 @@ class Pluma:
         results_config = Pluma.create_results_config(tests_config)
 
         controller = Pluma.build_test_controller(tests_config, context, show_tests_list=check_only)
+        if context.warm_up:
+            Pluma.warm_up_consoles(context)
+
         if check_only:
             log.log('Configuration and tests successfully validated.',
                     level=LogLevel.IMPORTANT)
@@ -49,10 +52,21 @@ class Pluma:
             log.log('One of more test failed.',
                     level=LogLevel.IMPORTANT, color='red', bold=True)
 
-        Pluma.save_results(controller, results_config)
+        Pluma.save_results(controller, results_config,
+                           console_open_times=context.board.console_open_times)
 
         return success
 
+    @staticmethod
+    def warm_up_consoles(context: PlumaContext) -> Dict[str, float]:
+        '''Open all the consoles of the board concurrently, before the tests
+        need them, and return the time taken by each console'''
+        open_times = context.board.warm_up_consoles()
+        for name, open_time in open_times.items():
+            log.log(f'Console "{name}" ready in {open_time:.2f}s')
+
+        return open_times
+
     @staticmethod
     def print_tests(tests_config: TestsConfig):
         '''Print the tests used and available.'''
@@ -170,7 +184,8 @@ class Pluma:
         return get_distribution(top_level_package).version
 
     @staticmethod
-    def save_results(controller: TestController, results_config: ResultsConfig):
+    def save_results(controller: TestController, results_config: ResultsConfig,
+                     console_open_times: Optional[Dict[str, float]] = None):
         settings_summary = controller.collect_test_settings()
         data_summary = controller.get_test_data_summary()
         results = {
@@ -178,6 +193,8 @@ class Pluma:
             'settings': settings_summary,
             'results': controller.results
         }
+        if console_open_times:
+            results['console_open_times'] = console_open_times
 
         with open(results_config.path, 'w') as f:
             json.dump(results, f, indent=4)
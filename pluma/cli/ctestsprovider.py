@@ -36,6 +36,9 @@ class CTestsProvider(TestsProvider):
             raise TestsConfigError(
                 'Missing "yocto_sdk" or "source_environment" attributes for C tests')
 
+        cache_directory = config.pop_optional(str, 'executable_cache')
+        cache_max_entries = config.pop_optional(int, 'executable_cache_size')
+
         all_tests = []
         tests_config = config.pop_optional(
             Configuration, 'tests', default=Configuration()).content()
@@ -48,6 +51,10 @@ class CTestsProvider(TestsProvider):
                     flags=test_parameters.pop_optional(list, 'flags', context='c_tests'))
 
                 test_parameters['executable_file'] = test_executable
+                if cache_directory:
+                    test_parameters['cache_directory'] = cache_directory
+                if cache_max_entries:
+                    test_parameters['cache_max_entries'] = cache_max_entries
 
                 test = TestDefinition(test_name, testclass=ExecutableTest, test_provider=self,
                                       parameter_sets=[test_parameters], selected=True)
@@ -5,7 +5,7 @@ import time
 from typing import List, Union
 
 from pluma.core.baseclasses import Logger, LogLevel
-from pluma import Board
+from pluma import Board, SSHConsole
 from pluma.test import TaskFailed
 from pluma.cli import DeviceActionBase, DeviceActionRegistry
 
@@ -99,6 +99,13 @@ class SetAction(DeviceActionBase):
 
             self.board.console = console
 
+            if isinstance(console, SSHConsole):
+                # The target may still be booting, e.g. after a power cycle,
+                # even if the session opened before it is not closed yet
+                ready_time = console.wait_until_ready()
+                if ready_time is not None:
+                    self.save_data({'ssh_ready_s': round(ready_time, 3)})
+
 
 @DeviceActionRegistry.register('deploy')
 class DeployAction(DeviceActionBase):
@@ -112,14 +119,18 @@ class DeployAction(DeviceActionBase):
         self.timeout = timeout
 
     def execute(self):
-        if not self.board.console.support_file_copy:
+        console = self.board.console
+        if not console or not console.support_file_copy:
             raise TaskFailed('Cannot deploy files, current console does not support file copy. '
                              'Use or set a different console to be able to deploy files (e.g. SSH)')
 
-        for f in self.files:
-            log.log(f'Copying {f} to target device destination {self.destination}')
-            self.board.console.copy_to_target(source=f, destination=self.destination,
-                                              timeout=self.timeout)
+        log.log(f'Deploying {len(self.files)} files to target device destination '
+                f'{self.destination}')
+        result = console.deploy_files(files=self.files, destination=self.destination,
+                                      timeout=self.timeout)
+        if result.skipped:
+            log.debug(f'{len(result.skipped)} files already up to date on the target: '
+                      f'{result.skipped}')
 
 
 class ManualDeviceActionBase(DeviceActionBase):
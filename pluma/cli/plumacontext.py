@@ -8,3 +8,5 @@ class PlumaContext:
     '''Data class for Pluma context'''
     board: Board
     variables: dict
+    # Open all consoles concurrently before running the tests
+    warm_up: bool = False
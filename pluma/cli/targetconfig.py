@@ -3,11 +3,12 @@ import os
 from typing import Dict, Optional
 from copy import deepcopy
 
-from pluma import Board, SerialConsole, SSHConsole, SoftPower, IPPowerPDU
+from pluma import (Board, ConsoleWatcher, FileTransferSettings, SerialConsole, SSHConsole,
+                   SSHSessionPool, SoftPower, IPPowerPDU)
 from pluma.cli import Configuration, ConfigurationError, TargetConfigError, \
     PlumaContext
 from pluma.core.power import Uhubctl
-from pluma.core.baseclasses import Logger, ConsoleBase, PowerBase
+from pluma.core.baseclasses import Logger, ConsoleBase, PowerBase, RawLogSettings
 from pluma.core.dataclasses import SystemContext, Credentials
 
 log = Logger()
@@ -45,11 +46,19 @@ class TargetConfig:
         power = TargetFactory.create_power_control(
             config.pop_optional(Configuration, 'power'), ssh or serial)
 
+        watcher = TargetFactory.create_watcher(
+            config.pop_optional(Configuration, 'watcher'), consoles)
+
+        session_pool = TargetFactory.create_session_pool(
+            config.pop_optional(Configuration, 'session_pool'), consoles)
+
+        warm_up = config.pop_optional(bool, 'warm_up', default=False)
+
         config.ensure_consumed()
 
         board = Board('Test board', console=consoles, power=power,
-                      system=system)
-        return PlumaContext(board, variables=variables)
+                      system=system, watcher=watcher, session_pool=session_pool)
+        return PlumaContext(board, variables=variables, warm_up=warm_up)
 
     @staticmethod
     def print_context_settings(context: PlumaContext):
@@ -67,6 +76,7 @@ class TargetConfig:
         TargetConfig.print_component('Login', context.board.system.credentials.login)
         TargetConfig.print_component(
             'Password', '******' if context.board.system.credentials.password else None)
+        TargetConfig.print_component('SSH sessions', context.board.session_pool)
         TargetConfig.print_component('Power control', context.board.power)
         TargetConfig.print_component('Storage', context.board.storage)
         TargetConfig.print_component('USB Hub', context.board.hub)
@@ -109,10 +119,46 @@ class TargetFactory:
         credentials = TargetFactory.parse_credentials(
             system_config.pop_optional(Configuration, 'credentials'))
         prompt_regex = system_config.pop_optional(str, 'prompt_regex', context='system')
-        system = SystemContext(prompt_regex=prompt_regex, credentials=credentials)
+        condition_shell = system_config.pop_optional(bool, 'condition_shell', default=True,
+                                                     context='system')
+        system = SystemContext(prompt_regex=prompt_regex, credentials=credentials,
+                               condition_shell=condition_shell)
         system_config.ensure_consumed()
         return system
 
+    @staticmethod
+    def parse_raw_log_settings(console_config: Configuration, context: str) -> RawLogSettings:
+        try:
+            return RawLogSettings(
+                compression=console_config.pop_optional(str, 'log_compression',
+                                                        context=context),
+                max_size=console_config.pop_optional(int, 'log_max_size', context=context),
+                rotate_each_iteration=console_config.pop_optional(
+                    bool, 'log_rotate_each_iteration', default=False, context=context),
+                backup_count=console_config.pop_optional(int, 'log_backup_count',
+                                                         context=context),
+                timestamp_index=console_config.pop_optional(
+                    bool, 'log_timestamp_index', default=True, context=context))
+        except ValueError as e:
+            raise TargetConfigError(f'Invalid {context} log settings: {e}')
+
+    @staticmethod
+    def parse_file_transfer_settings(console_config: Configuration,
+                                     context: str) -> FileTransferSettings:
+        defaults = FileTransferSettings()
+        try:
+            return FileTransferSettings(
+                chunk_size=console_config.pop_optional(
+                    int, 'file_transfer_chunk_size', default=defaults.chunk_size,
+                    context=context),
+                window=console_config.pop_optional(
+                    int, 'file_transfer_window', default=defaults.window, context=context),
+                encoding=console_config.pop_optional(
+                    str, 'file_transfer_encoding', default=defaults.encoding,
+                    context=context))
+        except ValueError as e:
+            raise TargetConfigError(f'Invalid {context} file transfer settings: {e}')
+
     @staticmethod
     def create_consoles(config: Optional[Configuration],
                         system: SystemContext) -> Dict[str, ConsoleBase]:
@@ -158,8 +204,24 @@ class TargetFactory:
         baudrate = serial_config.pop_optional(int,
                                               'baudrate', default=115200, context='serial console')
         logfile = serial_config.pop_optional(str, 'log_file', context='serial console')
+        background_reader = serial_config.pop_optional(bool, 'background_reader',
+                                                       default=False, context='serial console')
+        raw_log_settings = TargetFactory.parse_raw_log_settings(serial_config,
+                                                                context='serial console')
+        file_transfer_settings = TargetFactory.parse_file_transfer_settings(
+            serial_config, context='serial console')
+        runs_in_shell = serial_config.pop_optional(bool, 'runs_in_shell', default=True,
+                                                   context='serial console')
+        send_rate = serial_config.pop_optional(int, 'send_rate', context='serial console')
+        send_rate_tuning = serial_config.pop_optional(bool, 'send_rate_tuning', default=False,
+                                                      context='serial console')
         serial = SerialConsole(port=port, system=system,
-                               baud=baudrate, raw_logfile=logfile)
+                               baud=baudrate, raw_logfile=logfile,
+                               background_reader=background_reader,
+                               raw_log_settings=raw_log_settings,
+                               file_transfer_settings=file_transfer_settings,
+                               runs_in_shell=runs_in_shell, send_rate=send_rate,
+                               send_rate_tuning=send_rate_tuning)
         serial_config.ensure_consumed()
         return serial
 
@@ -176,6 +238,14 @@ class TargetFactory:
         password = ssh_config.pop_optional(str, 'password', system.credentials.password,
                                            context='ssh')
         log_file = ssh_config.pop_optional(str, 'log_file', context='ssh')
+        background_reader = ssh_config.pop_optional(bool, 'background_reader',
+                                                    default=False, context='ssh')
+        raw_log_settings = TargetFactory.parse_raw_log_settings(ssh_config, context='ssh')
+        multiplexing = ssh_config.pop_optional(bool, 'multiplexing', default=True,
+                                               context='ssh')
+        ready_timeout = ssh_config.pop_optional(int, 'ready_timeout', default=60,
+                                                context='ssh')
+        port = ssh_config.pop_optional(int, 'port', context='ssh')
         ssh_config.ensure_consumed()
 
         # Create a new system config to override default credentials
@@ -183,7 +253,53 @@ class TargetFactory:
         ssh_system.credentials.login = login
         ssh_system.credentials.password = password
 
-        return SSHConsole(target, system=ssh_system, raw_logfile=log_file)
+        return SSHConsole(target, system=ssh_system, raw_logfile=log_file,
+                          background_reader=background_reader,
+                          raw_log_settings=raw_log_settings, multiplexing=multiplexing,
+                          ready_timeout=ready_timeout, port=port)
+
+    @staticmethod
+    def create_watcher(watcher_config: Optional[Configuration],
+                       consoles: Dict[str, ConsoleBase]) -> Optional[ConsoleWatcher]:
+        if not watcher_config:
+            return None
+
+        if not consoles:
+            raise TargetConfigError('No console available for the console watcher')
+
+        patterns = watcher_config.pop_optional(list, 'patterns', context='watcher')
+        snapshot_size = watcher_config.pop_optional(int, 'snapshot_size',
+                                                    default=16 * 1024, context='watcher')
+        abort = watcher_config.pop_optional(bool, 'abort', default=False, context='watcher')
+        watcher_config.ensure_consumed()
+
+        try:
+            return ConsoleWatcher(consoles, patterns=patterns, snapshot_size=snapshot_size,
+                                  abort=abort)
+        except ValueError as e:
+            raise TargetConfigError(f'Invalid watcher configuration: {e}')
+
+    @staticmethod
+    def create_session_pool(session_pool_config: Optional[Configuration],
+                            consoles: Dict[str, ConsoleBase]) -> Optional[SSHSessionPool]:
+        if not session_pool_config:
+            return None
+
+        console_name = session_pool_config.pop_optional(str, 'console', default='ssh',
+                                                        context='session_pool')
+        size = session_pool_config.pop_optional(int, 'size', default=4,
+                                                context='session_pool')
+        session_pool_config.ensure_consumed()
+
+        console = consoles.get(console_name)
+        if not isinstance(console, SSHConsole):
+            raise TargetConfigError(f'The SSH session pool requires an SSH console, but '
+                                    f'console "{console_name}" is {console}')
+
+        try:
+            return SSHSessionPool(console, size=size)
+        except ValueError as e:
+            raise TargetConfigError(f'Invalid session pool configuration: {e}')
 
     @staticmethod
     def create_power_control(power_config: Optional[Configuration],
@@ -8,10 +8,15 @@ from .powerrelay import PowerRelay
 from .powermulti import PowerMulti
 from .softpower import SoftPower
 from .pdu import APCPDU, IPPowerPDU, EnergeniePDU
+from .shellfiletransfer import (FileTransferSettings, FileTransferStats,
+                                ShellFileTransfer)
 from .serialconsole import SerialConsole
 from .hostconsole import HostConsole
 from .telnetconsole import TelnetConsole
+from .sshcontrolmaster import SSHControlMaster
 from .sshconsole import SSHConsole
+from .sshsessionpool import SSHSessionPool
+from .consolewatcher import ConsoleWatcher, WatcherHit
 from .hub import Hub
 from .sdwire import SDWire
 from .multimeter import MultimeterTTI1604
@@ -1,7 +1,15 @@
 from .hardwarebase import HardwareBase
 from .consoleexceptions import *
-from .consoleengine import ConsoleEngine, ConsoleType, MatchResult
+from .receptionbuffer import ReceptionBuffer
+from .patternmatcher import PatternMatcher, PatternMatch
+from .jsonframer import JsonFramer
+from .rawlogindex import RawLogIndex, RawLogIndexEntry
+from .filedeployment import DeploymentResult, ManifestEntry
+from .rawlogwriter import LogWriterThread, RawLogSettings, RawLogWriter
+from .consoleengine import (ConsoleEngine, ConsoleSubscription, ConsoleType, MatchResult,
+                            ReadStatistics)
 from .pexpectengine import PexpectEngine
+from .asyncioengine import AsyncioEngine, EventLoopThread
 from .consolebase import ConsoleBase
 from .powerbase import PowerBase
 from .relaybase import RelayBase
@@ -0,0 +1,391 @@
+import asyncio
+import fcntl
+import os
+import pty
+import select
+import shlex
+import subprocess
+import sys
+import termios
+import threading
+import time
+import tty
+
+from typing import Callable, List, Optional, TypeVar, Union
+
+from .consoleengine import ConsoleEngine, MatchResult
+from .patternmatcher import PatternMatcher
+from .rawlogwriter import RawLogSettings, RawLogWriter
+
+T = TypeVar('T')
+
+
+class EventLoopThread:
+    '''Asyncio event loop running forever in a background daemon thread.
+
+    "EventLoopThread.shared()" returns the instance used by default by all
+    AsyncioEngine instances, so that a single thread serves all consoles.
+    '''
+    _shared: Optional['EventLoopThread'] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name='pluma-event-loop',
+                                        daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def shared(cls) -> 'EventLoopThread':
+        '''Return the event loop thread shared by default by all engines'''
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+
+def _set_controlling_tty():
+    '''Make the standard input tty the controlling terminal of the process'''
+    fcntl.ioctl(0, termios.TIOCSCTTY, 0)
+
+
+class AsyncioEngine(ConsoleEngine):
+    '''Console engine receiving data from an asyncio event loop.
+
+    Reception is driven by a reader registered on the event loop, so that
+    a single loop thread can serve many consoles. Processes are started in
+    a pseudo-terminal, as with pexpect.
+
+    Coroutines "read_all_async", "wait_for_match_async" and "send_async"
+    are available for code running in the event loop. The regular methods
+    can be used from any other thread, which is how ConsoleBase uses them,
+    but must not be called from the event loop thread as they block.
+
+    By default, all engines share the loop of EventLoopThread.shared().
+    Another loop, running in a different thread, can be passed as "loop".
+    '''
+
+    def __init__(self, linesep: Optional[str] = None, encoding: Optional[str] = None,
+                 raw_logfile: Optional[str] = None,
+                 reception_buffer_max_size: Optional[int] = None,
+                 read_chunk_size: Optional[int] = None,
+                 loop: Optional[asyncio.AbstractEventLoop] = None,
+                 raw_log_settings: Optional[RawLogSettings] = None):
+        super().__init__(linesep=linesep, encoding=encoding,
+                         raw_logfile=raw_logfile,
+                         reception_buffer_max_size=reception_buffer_max_size,
+                         raw_log_settings=raw_log_settings)
+        self.read_chunk_size = read_chunk_size or 4096
+        self.loop = loop or EventLoopThread.shared().loop
+        self._fd: Optional[int] = None
+        self._process: Optional[subprocess.Popen] = None
+        self._log_file: Optional[RawLogWriter] = None
+        self._log_sent = False
+        self._reading = False
+        self._hung_up = False
+        # Data read by the event loop, not yet received in the reception buffer
+        self._pending = bytearray()
+        self._pending_lock = threading.Lock()
+        self._data_event = threading.Event()
+        self._async_data_event: Optional[asyncio.Event] = None
+
+        if self.read_chunk_size < 1:
+            raise ValueError('"read_chunk_size" must be a positive number of bytes')
+
+    def _open_process(self, command: str, log_file: Optional[RawLogWriter] = None):
+        main_fd, secondary_fd = pty.openpty()
+        try:
+            self._process = subprocess.Popen(
+                shlex.split(command), stdin=secondary_fd, stdout=secondary_fd,
+                stderr=secondary_fd, start_new_session=True,
+                preexec_fn=_set_controlling_tty)
+        except Exception:
+            os.close(main_fd)
+            raise
+        finally:
+            os.close(secondary_fd)
+
+        # Log both directions for processes, as they echo nothing back
+        self._log_sent = True
+        self._start_reading(fd=main_fd, log_file=log_file)
+
+    def _open_fd(self, fd: int, log_file: Optional[RawLogWriter] = None):
+        # Only log data received, to avoid seeing commands twice for TTYs
+        self._log_sent = False
+        self._start_reading(fd=fd, log_file=log_file)
+
+    @property
+    def is_open(self) -> bool:
+        if self._fd is None:
+            return False
+
+        if self._process is not None:
+            return self._process.poll() is None
+
+        return not self._hung_up
+
+    def fileno(self) -> Optional[int]:
+        return self._fd if self.is_open else None
+
+    def close(self):
+        super().close()
+        # Release resources even if the process already exited
+        self._release()
+
+    def _close_fd(self):
+        self._release()
+
+    def _close_process(self):
+        self._release()
+
+    def send(self, data: str):
+        self._write(self.encode(data))
+
+    def send_control(self, char: str):
+        self._write(self.control_code(char))
+
+    def _read_from_console(self) -> bytes:
+        with self._pending_lock:
+            received = bytes(self._pending)
+            self._pending.clear()
+            self._data_event.clear()
+
+        return received
+
+    def wait_for_data(self, timeout: float) -> bool:
+        with self._pending_lock:
+            if self._pending or self._hung_up:
+                return True
+
+        return self._data_event.wait(max(timeout, 0))
+
+    def wait_for_match(self, match: Union[str, List[str]],
+                       timeout: Optional[float] = None) -> MatchResult:
+        assert not self._in_loop_thread(), \
+            'Use "wait_for_match_async" from the event loop thread'
+        return super().wait_for_match(match=match, timeout=timeout)
+
+    async def read_all_async(self, preserve_read_buffer: bool = False) -> str:
+        '''Coroutine version of "read_all"'''
+        return self.read_all(preserve_read_buffer=preserve_read_buffer)
+
+    async def wait_for_data_async(self, timeout: float) -> bool:
+        '''Coroutine version of "wait_for_data"'''
+        with self._pending_lock:
+            if self._pending or self._hung_up:
+                return True
+
+        data_event = self._async_data_event
+        assert data_event is not None, 'The console was never opened'
+        data_event.clear()
+        try:
+            await asyncio.wait_for(data_event.wait(), max(timeout, 0))
+        except asyncio.TimeoutError:
+            return False
+
+        return True
+
+    async def wait_for_match_async(self, match: Union[str, List[str]],
+                                   timeout: Optional[float] = None) -> MatchResult:
+        '''Coroutine version of "wait_for_match"'''
+        assert self.is_open
+
+        timeout = timeout if timeout is not None else 0.5
+        matcher = PatternMatcher(match, encoding=self.encoding, overlap=self.match_overlap)
+        deadline = time.monotonic() + timeout
+        self.receive()
+        pattern_match = self._search(matcher, self._reception_buffer)
+        while not pattern_match and self.is_open:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            if not await self.wait_for_data_async(timeout=remaining) or not self.is_open:
+                continue
+
+            # The background reader may have received the data already
+            received = self.receive()
+            if received or self.reader_running:
+                pattern_match = self._search(matcher, self._reception_buffer)
+            if not received and self._hung_up:
+                break
+
+        return self._consume_match(pattern_match)
+
+    async def send_async(self, data: str):
+        '''Coroutine version of "send"'''
+        assert self.is_open and self._fd is not None
+        fd = self._fd
+
+        data_bytes = self.encode(data)
+        view = memoryview(data_bytes)
+        while view:
+            try:
+                view = view[os.write(fd, view):]
+            except BlockingIOError:
+                writable = self.loop.create_future()
+                self.loop.add_writer(fd, writable.set_result, None)
+                try:
+                    await writable
+                finally:
+                    self.loop.remove_writer(fd)
+
+        self._log_sent_data(data_bytes)
+
+    async def send_line_async(self, data: str):
+        '''Coroutine version of "send_line"'''
+        await self.send_async(data + self.linesep)
+
+    def interact(self):
+        '''Let the user interact with the console, until Ctrl+] is pressed'''
+        assert self.is_open and self._fd is not None
+        fd = self._fd
+
+        escape_character = b'\x1d'
+        stdin_fd = sys.stdin.fileno()
+        stdout_fd = sys.stdout.fileno()
+        stdin_mode = termios.tcgetattr(stdin_fd)
+
+        self._call_in_loop(self._remove_reader)
+        try:
+            tty.setraw(stdin_fd)
+            os.write(stdout_fd, self._read_from_console())
+            while self.is_open:
+                readable, __, __ = select.select([stdin_fd, fd], [], [])
+                if fd in readable:
+                    try:
+                        received = os.read(fd, self.read_chunk_size)
+                    except BlockingIOError:
+                        received = None
+                    except OSError:
+                        break
+
+                    if received == b'':
+                        break
+                    if received:
+                        os.write(stdout_fd, received)
+
+                if stdin_fd in readable:
+                    typed = os.read(stdin_fd, 1024)
+                    if escape_character in typed:
+                        self._write(typed[:typed.index(escape_character)])
+                        break
+                    self._write(typed)
+        finally:
+            termios.tcsetattr(stdin_fd, termios.TCSAFLUSH, stdin_mode)
+            if self.is_open:
+                self._call_in_loop(self._add_reader)
+
+    def _start_reading(self, fd: int, log_file: Optional[RawLogWriter]):
+        self._fd = fd
+        self._log_file = log_file
+        self._hung_up = False
+        os.set_blocking(fd, False)
+        self._call_in_loop(self._add_reader)
+
+    def _add_reader(self):
+        '''Start reading the console from the event loop. Runs in the loop'''
+        if self._async_data_event is None:
+            self._async_data_event = asyncio.Event()
+
+        if self._fd is not None:
+            self.loop.add_reader(self._fd, self._on_readable)
+        self._reading = True
+
+    def _remove_reader(self):
+        '''Stop reading the console from the event loop. Runs in the loop'''
+        if self._reading and self._fd is not None:
+            self.loop.remove_reader(self._fd)
+            self._reading = False
+
+    def _on_readable(self):
+        '''Read data available on the console. Runs in the loop'''
+        if self._fd is None:
+            return
+
+        try:
+            received = os.read(self._fd, self.read_chunk_size)
+        except BlockingIOError:
+            return
+        except OSError:
+            # Linux returns EIO on a pseudo-terminal once the process exited
+            received = b''
+
+        if not received:
+            self._remove_reader()
+            self._hung_up = True
+            self._data_event.set()
+            if self._async_data_event is not None:
+                self._async_data_event.set()
+            return
+
+        if self._log_file:
+            self._log_file.write(received)
+            self._log_file.flush()
+
+        with self._pending_lock:
+            self._pending += received
+            self.read_stats.read_calls += 1
+            self._data_event.set()
+
+        if self._async_data_event is not None:
+            self._async_data_event.set()
+
+    def _write(self, data: bytes):
+        assert self.is_open and self._fd is not None
+        fd = self._fd
+
+        view = memoryview(data)
+        while view:
+            try:
+                view = view[os.write(fd, view):]
+            except BlockingIOError:
+                select.select([], [fd], [])
+
+        self._log_sent_data(data)
+
+    def _log_sent_data(self, data: bytes):
+        if self._log_sent and self._log_file:
+            self._log_file.write(data)
+            self._log_file.flush()
+
+    def _release(self):
+        '''Stop reading, and close the console file descriptor and process'''
+        if self._fd is None:
+            return
+
+        self._call_in_loop(self._remove_reader)
+
+        if self._process is not None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+            self._process = None
+
+        os.close(self._fd)
+        self._fd = None
+        self._log_file = None
+
+    def _in_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            # No event loop running in this thread
+            return False
+
+    def _call_in_loop(self, function: Callable[[], T]) -> T:
+        '''Call "function" in the event loop thread, and return its result'''
+        if self._in_loop_thread():
+            return function()
+
+        async def call():
+            return function()
+
+        return asyncio.run_coroutine_threadsafe(call(), self.loop).result()
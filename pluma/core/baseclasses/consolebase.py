@@ -1,13 +1,16 @@
 import time
-import json
 import os
-from typing import Optional, List, Tuple, Union
+import re
+import uuid
+from collections import deque
+from typing import Any, Deque, Optional, List, Tuple, Union
 from abc import ABC, abstractmethod
 
 from pluma.core.dataclasses import SystemContext
-from pluma.core.baseclasses import ConsoleEngine, PexpectEngine
+from pluma.core.baseclasses import ConsoleEngine, PexpectEngine, RawLogSettings
 
 from .hardwarebase import HardwareBase
+from .filedeployment import DeploymentResult
 from .logging import LogLevel
 from .consoleexceptions import (ConsoleError, ConsoleCannotOpenError,
                                 ConsoleExceptionKeywordReceivedError,
@@ -20,12 +23,26 @@ class ConsoleBase(HardwareBase, ABC):
 
     def __init__(self, encoding: str = None, linesep: str = None,
                  raw_logfile: str = None, system: SystemContext = None,
-                 engine: ConsoleEngine = None):
+                 engine: Optional[ConsoleEngine] = None, background_reader: bool = False,
+                 raw_log_settings: Optional[RawLogSettings] = None):
         self.engine = engine or PexpectEngine(linesep=linesep,
                                               encoding=encoding,
-                                              raw_logfile=raw_logfile)
+                                              raw_logfile=raw_logfile,
+                                              raw_log_settings=raw_log_settings)
         self.system = system or SystemContext()
+        # Receive data continuously from a background thread once opened
+        self.background_reader = background_reader
+        # Whether commands sent are run by a POSIX shell, see send_and_read
+        self.runs_in_shell = False
+        # Prompt set by condition_shell, None if the shell is not conditioned
+        self.prompt_token: Optional[str] = None
+        # Maximum bytes sent per second, None for no limit. Data longer than
+        # "send_chunk_size" is then sent in chunks, see send_nonblocking
+        self.send_rate: Optional[float] = None
+        self.send_chunk_size = 64
         self._requires_login = True
+        # End markers of commands which timed out, see send_and_read
+        self._late_markers: Deque[str] = deque(maxlen=8)
 
     @abstractmethod
     def open(self):
@@ -33,6 +50,8 @@ class ConsoleBase(HardwareBase, ABC):
 
     def _on_opened(self):
         '''Executed after the console is opened.'''
+        if self.background_reader:
+            self.engine.start_reader()
 
     @property
     def is_open(self):
@@ -41,6 +60,7 @@ class ConsoleBase(HardwareBase, ABC):
 
     def close(self):
         '''Close the console.'''
+        self.restore_shell()
         self.engine.close()
 
     def _on_closed(self):
@@ -68,19 +88,45 @@ class ConsoleBase(HardwareBase, ABC):
     def wait_for_bytes(self, timeout: Optional[float] = None,
                        sleep_time: Optional[float] = None,
                        start_bytes: int = None) -> bool:
-        '''Wait for data to be received on the console.'''
+        '''Wait for data to be received on the console.
+
+        Data is considered new if the engine's "bytes_received" count goes
+        above "start_bytes", which defaults to its value when called.
+        "sleep_time" is only used by engines which cannot be polled.
+        '''
         timeout = timeout if timeout is not None else 10.0
         sleep_time = sleep_time if sleep_time is not None else 0.1
 
         self.require_open()
 
-        self.engine.read_all(preserve_read_buffer=True)
-        initial_byte_count = start_bytes or self.engine.reception_buffer_size
+        self.engine.receive()
+        initial_byte_count = start_bytes if start_bytes is not None \
+            else self.engine.bytes_received
+
+        if self.engine.fileno() is None:
+            return self._poll_for_bytes(initial_byte_count=initial_byte_count,
+                                        timeout=timeout, sleep_time=sleep_time)
+
+        start_time = time.monotonic()
+        deadline = start_time + timeout
+        while self.engine.bytes_received <= initial_byte_count:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
 
+            self.log(f'Waiting for data: Waited[{time.monotonic()-start_time:.1f}/'
+                     f'{timeout:.1f}s]...', level=LogLevel.DEBUG)
+            self._wait_and_receive(timeout=remaining, sleep_time=sleep_time)
+
+        return True
+
+    def _poll_for_bytes(self, initial_byte_count: int, timeout: float,
+                        sleep_time: float) -> bool:
+        '''Wait for data by reading the console every "sleep_time"'''
         start_time = time.time()
         while(time.time()-start_time < timeout):
-            self.engine.read_all(preserve_read_buffer=True)
-            byte_count = self.engine.reception_buffer_size
+            self.engine.receive()
+            byte_count = self.engine.bytes_received
 
             self.log(f'Waiting for data: Waited[{time.time()-start_time:.1f}/{timeout:.1f}s] '
                      'Received[{byte_count-initial_byte_count}B]...',
@@ -95,47 +141,97 @@ class ConsoleBase(HardwareBase, ABC):
 
     def wait_for_quiet(self, quiet: float = None, sleep_time: float = None,
                        timeout: float = None) -> bool:
-        '''Wait at most "timeout" for no activity during "quiet" consecutive seconds'''
+        '''Wait at most "timeout" for no activity during "quiet" consecutive seconds.
+
+        The quiet period starts when called, or when the last byte was
+        received if later. "sleep_time" is only used by engines which
+        cannot be polled.
+        '''
         self.require_open()
         quiet = quiet if quiet is not None else 0.5
         sleep_time = sleep_time if sleep_time is not None else 0.1
         timeout = timeout if timeout is not None else 10.0
 
-        last_read_buffer_size = 0
+        if self.engine.fileno() is None:
+            return self._poll_for_quiet(quiet=quiet, sleep_time=sleep_time,
+                                        timeout=timeout)
+
+        start = time.monotonic()
+        deadline = start + timeout
+        self.engine.receive()
+        while True:
+            now = time.monotonic()
+            quiet_start = max(start, self.engine.last_reception_time or start)
+            quiet_end = quiet_start + quiet
+            if now >= quiet_end:
+                return True
+            if now >= deadline:
+                return False
+
+            log_string = ("Waiting for quiet... Waited[{:.1f}/{:.1f}s] "
+                          "Quiet[{:.1f}/{:.1f}s] Received[{:.0f}B]...")
+            self.log(log_string.format(now - start, timeout, now - quiet_start,
+                                       quiet, self.engine.reception_buffer_size),
+                     level=LogLevel.DEBUG)
+            self._wait_and_receive(timeout=min(quiet_end, deadline) - now,
+                                   sleep_time=sleep_time)
+
+    def _poll_for_quiet(self, quiet: float, sleep_time: float, timeout: float) -> bool:
+        '''Wait for quiet by reading the console every "sleep_time"'''
+        last_bytes_received = self.engine.bytes_received
         start = time.time()
         now = start
         quiet_start = start
         while(now - start < timeout):
             time.sleep(sleep_time)
 
-            self.read_all(preserve_read_buffer=True)
-            reception_buffer_size = self.engine.reception_buffer_size
+            self.engine.receive()
+            bytes_received = self.engine.bytes_received
 
             # Check if more data was received
             now = time.time()
-            if reception_buffer_size == last_read_buffer_size:
+            if bytes_received == last_bytes_received:
                 if now - quiet_start > quiet:
                     return True
             else:
                 quiet_start = now
 
-            last_read_buffer_size = reception_buffer_size
+            last_bytes_received = bytes_received
             log_string = ("Waiting for quiet... Waited[{:.1f}/{:.1f}s] "
                           "Quiet[{:.1f}/{:.1f}s] Received[{:.0f}B]...")
             self.log(log_string.format(now - start, timeout, now - quiet_start,
-                                       quiet, reception_buffer_size), level=LogLevel.DEBUG)
+                                       quiet, self.engine.reception_buffer_size),
+                     level=LogLevel.DEBUG)
 
         # Timeout
         return False
 
+    def _wait_and_receive(self, timeout: float, sleep_time: float):
+        '''Wait for data to be available on the engine, and receive it'''
+        self.engine.wait_and_receive(timeout=timeout, sleep_time=sleep_time)
+
     def send_and_read(self, cmd: str, timeout: Optional[float] = None,
                       sleep_time: Optional[float] = None,
                       quiet_time: Optional[float] = None,
-                      send_newline: bool = True, flush_before: bool = True) -> str:
-        '''Send a command/data on the console, wait for quiet and return the data received'''
+                      send_newline: bool = True, flush_before: bool = True,
+                      sentinel: Optional[bool] = None) -> str:
+        '''Send a command/data on the console, and return the data received
+        once complete.
+
+        If "sentinel" is set, which defaults to "sends_end_marker", the
+        command is followed by a unique end marker, and the data received
+        before the marker is returned as soon as it arrives.
+        Otherwise, the command is considered complete after "quiet_time"
+        seconds without data received.
+        '''
         timeout = timeout if timeout is not None else 3
         sleep_time = sleep_time if sleep_time is not None else 0.1
         quiet_time = quiet_time if quiet_time is not None else 0.3
+        sentinel = sentinel if sentinel is not None else self.sends_end_marker
+
+        if sentinel and send_newline:
+            return self._send_and_read_until_sentinel(cmd, timeout=timeout,
+                                                      flush_before=flush_before)
 
         self.send_nonblocking(cmd, send_newline=send_newline,
                               flush_before=flush_before)
@@ -143,6 +239,57 @@ class ConsoleBase(HardwareBase, ABC):
                             timeout=timeout)
         return self.read_all()
 
+    def _send_and_read_until_sentinel(self, cmd: str, timeout: float,
+                                      flush_before: bool) -> str:
+        if flush_before:
+            self._drop_late_markers(self.read_all())
+
+        marker_id = uuid.uuid4().hex[:12]
+        # The marker is printed with "%s-%s", so that the command echo never
+        # matches. It is appended to the command line, so that a command
+        # reading its input does not receive it, or sent on its own line if
+        # the command line may not end there, e.g. if empty or commented.
+        marker_cmd = f"printf '%s-%s\\n' PLUMA {marker_id}"
+        if _ends_command_line(cmd):
+            self.send_nonblocking(f'{cmd} ; {marker_cmd}', flush_before=False)
+        else:
+            self.send_nonblocking(f'{cmd}{self.engine.linesep}{marker_cmd}',
+                                  flush_before=False)
+
+        result = self.engine.wait_for_match(match=rf'PLUMA-{marker_id}\r?\n',
+                                            timeout=timeout)
+        if not result.text_matched:
+            self.log(f'End marker not received within {timeout}s after "{cmd}"',
+                     level=LogLevel.DEBUG)
+            # Dropped from the data received with a later command
+            self._late_markers.append(marker_id)
+            output = result.text_received
+        else:
+            output = result.text_received[:-len(result.text_matched)]
+
+        # Remove the marker command from the echo of the shell, if any
+        output = output.replace(f' ; {marker_cmd}', '')
+        output = re.sub(re.escape(marker_cmd) + r'\r?\n', '', output)
+        return self._drop_late_markers(output)
+
+    def _drop_late_markers(self, output: str) -> str:
+        '''Remove the data received up to the end markers of previous commands
+        which timed out, and return the rest'''
+        for marker_id in list(self._late_markers):
+            late_marker = re.search(rf'PLUMA-{marker_id}\r?\n', output)
+            if late_marker:
+                output = output[late_marker.end():]
+                self._late_markers.remove(marker_id)
+
+        return output
+
+    @property
+    def sends_end_marker(self) -> bool:
+        '''Whether "send_and_read" follows commands with an end marker by
+        default, once the shell is conditioned and no longer echoes commands'''
+        # The console may not run a shell before that, e.g. in a bootloader
+        return self.runs_in_shell and self.prompt_token is not None
+
     def send_and_expect(self, cmd: str, match: Union[str, List[str]],
                         excepts: Union[str, List[str]] = None,
                         timeout: Optional[float] = None, send_newline: bool = True,
@@ -190,7 +337,10 @@ class ConsoleBase(HardwareBase, ABC):
         if flush_before:
             self.read_all()
 
-        if send_newline:
+        data = cmd + self.engine.linesep if send_newline else cmd
+        if self.send_rate and len(data) > self.send_chunk_size:
+            self._send_paced(data, self.send_rate)
+        elif send_newline:
             self.engine.send_line(cmd)
         else:
             self.engine.send(cmd)
@@ -198,6 +348,24 @@ class ConsoleBase(HardwareBase, ABC):
         self.log(f'<<sent>>{cmd}<</sent>>',
                  force_echo=False, level=LogLevel.DEBUG)
 
+    def _send_paced(self, data: str, send_rate: float):
+        '''Send data in chunks, at "send_rate" bytes per second at most, so
+        that the target input buffer is not overrun'''
+        start_time = time.monotonic()
+        sent = 0
+        for offset in range(0, len(data), self.send_chunk_size):
+            chunk = data[offset:offset + self.send_chunk_size]
+            self.engine.send(chunk)
+            sent += len(self.engine.encode(chunk))
+
+            # Keep receiving the echo, so that the host buffer does not fill up
+            if not self.engine.reader_running:
+                self.engine.receive()
+
+            delay = start_time + sent / send_rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
     def send(self, cmd: str, send_newline: bool = True, flush_before: bool = True):
         '''Send a command/data. Identical to ConsoleBase.send_nonblocking()'''
         self.send_nonblocking(cmd=cmd, send_newline=send_newline, flush_before=flush_before)
@@ -210,7 +378,7 @@ class ConsoleBase(HardwareBase, ABC):
         '''Return True if the console responds to <Enter>'''
 
         self.read_all(preserve_read_buffer=True)
-        start_bytes = self.engine.reception_buffer_size
+        start_bytes = self.engine.bytes_received
         self.send_nonblocking('', flush_before=False)
         alive = self.wait_for_bytes(timeout=timeout, start_bytes=start_bytes)
 
@@ -262,32 +430,94 @@ class ConsoleBase(HardwareBase, ABC):
 
         self.log('Login successful')
 
-    def get_json_data(self, cmd):
+    def condition_shell(self, timeout: float = 5):
+        '''Prepare the shell of the console to run commands.
+
+        The prompt is set to a unique token, matched exactly by
+        "prompt_regex", and the terminal echo, pagers and colours are
+        disabled, so that only the command outputs are received. The
+        original settings are saved in the shell, and restored by
+        "restore_shell" when the console is closed.
+        '''
+        if not self.runs_in_shell or not self.system.condition_shell or self.prompt_token:
+            return
+
+        prompt_id = uuid.uuid4().hex[:12]
+        # Quoted in two parts, so that the command echo never matches the prompt
+        self.send_nonblocking('pluma_env=$(export -p); pluma_ps1=$PS1; '
+                              'pluma_stty=$(stty -g 2>/dev/null); stty -echo 2>/dev/null; '
+                              'export PAGER=cat TERM=dumb NO_COLOR=1; '
+                              f"PS1='PLUMA-''{prompt_id}$ '")
+        prompt_token = f'PLUMA-{prompt_id}$ '
+        result = self.engine.wait_for_match(match=re.escape(prompt_token), timeout=timeout)
+        if not result.text_matched:
+            self.log(f'Failed to condition the shell of {self}, using the prompt '
+                     f'"{self.system.prompt_regex}"', level=LogLevel.WARNING)
+            return
+
+        self.prompt_token = prompt_token
+        self.log(f'Shell conditioned, prompt set to "{prompt_token}"', level=LogLevel.DEBUG)
+
+    def restore_shell(self):
+        '''Restore the shell settings changed by "condition_shell"'''
+        if not self.prompt_token:
+            return
+
+        self.prompt_token = None
+        if self.is_open:
+            self.send_nonblocking('stty "$pluma_stty" 2>/dev/null; unset PAGER TERM NO_COLOR; '
+                                  'eval "$pluma_env" 2>/dev/null; PS1=$pluma_ps1; '
+                                  'unset pluma_env pluma_ps1 pluma_stty')
+
+    @property
+    def prompt_regex(self) -> Optional[str]:
+        '''Regex matching the prompt of the console'''
+        if self.prompt_token:
+            return re.escape(self.prompt_token)
+
+        return self.system.prompt_regex
+
+    def get_json_data(self, cmd: str, timeout: Optional[float] = None,
+                      max_size: Optional[int] = None):
         ''' Execute a command @cmd on target which generates JSON data.
-        Parse this data, and return a dict of it.'''
+        Parse this data, and return a dict of it.
 
-        self.wait_for_quiet(quiet=1, sleep_time=0.5)
-        received, matched = self.send_and_expect(cmd, match='{((.|\n)*)\n}')
+        The first JSON object in the command output is returned as soon as
+        it is received. A ConsoleInvalidJSONReceivedError is raised if none
+        is received within @timeout seconds, or if it exceeds @max_size bytes.
+        '''
+        self.send_nonblocking(cmd)
+        data, received = self.engine.wait_for_json(timeout=timeout, max_size=max_size)
 
-        if not matched:
+        self.log(f'<<received>>{received}<</received>>',
+                 force_echo=False, level=LogLevel.DEBUG)
+
+        if data is None:
             raise ConsoleInvalidJSONReceivedError(
                 f'No JSON found in command output: {received}')
 
-        data = json.loads(matched)
         return data
 
     @property
-    def support_file_copy(self):
+    def support_file_copy(self) -> bool:
         return False
 
-    def copy_to_target(self, source, destination, timeout=30):
+    def copy_to_target(self, source: str, destination: str, timeout: float = 30) -> Any:
         raise ValueError(
             f'Console type {self} does not support copying to target')
 
-    def copy_to_host(self, source, destination, timeout=30):
+    def copy_to_host(self, source: str, destination: str, timeout: float = 30) -> Any:
         raise ValueError(
             f'Console type {self} does not support copying from target')
 
+    def deploy_files(self, files: List[str], destination: str,
+                     timeout=30) -> DeploymentResult:
+        '''Copy host files to the "destination" directory on the target'''
+        for source in files:
+            self.copy_to_target(source=source, destination=destination, timeout=timeout)
+
+        return DeploymentResult(deployed=list(files))
+
     @property
     def requires_login(self):
         return self._requires_login
@@ -295,7 +525,7 @@ class ConsoleBase(HardwareBase, ABC):
     def wait_for_prompt(self, timeout: Optional[float] = None):
         '''Wait for a prompt, throws if no prompt before timeout'''
 
-        prompt_regex = self.system.prompt_regex
+        prompt_regex = self.prompt_regex
         if not prompt_regex:
             raise ConsoleError('Trying to wait for prompt, but no prompt regex set. '
                                'Set a valid prompt regex for the console')
@@ -304,3 +534,24 @@ class ConsoleBase(HardwareBase, ABC):
         match_result = self.engine.wait_for_match(match=prompt_regex, timeout=timeout)
         if not match_result.regex_matched:
             raise ConsoleError('No prompt detected.')
+
+
+# Endings after which a shell command line continues on the next line
+_OPEN_LINE_ENDINGS = ('&', '|', ';', '\\', '(', '{', '!')
+_OPEN_LINE_KEYWORDS = {'if', 'then', 'else', 'elif', 'do', 'while', 'until', 'case', 'in',
+                       'for'}
+
+
+def _ends_command_line(cmd: str) -> bool:
+    '''Return whether "cmd" is a complete single shell command line, which
+    another command can be appended to with ";"'''
+    line = cmd.strip()
+    if not line or '\n' in line or '#' in line or '<<' in line:
+        return False
+
+    # An odd number of quotes leaves a string open
+    if line.count("'") % 2 or line.count('"') % 2:
+        return False
+
+    return (not line.endswith(_OPEN_LINE_ENDINGS)
+            and line.split()[-1] not in _OPEN_LINE_KEYWORDS)
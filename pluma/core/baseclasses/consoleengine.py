@@ -1,14 +1,23 @@
+import json
 import os
+import select
+import threading
+import time
 
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
-from typing import List, IO, Optional, Union
+from typing import Any, Callable, List, Iterator, Optional, Tuple, Union
 
 from pluma.utils import datetime_to_timestamp
-from .consoleexceptions import ConsoleCannotOpenError
+from .consoleexceptions import ConsoleCannotOpenError, ConsoleInvalidJSONReceivedError
+from .jsonframer import JsonFramer
 from .logging import Logger
+from .receptionbuffer import ReceptionBuffer
+from .patternmatcher import PatternMatcher, PatternMatch
+from .rawlogwriter import RawLogSettings, RawLogWriter
 
 log = Logger()
 
@@ -23,11 +32,105 @@ class MatchResult:
     regex_matched: Optional[str]
     text_matched: Optional[str]
     text_received: str
+    # Stream offset of the match (see "ConsoleEngine.bytes_received"), and
+    # time.monotonic() arrival time of its last byte
+    match_offset: Optional[int] = None
+    match_time: Optional[float] = None
+
+
+@dataclass
+class ReadStatistics:
+    '''Counters describing the data drained from a console'''
+    bytes_read: int = 0
+    read_calls: int = 0
+    drains: int = 0
+    drain_time: float = 0.0
+
+    @property
+    def bytes_per_read(self) -> float:
+        '''Average number of bytes returned by each low level read'''
+        return self.bytes_read / self.read_calls if self.read_calls else 0.0
+
+    @property
+    def throughput(self) -> float:
+        '''Bytes read per second spent draining the console'''
+        return self.bytes_read / self.drain_time if self.drain_time else 0.0
+
+
+class ConsoleSubscription:
+    '''Independent reader of the data received by a ConsoleEngine.
+
+    Created with "ConsoleEngine.subscribe()". A subscription holds its own
+    copy of the data received since it was created, and its own cursor, so
+    that reading from it does not consume data from the engine reception
+    buffer, nor from other subscriptions. If "max_size" is set, only the
+    most recent "max_size" bytes not read yet are kept.
+
+    If "callback" is set, it is called instead with each chunk of bytes
+    received and its time.monotonic() arrival time, from the thread
+    receiving the data. It must return quickly, and not use the engine.
+    '''
+
+    def __init__(self, engine: 'ConsoleEngine',
+                 callback: Optional[Callable[[bytes, float], None]] = None,
+                 max_size: Optional[int] = None):
+        self.engine = engine
+        self.callback = callback
+        self._buffer = ReceptionBuffer(encoding=engine.encoding, max_size=max_size,
+                                       start_offset=engine.bytes_received)
+
+    @property
+    def offset(self) -> int:
+        '''Stream offset of the next byte to be read from the subscription'''
+        with self.engine._lock:
+            return self._buffer.start_offset
+
+    @property
+    def size(self) -> int:
+        '''Number of bytes received and not read yet'''
+        with self.engine._lock:
+            return self._buffer.size
+
+    def read(self) -> str:
+        '''Return the data received since the last read, and consume it'''
+        with self.engine._lock:
+            return self._buffer.flush()
+
+    def read_bytes(self) -> bytes:
+        '''Return the bytes received since the last read, and consume them'''
+        with self.engine._lock:
+            received = self._buffer.raw
+            self._buffer.clear()
+            return received
+
+    def wait_for_match(self, match: Union[str, List[str]],
+                       timeout: Optional[float] = None) -> MatchResult:
+        '''Same as "ConsoleEngine.wait_for_match", on the subscription data'''
+        return self.engine._wait_for_match_in(self._buffer, match=match, timeout=timeout)
+
+    def close(self):
+        '''Stop receiving data'''
+        self.engine.unsubscribe(self)
+
+    def _on_received(self, data: bytes, timestamp: float):
+        if self.callback:
+            self.callback(data, timestamp)
+        else:
+            self._buffer.append(data, timestamp=timestamp)
 
 
 class ConsoleEngine(ABC):
+    # Bytes scanned again before new data by wait_for_match, to find
+    # matches spanning two receptions. None to scan everything received.
+    match_overlap: Optional[int] = 64 * 1024
+    # Maximum duration the background reader waits for data, before
+    # checking whether it should stop
+    reader_poll_interval = 0.1
+
     def __init__(self, linesep: Optional[str] = None, encoding: Optional[str] = None,
-                 raw_logfile: Optional[str] = None):
+                 raw_logfile: Optional[str] = None,
+                 reception_buffer_max_size: Optional[int] = None,
+                 raw_log_settings: Optional[RawLogSettings] = None):
         timestamp = datetime_to_timestamp(datetime.now())
         default_raw_logfile = os.path.join(
             '/tmp', 'pluma',
@@ -36,9 +139,22 @@ class ConsoleEngine(ABC):
         self.linesep = linesep or '\n'
         self.encoding = encoding or 'ascii'
         self.raw_logfile = raw_logfile or default_raw_logfile
-        self._raw_logfile_io = None
+        self.raw_log_settings = raw_log_settings or RawLogSettings()
+        self._raw_log: Optional[RawLogWriter] = None
         self._console_type = None
-        self._reception_buffer = ''
+        self._reception_buffer = ReceptionBuffer(
+            encoding=self.encoding, max_size=reception_buffer_max_size)
+        self.read_stats = ReadStatistics()
+        self.last_reception_time: Optional[float] = None
+        # Protects the reception buffer and subscriptions, which can be
+        # used by the background reader thread and its consumers
+        self._lock = threading.RLock()
+        self._data_received = threading.Condition(self._lock)
+        self._subscriptions: List[ConsoleSubscription] = []
+        self._reader_thread: Optional[threading.Thread] = None
+        self._reader_active = False
+        self._reader_stop = threading.Event()
+        self._abort_error: Optional[Exception] = None
 
     @property
     def console_type(self):
@@ -50,18 +166,14 @@ class ConsoleEngine(ABC):
             raise ValueError('Either "console_cmd" or "console_fd" must be provided.')
 
         if self.raw_logfile:
-            dirpath = os.path.dirname(self.raw_logfile)
-            if dirpath:
-                os.makedirs(dirpath, exist_ok=True)
-
-            self._raw_logfile_io = open(self.raw_logfile, 'wb')
+            self._raw_log = RawLogWriter(self.raw_logfile, settings=self.raw_log_settings)
 
         try:
             if console_cmd is not None:
-                self._open_process(command=console_cmd, log_file=self._raw_logfile_io)
+                self._open_process(command=console_cmd, log_file=self._raw_log)
                 self._console_type = ConsoleType.Process
             elif console_fd is not None:
-                self._open_fd(fd=console_fd, log_file=self._raw_logfile_io)
+                self._open_fd(fd=console_fd, log_file=self._raw_log)
                 self._console_type = ConsoleType.FileDescriptor
             else:
                 raise Exception('Unreachable branch')
@@ -71,33 +183,39 @@ class ConsoleEngine(ABC):
             raise ConsoleCannotOpenError
 
     @abstractmethod
-    def _open_process(self, command: str, log_file: Optional[IO] = None):
+    def _open_process(self, command: str, log_file: Optional[RawLogWriter] = None):
         '''Open a console by spawning a process'''
 
     @abstractmethod
-    def _open_fd(self, fd: int, log_file: Optional[IO] = None):
+    def _open_fd(self, fd: int, log_file: Optional[RawLogWriter] = None):
         '''Open a specific file descriptor as the console'''
 
     @property
     @abstractmethod
-    def is_open(self):
+    def is_open(self) -> bool:
         '''Return whether the console is open or not'''
 
+    @property
+    def raw_log(self) -> Optional[RawLogWriter]:
+        '''Writer of the raw log of the console, while open'''
+        return self._raw_log
+
     def close(self):
         '''Close the console.'''
-        if not self.is_open:
-            return
+        self.stop_reader()
 
-        if self.console_type is ConsoleType.Process:
-            self._close_process()
-        elif self.console_type is ConsoleType.FileDescriptor:
-            self._close_fd()
-        else:
-            raise Exception(f'Unknown console_type {self.console_type}')
+        if self.is_open:
+            if self.console_type is ConsoleType.Process:
+                self._close_process()
+            elif self.console_type is ConsoleType.FileDescriptor:
+                self._close_fd()
+            else:
+                raise Exception(f'Unknown console_type {self.console_type}')
 
-        if self._raw_logfile_io:
-            self._raw_logfile_io.close()
-            self._raw_logfile_io = None
+        # Close the log even if the console closed by itself
+        if self._raw_log:
+            self._raw_log.close()
+            self._raw_log = None
 
     @abstractmethod
     def _close_fd(self):
@@ -115,42 +233,415 @@ class ConsoleEngine(ABC):
     def send_control(self, char: str):
         '''Send control character on the console.'''
 
+    @staticmethod
+    def control_code(char: str) -> bytes:
+        '''Return the control code for a character, e.g. "C" for Ctrl+C'''
+        if len(char) > 1:
+            raise ValueError('Only a single character can be sent as control code, '
+                             f'but got {char}')
+
+        code_ascii_value = ord(char.upper()) - ord('A') + 1
+        if code_ascii_value not in range(1, 27):
+            raise AttributeError('Control character must be A-Z')
+
+        return bytes([code_ascii_value])
+
     def send_line(self, data: str):
         '''Send data and a line break on the console.'''
         self.send(data+self.linesep)
 
-    def read_all(self, preserve_read_buffer: bool = False):
-        '''Read and return all data available on the console'''
+    def receive(self) -> int:
+        '''Read all data available on the console into the reception buffer,
+        and return the number of bytes received'''
         assert self.is_open
 
-        self._reception_buffer += self._read_from_console()
-        received = self._reception_buffer
+        with self._lock:
+            start_time = time.monotonic()
+            received = self._read_from_console()
+            self.read_stats.drain_time += time.monotonic() - start_time
+            self.read_stats.drains += 1
+            self.read_stats.bytes_read += len(received)
+
+            if received:
+                self.last_reception_time = time.monotonic()
+                self._reception_buffer.append(received, timestamp=self.last_reception_time)
+                self._publish(received, timestamp=self.last_reception_time)
+                self._data_received.notify_all()
+
+        return len(received)
+
+    def wait_and_receive(self, timeout: float, sleep_time: float = 0.01) -> int:
+        '''Wait a maximum duration of "timeout" for data, receive it, and
+        return the number of bytes received.
+
+        When the background reader is running, wait for it to receive data
+        instead. Engines which cannot wait for data are polled every
+        "sleep_time" seconds.
+        '''
+        timeout = max(timeout, 0)
+        self._raise_if_aborted()
+
+        if self.reader_running:
+            with self._lock:
+                initial_byte_count = self.bytes_received
+                self._data_received.wait_for(
+                    lambda: (self.bytes_received > initial_byte_count
+                             or not self.reader_running
+                             or self._abort_error is not None), timeout=timeout)
+                self._raise_if_aborted()
+                return self.bytes_received - initial_byte_count
+
+        if self.fileno() is None:
+            time.sleep(min(sleep_time, timeout))
+            received = self.receive() if self.is_open else 0
+        elif not self.wait_for_data(timeout=timeout):
+            return 0
+        else:
+            received = self.receive() if self.is_open else 0
+            if not received:
+                # Woken up without data, the console is hung up: don't spin.
+                time.sleep(min(sleep_time, timeout))
+
+        self._raise_if_aborted()
+        return received
+
+    def abort_waits(self, error: Exception):
+        '''Make the current or next wait for data raise "error", once.
+
+        Used to interrupt a test waiting on the console, e.g. when the
+        target is known to have crashed.
+        '''
+        with self._lock:
+            self._abort_error = error
+            self._data_received.notify_all()
 
-        if not preserve_read_buffer:
-            if self._reception_buffer.strip():
-                log.debug(f'<<flushed>>{self._reception_buffer}<</flushed>>')
-            self._reception_buffer = ''
+    def clear_abort(self):
+        '''Cancel an abort set by "abort_waits" which no wait raised yet'''
+        with self._lock:
+            self._abort_error = None
+
+    def _raise_if_aborted(self):
+        with self._lock:
+            error, self._abort_error = self._abort_error, None
+
+        if error:
+            raise error
+
+    def read_all(self, preserve_read_buffer: bool = False) -> str:
+        '''Read and return all data available on the console'''
+        self.receive()
+
+        with self._lock:
+            if preserve_read_buffer:
+                return self._reception_buffer.text
+
+            received = self._reception_buffer.flush()
+
+        if received.strip():
+            log.debug(f'<<flushed>>{received}<</flushed>>')
 
         return received
 
+    def subscribe(self, callback: Optional[Callable[[bytes, float], None]] = None,
+                  max_size: Optional[int] = None) -> ConsoleSubscription:
+        '''Return a new subscription to the data received from now on.
+
+        See ConsoleSubscription for the meaning of "callback" and "max_size".
+        '''
+        with self._lock:
+            subscription = ConsoleSubscription(self, callback=callback, max_size=max_size)
+            self._subscriptions.append(subscription)
+
+        return subscription
+
+    def unsubscribe(self, subscription: ConsoleSubscription):
+        '''Stop sending received data to "subscription"'''
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def _publish(self, data: bytes, timestamp: float):
+        '''Send received data to all subscriptions'''
+        for subscription in self._subscriptions:
+            try:
+                subscription._on_received(data, timestamp)
+            except Exception as e:
+                log.warning(f'Console subscription failed to process data received: {e}')
+
+    @property
+    def reader_running(self) -> bool:
+        '''Whether the background reader is receiving data'''
+        return self._reader_active
+
+    def start_reader(self):
+        '''Start receiving data continuously, from a background thread.
+
+        Data is then received as soon as it is available, so that the
+        console never stalls and subscriptions are always up to date, even
+        when nothing waits for data. The reader stops when the console is
+        closed, or with "stop_reader()".
+        '''
+        assert self.is_open
+
+        if self._reader_thread is not None:
+            return
+
+        self._reader_stop.clear()
+        self._reader_active = True
+        self._reader_thread = threading.Thread(
+            target=self._read_continuously, daemon=True,
+            name=f'{self.__class__.__name__}-reader')
+        self._reader_thread.start()
+
+    def stop_reader(self):
+        '''Stop the background reader, if running'''
+        if self._reader_thread is None:
+            return
+
+        self._reader_stop.set()
+        if self._reader_thread is not threading.current_thread():
+            self._reader_thread.join()
+        self._reader_thread = None
+
+    @contextmanager
+    def reader_paused(self) -> Iterator[None]:
+        '''Stop the background reader if running, and start it again on
+        exit, e.g. to hand over the console to the user'''
+        was_running = self._reader_thread is not None
+        self.stop_reader()
+        try:
+            yield
+        finally:
+            if was_running and self.is_open:
+                self.start_reader()
+
+    def _read_continuously(self):
+        '''Receive data until stopped or closed. Runs in the reader thread'''
+        try:
+            while not self._reader_stop.is_set() and self.is_open:
+                if self.fileno() is None:
+                    self._reader_stop.wait(0.01)
+                elif not self.wait_for_data(timeout=self.reader_poll_interval):
+                    continue
+
+                if not self.is_open:
+                    break
+
+                if not self.receive() and self.fileno() is not None:
+                    # Woken up without data, the console is hung up: don't spin.
+                    self._reader_stop.wait(0.01)
+        except Exception as e:
+            log.warning(f'Background console reader stopped: {e}')
+        finally:
+            with self._lock:
+                self._reader_active = False
+                self._data_received.notify_all()
+
+    def fileno(self) -> Optional[int]:
+        '''Return the file descriptor data is received on, or None if the
+        engine cannot be polled for reception'''
+        return None
+
+    def wait_for_data(self, timeout: float) -> bool:
+        '''Wait a maximum duration of "timeout" for data to be available
+        for reception, and return True if some is.
+
+        Returns early as well if the console is hung up, in which case the
+        next read may not return any data.
+        '''
+        fd = self.fileno()
+        if fd is None:
+            raise NotImplementedError(
+                f'{self.__class__.__name__} does not support waiting for data')
+
+        poller = select.poll()
+        poller.register(fd, select.POLLIN | select.POLLPRI)
+        return bool(poller.poll(max(timeout, 0) * 1000))
+
     @abstractmethod
-    def _read_from_console(self) -> str:
+    def _read_from_console(self) -> bytes:
         '''Read and return all data available on the console'''
 
-    @abstractmethod
     def wait_for_match(self, match: Union[str, List[str]],
                        timeout: Optional[float] = None) -> MatchResult:
-        '''Wait a maximum duration of 'timeout' for a matching regex'''
+        '''Wait a maximum duration of 'timeout' for a matching regex.
+
+        Data received up to the end of the match is consumed, or all data
+        received if there is no match.
+        '''
+        return self._wait_for_match_in(self._reception_buffer, match=match, timeout=timeout)
+
+    def _wait_for_match_in(self, buffer: ReceptionBuffer, match: Union[str, List[str]],
+                           timeout: Optional[float] = None) -> MatchResult:
+        '''Wait for a matching regex in "buffer", which is fed by "receive()"'''
+        assert self.is_open
+
+        timeout = timeout if timeout is not None else 0.5
+        if isinstance(match, str):
+            match = [match]
+
+        log.debug(f'Waiting up to {timeout}s for patterns: {match}...')
+
+        matcher = PatternMatcher(match, encoding=self.encoding, overlap=self.match_overlap)
+        deadline = time.monotonic() + timeout
+        self.receive()
+        pattern_match = self._search(matcher, buffer)
+        while not pattern_match and self.is_open:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            if self.wait_and_receive(timeout=remaining):
+                pattern_match = self._search(matcher, buffer)
+
+        return self._consume_match(pattern_match, buffer)
+
+    def stream_until_match(self, match: str, callback: Callable[[bytes], None],
+                           max_match_size: int,
+                           timeout: Optional[float] = None) -> MatchResult:
+        '''Wait for a matching regex, passing the data received before it to
+        "callback" as it is received instead of holding it.
+
+        Only the last "max_match_size" bytes received are held, so the match
+        must not be longer. Waiting stops if no data is received for
+        "timeout" seconds. The match is consumed, and is the only text
+        received in the MatchResult. If there is no match, the data held is
+        not consumed.
+        '''
+        assert self.is_open
+
+        timeout = timeout if timeout is not None else 0.5
+        matcher = PatternMatcher(match, encoding=self.encoding, overlap=max_match_size)
+        deadline = time.monotonic() + timeout
+        self.receive()
+        while True:
+            with self._lock:
+                buffer = self._reception_buffer
+                pattern_match = matcher.search(buffer)
+                end_offset = pattern_match.start if pattern_match else max(
+                    buffer.start_offset, buffer.end_offset - max_match_size)
+                data = buffer.consume_bytes(end_offset)
+
+            if data:
+                callback(data)
+                deadline = time.monotonic() + timeout
+
+            remaining = deadline - time.monotonic()
+            if pattern_match or remaining <= 0 or not self.is_open:
+                break
+
+            self.wait_and_receive(timeout=remaining)
+
+        if not pattern_match:
+            log.debug('No match found before timeout or EOF')
+            return MatchResult(regex_matched=None, text_matched=None, text_received='')
+
+        return self._consume_match(pattern_match)
+
+    def wait_for_json(self, timeout: Optional[float] = None,
+                      max_size: Optional[int] = None) -> Tuple[Optional[Any], str]:
+        '''Wait a maximum duration of "timeout" for a JSON object, and return
+        it decoded, along with the data received up to its end.
+
+        The object is returned as soon as it is complete. Data received up to
+        its end is consumed, or all data received if there is no object, in
+        which case None is returned. A ConsoleInvalidJSONReceivedError is
+        raised if the object exceeds "max_size" bytes.
+        '''
+        assert self.is_open
+
+        timeout = timeout if timeout is not None else 5
+        log.debug(f'Waiting up to {timeout}s for JSON data...')
+
+        framer = JsonFramer(max_size=max_size)
+        decoder = json.JSONDecoder()
+        deadline = time.monotonic() + timeout
+        try:
+            self.receive()
+            found = self._search_json(framer, decoder)
+            while not found and self.is_open:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+
+                if self.wait_and_receive(timeout=remaining):
+                    found = self._search_json(framer, decoder)
+        except ConsoleInvalidJSONReceivedError:
+            with self._lock:
+                self._reception_buffer.flush()
+            raise
+
+        with self._lock:
+            if not found:
+                log.debug('No JSON data found before timeout or EOF')
+                return None, self._reception_buffer.flush()
+
+            data, end_offset = found
+            return data, self._reception_buffer.consume(end_offset)
+
+    def _search_json(self, framer: JsonFramer,
+                     decoder: json.JSONDecoder) -> Optional[Tuple[Any, int]]:
+        '''Return the first valid JSON object framed in the reception buffer,
+        and its end offset'''
+        with self._lock:
+            frame = framer.search(self._reception_buffer)
+            while frame:
+                start_offset, end_offset = frame
+                text = self.decode(self._reception_buffer.peek(start_offset, end_offset))
+                try:
+                    data, __ = decoder.raw_decode(text)
+                    return data, end_offset
+                except json.JSONDecodeError:
+                    framer.restart_after(start_offset)
+                    frame = framer.search(self._reception_buffer)
+
+        return None
+
+    def _search(self, matcher: PatternMatcher, buffer: ReceptionBuffer) -> Optional[PatternMatch]:
+        with self._lock:
+            return matcher.search(buffer)
+
+    def _consume_match(self, pattern_match: Optional[PatternMatch],
+                       buffer: Optional[ReceptionBuffer] = None) -> MatchResult:
+        '''Consume the data received up to the end of the match, or all
+        data if there is no match, and return the corresponding MatchResult'''
+        if buffer is None:
+            buffer = self._reception_buffer
+
+        if not pattern_match:
+            log.debug('No match found before timeout or EOF')
+            with self._lock:
+                return MatchResult(regex_matched=None, text_matched=None,
+                                   text_received=buffer.flush())
+
+        log.debug(f'Matched {pattern_match.pattern}')
+        with self._lock:
+            match_time = buffer.time_at(pattern_match.end - 1)
+            text_received = buffer.consume(pattern_match.end)
+
+        return MatchResult(regex_matched=pattern_match.pattern,
+                           text_matched=self.decode(pattern_match.matched),
+                           text_received=text_received,
+                           match_offset=pattern_match.start,
+                           match_time=match_time)
 
     @property
     def reception_buffer_size(self) -> int:
-        '''Size of the reception buffer for the console'''
-        return len(self._reception_buffer)
+        '''Size of the reception buffer for the console, in bytes'''
+        with self._lock:
+            return self._reception_buffer.size
 
     @property
     def reception_buffer(self) -> str:
         '''Content of the reception buffer'''
-        return self._reception_buffer
+        with self._lock:
+            return self._reception_buffer.text
+
+    @property
+    def bytes_received(self) -> int:
+        '''Total number of bytes received in the reception buffer.
+        Unlike "reception_buffer_size", this never decreases.'''
+        return self._reception_buffer.end_offset
 
     @abstractmethod
     def interact(self):
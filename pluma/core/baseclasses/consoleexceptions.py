@@ -16,3 +16,7 @@ class ConsoleExceptionKeywordReceivedError(ConsoleError):
 
 class ConsoleInvalidJSONReceivedError(ConsoleError):
     pass
+
+
+class ConsoleFileTransferError(ConsoleError):
+    pass
@@ -0,0 +1,72 @@
+import hashlib
+import io
+import json
+import os
+import tarfile
+
+from dataclasses import asdict, dataclass, field
+from typing import IO, Dict, List
+
+# Manifest of the files deployed, left in the destination directory
+MANIFEST_NAME = '.pluma-manifest'
+
+
+@dataclass(frozen=True)
+class ManifestEntry:
+    '''Size and SHA-256 hash of a deployed file'''
+    size: int
+    sha256: str
+
+
+@dataclass
+class DeploymentResult:
+    '''Files deployed, and files skipped as already up to date'''
+    deployed: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+
+
+def file_manifest(files: List[str]) -> Dict[str, ManifestEntry]:
+    '''Return the manifest of host files, by destination file name'''
+    manifest = {}
+    for path in files:
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha256.update(chunk)
+
+        manifest[os.path.basename(path)] = ManifestEntry(size=os.path.getsize(path),
+                                                         sha256=sha256.hexdigest())
+
+    return manifest
+
+
+def parse_manifest(text: str) -> Dict[str, ManifestEntry]:
+    '''Parse a manifest read from the target, ignoring it if invalid'''
+    try:
+        return {name: ManifestEntry(size=entry['size'], sha256=entry['sha256'])
+                for name, entry in json.loads(text).items()}
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return {}
+
+
+def dump_manifest(manifest: Dict[str, ManifestEntry]) -> bytes:
+    return json.dumps({name: asdict(entry) for name, entry in sorted(manifest.items())},
+                      indent=1).encode()
+
+
+def write_tar(stream: IO[bytes], files: List[str], manifest: Dict[str, ManifestEntry]):
+    '''Write "files" and the manifest to "stream" as a tar archive, without
+    seeking, so that it can be written to a pipe'''
+    with tarfile.open(fileobj=stream, mode='w|') as tar:
+        for path in files:
+            info = tar.gettarinfo(path, arcname=os.path.basename(path))
+            # Files are owned by the user extracting them on the target
+            info.uid = info.gid = 0
+            info.uname = info.gname = ''
+            with open(path, 'rb') as f:
+                tar.addfile(info, f)
+
+        manifest_data = dump_manifest(manifest)
+        info = tarfile.TarInfo(MANIFEST_NAME)
+        info.size = len(manifest_data)
+        tar.addfile(info, io.BytesIO(manifest_data))
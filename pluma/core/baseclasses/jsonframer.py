@@ -0,0 +1,116 @@
+import re
+
+from typing import Match, Optional, Tuple
+
+from .consoleexceptions import ConsoleInvalidJSONReceivedError
+from .receptionbuffer import ReceptionBuffer
+
+# Delimiters are all ASCII, and so never part of a multi-byte character
+# in ASCII compatible encodings.
+_OBJECT_START = re.compile(rb'{')
+# Rest of a string. A string not closed yet matches up to the end of the
+# data, without its closing quote group, and with its trailing backslash
+# group if the escaped character was not received yet.
+_STRING_END = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*(?:(")|(\\)?\Z)', re.DOTALL)
+# Brace, or whole string
+_OBJECT_TOKEN = re.compile(rb'[{}]|"' + _STRING_END.pattern, re.DOTALL)
+
+
+class JsonFramer:
+    '''Find the first complete JSON object received in a ReceptionBuffer.
+
+    Data is scanned incrementally as it is received, keeping track of the
+    nesting depth of objects and skipping strings, so that braces in
+    strings are ignored. The frame is found as soon as the top-level object
+    closes, without waiting for more data. Each search only scans data
+    received since the previous one, resuming inside a string not closed yet.
+
+    The frame is not validated, use "json.JSONDecoder.raw_decode" to decode
+    it, and "restart_after" to look for the next candidate if it is invalid.
+    If "max_size" is set, a ConsoleInvalidJSONReceivedError is raised when
+    the object being framed exceeds it.
+    '''
+
+    def __init__(self, max_size: Optional[int] = None):
+        if max_size is not None and max_size < 1:
+            raise ValueError('"max_size" must be a positive number of bytes')
+
+        self.max_size = max_size
+        self._position: Optional[int] = None
+        self._start: Optional[int] = None
+        self._depth = 0
+        # Whether the scan stopped inside a string
+        self._in_string = False
+
+    def restart_after(self, offset: int):
+        '''Forget the object being framed, and scan again after "offset"'''
+        self._position = offset + 1
+        self._start = None
+        self._depth = 0
+        self._in_string = False
+
+    def search(self, buffer: ReceptionBuffer) -> Optional[Tuple[int, int]]:
+        '''Return the start and end stream offsets of the first complete
+        object in the buffer, or None if not received yet'''
+        if self._position is None:
+            self._position = buffer.start_offset
+
+        if self._start is not None and self._start < buffer.start_offset:
+            raise ConsoleInvalidJSONReceivedError(
+                'Start of the JSON data was dropped from the reception buffer')
+
+        position = max(self._position, buffer.start_offset)
+        if self._depth == 0:
+            object_start = buffer.search(_OBJECT_START, position)
+            if not object_start:
+                self._position = buffer.end_offset
+                return None
+
+            self._start = buffer.start_offset + object_start.start()
+            self._depth = 1
+            position = self._start + 1
+
+        self._position = self._scan_object(buffer, position)
+        if self._depth == 0 and self._start is not None:
+            self._check_size(self._position)
+            return self._start, self._position
+
+        self._check_size(buffer.end_offset)
+        return None
+
+    def _scan_object(self, buffer: ReceptionBuffer, position: int) -> int:
+        '''Scan the object being framed from "position", and return the
+        offset from which to resume, or the end of the object'''
+        if self._in_string:
+            string_end = buffer.match(_STRING_END, position)
+            assert string_end is not None
+            position = self._skip_string(buffer, string_end)
+            if self._in_string:
+                return position
+
+        for token in buffer.finditer(_OBJECT_TOKEN, position):
+            char = token.group(0)[0]
+            if char == ord('{'):
+                self._depth += 1
+            elif char == ord('}'):
+                self._depth -= 1
+                if self._depth == 0:
+                    return buffer.start_offset + token.end()
+            elif token.group(1) is None:
+                return self._skip_string(buffer, token)
+
+        return buffer.end_offset
+
+    def _skip_string(self, buffer: ReceptionBuffer, string_end: Match[bytes]) -> int:
+        '''Return the offset after a string matched up to its end, or from
+        which to resume scanning it once the rest is received'''
+        self._in_string = string_end.group(1) is None
+        end = buffer.start_offset + string_end.end()
+        # The character escaped by a trailing backslash is not received yet
+        return end - 1 if string_end.group(2) else end
+
+    def _check_size(self, end: int):
+        if (self.max_size is not None and self._start is not None
+                and end - self._start > self.max_size):
+            raise ConsoleInvalidJSONReceivedError(
+                f'JSON data exceeds the maximum size of {self.max_size} bytes')
@@ -0,0 +1,134 @@
+import re
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Pattern, Tuple, Union
+
+from .receptionbuffer import ReceptionBuffer
+
+# Patterns that cannot be combined in a single regex without changing
+# their meaning: numbered back references, conditionals and inline flags.
+_NOT_COMBINABLE_REGEX = re.compile(rb'\\[1-9]|\(\?\(|\(\?[aiLmsux]+\)')
+
+
+@dataclass(frozen=True)
+class PatternMatch:
+    '''Match found by a PatternMatcher'''
+    index: int
+    pattern: str
+    start: int
+    end: int
+    matched: bytes
+
+
+@lru_cache(maxsize=256)
+def _compile_patterns(patterns: Tuple[str, ...],
+                      encoding: str) -> Tuple[Tuple[Pattern[bytes], ...],
+                                              Optional[Pattern[bytes]]]:
+    '''Compile a list of patterns, and a regex matching any of them if possible'''
+    encoded = tuple(pattern.encode(encoding) for pattern in patterns)
+    compiled = tuple(re.compile(pattern) for pattern in encoded)
+
+    if len(encoded) < 2 or any(_NOT_COMBINABLE_REGEX.search(p) for p in encoded):
+        return compiled, None
+
+    try:
+        combined = re.compile(b'|'.join(b'(?:' + pattern + b')' for pattern in encoded))
+    except re.error:
+        combined = None
+
+    return compiled, combined
+
+
+class PatternMatcher:
+    '''Search data received in a ReceptionBuffer for several regexes at once.
+
+    The first match in the data is returned, and if several patterns match
+    at the same position, the first pattern in the list wins, as with
+    pexpect. Patterns are compiled once and cached, and combined in a single
+    regex when possible, so that the data is scanned only once.
+
+    Successive searches only scan data received since the previous search,
+    plus "overlap" bytes before it, to find matches spanning both. Set
+    "overlap" to None to always scan all the data from the first search.
+    '''
+
+    def __init__(self, patterns: Union[str, List[str]], encoding: str = 'ascii',
+                 overlap: Optional[int] = None):
+        if isinstance(patterns, str):
+            patterns = [patterns]
+
+        self.patterns = list(patterns)
+        self.overlap = overlap
+        self._compiled, self._combined = _compile_patterns(tuple(self.patterns), encoding)
+        self._scan_start: Optional[int] = None
+        self._scanned_end: Optional[int] = None
+
+    def reset(self):
+        '''Forget about the data already scanned'''
+        self._scan_start = None
+        self._scanned_end = None
+
+    def search(self, buffer: ReceptionBuffer,
+               start_offset: Optional[int] = None) -> Optional[PatternMatch]:
+        '''Search the buffer for the first match of any pattern.
+
+        If "start_offset" is set, search from this stream offset instead,
+        e.g. to find the next match after a previous one.
+        '''
+        if not self.patterns:
+            return None
+
+        if self._scan_start is None or self._scanned_end is None:
+            self._scan_start = buffer.start_offset
+            self._scanned_end = buffer.start_offset
+
+        if start_offset is not None:
+            position = start_offset
+        elif self.overlap is None:
+            position = self._scan_start
+        else:
+            position = max(self._scan_start, self._scanned_end - self.overlap)
+        position = max(position, buffer.start_offset)
+        self._scanned_end = buffer.end_offset
+
+        if self._combined is not None:
+            return self._search_combined(buffer, self._combined, position)
+        else:
+            return self._search_each(buffer, position)
+
+    def _search_combined(self, buffer: ReceptionBuffer, combined: Pattern[bytes],
+                         position: int) -> Optional[PatternMatch]:
+        combined_match = buffer.search(combined, position)
+        if not combined_match:
+            return None
+
+        # Find which pattern matched, the first one matching at this position
+        match_offset = buffer.start_offset + combined_match.start()
+        for index, compiled in enumerate(self._compiled):
+            match = buffer.match(compiled, match_offset)
+            if match:
+                return self._pattern_match(buffer, index, match)
+
+        raise Exception('Unreachable: combined pattern matched but no single pattern did')
+
+    def _search_each(self, buffer: ReceptionBuffer,
+                     position: int) -> Optional[PatternMatch]:
+        first_match = None
+        first_index = None
+        for index, compiled in enumerate(self._compiled):
+            match = buffer.search(compiled, position)
+            if match and (first_match is None or match.start() < first_match.start()):
+                first_match = match
+                first_index = index
+
+        if first_match is None or first_index is None:
+            return None
+
+        return self._pattern_match(buffer, first_index, first_match)
+
+    def _pattern_match(self, buffer: ReceptionBuffer, index: int, match) -> PatternMatch:
+        return PatternMatch(index=index, pattern=self.patterns[index],
+                            start=buffer.start_offset + match.start(),
+                            end=buffer.start_offset + match.end(),
+                            matched=bytes(match.group(0)))
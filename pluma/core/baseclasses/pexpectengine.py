@@ -1,9 +1,10 @@
 import pexpect
 import pexpect.fdpexpect
 
-from typing import List, IO, Optional, Union
+from typing import List, Optional, Union
 
 from pluma.core.baseclasses import ConsoleEngine, MatchResult
+from .rawlogwriter import RawLogSettings, RawLogWriter
 from .logging import Logger
 
 log = Logger()
@@ -11,15 +12,32 @@ log = Logger()
 
 class PexpectEngine(ConsoleEngine):
     def __init__(self, linesep: Optional[str] = None, encoding: Optional[str] = None,
-                 raw_logfile: Optional[str] = None):
+                 raw_logfile: Optional[str] = None,
+                 reception_buffer_max_size: Optional[int] = None,
+                 read_chunk_size: Optional[int] = None, max_read_size: Optional[int] = None,
+                 raw_log_settings: Optional[RawLogSettings] = None):
+        '''Create a pexpect based engine.
+
+        "read_chunk_size" is the maximum number of bytes requested by each
+        read when draining the console, and "max_read_size" optionally caps
+        the amount of data returned by a single drain, so that a console
+        producing data continuously cannot keep the reader busy forever.
+        '''
         super().__init__(linesep=linesep, encoding=encoding,
-                         raw_logfile=raw_logfile)
+                         raw_logfile=raw_logfile,
+                         reception_buffer_max_size=reception_buffer_max_size,
+                         raw_log_settings=raw_log_settings)
+        self.read_chunk_size = read_chunk_size or 4096
+        self.max_read_size = max_read_size
         self._pex = None
 
-    def _open_process(self, command: str, log_file: Optional[IO] = None):
+        if self.read_chunk_size < 1:
+            raise ValueError('"read_chunk_size" must be a positive number of bytes')
+
+    def _open_process(self, command: str, log_file: Optional[RawLogWriter] = None):
         self._pex = pexpect.spawn(command, timeout=0.01, logfile=log_file)
 
-    def _open_fd(self, fd: int, log_file: Optional[IO] = None):
+    def _open_fd(self, fd: int, log_file: Optional[RawLogWriter] = None):
         self._pex = pexpect.fdpexpect.fdspawn(fd=fd, timeout=0.5)
         # Use the logfile_read to avoid seeing commands sent twice for TTYs.
         self._pex.logfile_read = log_file
@@ -28,6 +46,9 @@ class PexpectEngine(ConsoleEngine):
     def is_open(self):
         return bool(self._pex and self._pex.isalive())
 
+    def fileno(self) -> Optional[int]:
+        return self._pex.child_fd if self._pex and self._pex.isalive() else None
+
     def _close_fd(self):
         self._pex.close()
         self._pex = None
@@ -42,71 +63,35 @@ class PexpectEngine(ConsoleEngine):
 
     def send_control(self, char: str):
         assert self.is_open
-        if len(char) > 1:
-            raise ValueError('Only a single character can be sent as control code, '
-                             f'but got {char}')
-
-        code_ascii_value = ord(char.upper()) - ord('A') + 1
-        if code_ascii_value not in range(1, 27):
-            raise AttributeError('Control character must be A-Z')
-
-        code = bytes([code_ascii_value])
-        self._pex.send(code)
-
-    def _read_from_console(self) -> str:
-        received = ''
+        self._pex.send(self.control_code(char))
+
+    def _read_from_console(self) -> bytes:
+        # Drain everything already available in large chunks, without
+        # waiting: a timeout of 0 makes pexpect raise TIMEOUT as soon as
+        # the file descriptor has no more data ready.
+        chunks = []
+        size = 0
         try:
-            while 1:
-                received += self.decode(
-                    self._pex.read_nonblocking(1, 0.01))
+            while self.max_read_size is None or size < self.max_read_size:
+                chunk_size = self.read_chunk_size
+                if self.max_read_size is not None:
+                    chunk_size = min(chunk_size, self.max_read_size - size)
+
+                chunk = self._pex.read_nonblocking(chunk_size, timeout=0)
+                self.read_stats.read_calls += 1
+                chunks.append(chunk)
+                size += len(chunk)
         except pexpect.TIMEOUT:
             pass
         except pexpect.EOF:
             pass
 
-        return received
+        return b''.join(chunks)
 
     def wait_for_match(self, match: Union[str, List[str]],
                        timeout: Optional[float] = None) -> MatchResult:
-        '''Wait a maximum duration of 'timeout' for a matching regex'''
         assert self.is_open
-
-        timeout = timeout or self._pex.timeout
-
-        if isinstance(match, str):
-            match = [match]
-
-        log.debug(f'Waiting up to {timeout}s for patterns: {match}...')
-
-        matched_regex = None
-        try:
-            index = self._pex.expect(match, timeout)
-            matched_regex = match[index]
-        except pexpect.EOF:
-            pass
-        except pexpect.TIMEOUT:
-            pass
-
-        if matched_regex:
-            log.debug(f'Matched {matched_regex}')
-        else:
-            log.debug('No match found before timeout or EOF')
-
-        # Pexpect exposes received via '.before'
-        matched_text: Optional[bytes]
-        received: bytes = self._pex.before if self._pex.before is not None else bytes()
-        if matched_regex:
-            matched_text = self._pex.after
-            received += matched_text
-        else:
-            matched_regex = None
-            matched_text = None
-
-        text_matched = self.decode(matched_text) if matched_text else None
-        text_received = self.decode(received)
-
-        return MatchResult(regex_matched=matched_regex, text_matched=text_matched,
-                           text_received=text_received)
+        return super().wait_for_match(match=match, timeout=timeout or self._pex.timeout)
 
     def interact(self):
         assert self.is_open
@@ -0,0 +1,174 @@
+import gzip
+import mmap
+import struct
+import time
+
+from bisect import bisect_right
+from dataclasses import dataclass
+from functools import partial
+from typing import IO, Iterator, List, Optional, Tuple, Union, cast
+
+from .patternmatcher import PatternMatch, PatternMatcher
+from .receptionbuffer import ReceptionBuffer
+
+INDEX_EXTENSION = '.idx'
+INDEX_MAGIC = b'PLMAIDX1'
+# Magic, then time.monotonic() and time.time() when the index was created
+INDEX_HEADER = struct.Struct('<8sdd')
+# time.monotonic(), log offset and length of each chunk logged
+INDEX_ENTRY = struct.Struct('<dQI')
+
+
+def index_path(log_path: str) -> str:
+    '''Return the path of the timestamp index of the raw log "log_path"'''
+    return log_path + INDEX_EXTENSION
+
+
+def index_header() -> bytes:
+    '''Return the header starting a new timestamp index'''
+    return INDEX_HEADER.pack(INDEX_MAGIC, time.monotonic(), time.time())
+
+
+@dataclass(frozen=True)
+class RawLogIndexEntry:
+    '''Chunk of data logged, and the time.time() at which it was logged'''
+    time: float
+    offset: int
+    size: int
+
+
+class _Offsets:
+    '''Sequence of the log offsets of an index, for bisect'''
+
+    def __init__(self, index: 'RawLogIndex'):
+        self._index = index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __getitem__(self, position: int) -> int:
+        return self._index._entry_fields(position)[1]
+
+
+class RawLogIndex:
+    '''Timestamp index of a raw console log, written by RawLogWriter
+    alongside the log as "<log path>.idx".
+
+    The index holds one fixed size entry per chunk logged, with the time
+    it was logged and its offset in the uncompressed log. The index file
+    is memory mapped and searched with bisect, so that the timestamp of
+    any log offset is found without reading the whole index or log.
+    Entries logged after the index is opened are not visible.
+    '''
+
+    def __init__(self, log_path: str):
+        self.log_path = log_path
+        self.path = index_path(log_path)
+
+        with open(self.path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._map) < INDEX_HEADER.size:
+            self._map.close()
+            raise ValueError(f'"{self.path}" is not a raw log index: file too short')
+
+        magic, self._monotonic_origin, self._time_origin = INDEX_HEADER.unpack_from(self._map)
+        if magic != INDEX_MAGIC:
+            self._map.close()
+            raise ValueError(f'"{self.path}" is not a raw log index: invalid header')
+
+        # Ignore an entry partially written at the end of the file
+        self._count = (len(self._map) - INDEX_HEADER.size) // INDEX_ENTRY.size
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, position: int) -> RawLogIndexEntry:
+        monotonic, offset, size = self._entry_fields(position)
+        return RawLogIndexEntry(time=self._to_time(monotonic), offset=offset, size=size)
+
+    def __enter__(self) -> 'RawLogIndex':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self._map.close()
+
+    def time_at(self, offset: int) -> Optional[float]:
+        '''Return the time.time() at which the byte at log offset "offset"
+        was logged, or None if unknown'''
+        position = bisect_right(_Offsets(self), offset) - 1
+        if position < 0:
+            return None
+
+        entry = self[position]
+        if offset >= entry.offset + entry.size:
+            return None
+
+        return entry.time
+
+    def search(self, patterns: Union[str, List[str]], encoding: str = 'ascii',
+               chunk_size: int = 1024 * 1024,
+               overlap: int = 4096) -> Iterator[Tuple[PatternMatch, Optional[float]]]:
+        '''Search the log for regexes, and yield each match with the time
+        its first byte was logged.
+
+        The log is read "chunk_size" bytes at a time, decompressing it if
+        needed, so that its size does not matter. Matches can span chunks
+        for up to "overlap" bytes.
+        '''
+        matcher = PatternMatcher(patterns, encoding=encoding, overlap=overlap)
+        buffer = ReceptionBuffer(encoding=encoding, max_size=chunk_size + overlap)
+        next_match_offset = 0
+
+        with _open_log(self.log_path) as log_file:
+            for chunk in iter(partial(_read_chunk, log_file, chunk_size), b''):
+                chunk_start = buffer.end_offset
+                buffer.append(chunk)
+
+                pattern_match = matcher.search(
+                    buffer, start_offset=max(next_match_offset, chunk_start - overlap))
+                while pattern_match:
+                    # Do not find an empty match at the same position again
+                    next_match_offset = max(pattern_match.end, pattern_match.start + 1)
+                    yield pattern_match, self.time_at(pattern_match.start)
+                    pattern_match = matcher.search(buffer, start_offset=next_match_offset)
+
+    def _entry_fields(self, position: int) -> Tuple[float, int, int]:
+        if position < 0:
+            position += self._count
+        if not 0 <= position < self._count:
+            raise IndexError('Raw log index entry out of range')
+
+        return INDEX_ENTRY.unpack_from(self._map,
+                                       INDEX_HEADER.size + position * INDEX_ENTRY.size)
+
+    def _to_time(self, monotonic: float) -> float:
+        return self._time_origin + (monotonic - self._monotonic_origin)
+
+
+def _open_log(path: str) -> IO[bytes]:
+    if path.endswith('.gz'):
+        return cast(IO[bytes], gzip.open(path, 'rb'))
+
+    if path.endswith('.zst'):
+        try:
+            import zstandard  # type: ignore
+        except ImportError:
+            raise ImportError('The "zstandard" package is required to read zstd '
+                              'compressed raw logs, install it with '
+                              '"pip install zstandard"')
+
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'))
+
+    return open(path, 'rb')
+
+
+def _read_chunk(log_file: IO[bytes], size: int) -> bytes:
+    try:
+        return log_file.read(size)
+    except EOFError:
+        # Compressed log still being written
+        return b''
@@ -0,0 +1,308 @@
+import glob
+import gzip
+import os
+import re
+import threading
+import time
+
+from dataclasses import dataclass
+from typing import IO, List, Optional, cast
+
+from .logging import Logger
+from .rawlogindex import INDEX_ENTRY, index_header, index_path
+
+log = Logger()
+
+COMPRESSION_EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+
+
+@dataclass(frozen=True)
+class RawLogSettings:
+    '''Rotation and compression settings of console raw logs.
+
+    "compression" can be "gzip", or "zstd" if the "zstandard" package is
+    installed. Logs are rotated when "max_size" bytes were logged to the
+    current file, and/or at the start of each test iteration if
+    "rotate_each_iteration" is set. Only the last "backup_count" rotated
+    files are kept, if set.
+
+    If "timestamp_index" is set, a RawLogIndex is written alongside each
+    log, to find when any part of the log was received.
+    '''
+    compression: Optional[str] = None
+    max_size: Optional[int] = None
+    rotate_each_iteration: bool = False
+    backup_count: Optional[int] = None
+    timestamp_index: bool = True
+
+    def __post_init__(self):
+        if self.compression is not None and self.compression not in COMPRESSION_EXTENSIONS:
+            raise ValueError(f'Unsupported raw log compression "{self.compression}", '
+                             f'supported: {list(COMPRESSION_EXTENSIONS)}')
+
+        if self.max_size is not None and self.max_size < 1:
+            raise ValueError('"max_size" must be a positive number of bytes')
+
+        if self.backup_count is not None and self.backup_count < 0:
+            raise ValueError('"backup_count" must be positive or zero')
+
+
+class LogWriterThread:
+    '''Background daemon thread writing the data logged by RawLogWriter
+    instances to disk.
+
+    "LogWriterThread.shared()" returns the instance used by default by
+    all writers, so that a single thread serves all consoles.
+    '''
+    _shared: Optional['LogWriterThread'] = None
+    _shared_lock = threading.Lock()
+
+    # Maximum duration data logged waits before being written
+    write_interval = 0.2
+
+    def __init__(self):
+        self._writers: List['RawLogWriter'] = []
+        self._writers_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='pluma-log-writer',
+                                        daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def shared(cls) -> 'LogWriterThread':
+        '''Return the log writer thread shared by default by all writers'''
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def register(self, writer: 'RawLogWriter'):
+        with self._writers_lock:
+            self._writers.append(writer)
+
+    def unregister(self, writer: 'RawLogWriter'):
+        with self._writers_lock:
+            if writer in self._writers:
+                self._writers.remove(writer)
+
+    def wake(self):
+        '''Write pending data now, rather than at the next interval'''
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.write_interval)
+            self._wake.clear()
+
+            with self._writers_lock:
+                writers = list(self._writers)
+
+            for writer in writers:
+                try:
+                    writer.sync(flush=False)
+                except Exception as e:
+                    log.warning(f'Failed to write raw log "{writer.path}": {e}')
+
+
+class RawLogWriter:
+    '''File-like object logging console data from a background thread.
+
+    "write" only queues data in memory, so that console reception never
+    waits on the disk. Queued data is written by a LogWriterThread at
+    regular intervals, or as soon as "buffer_size" bytes are pending.
+    Compressed logs are only flushed to disk on rotation, "sync()" and
+    "close()", as flushing a compressed stream degrades its compression.
+
+    The current log is always written to "path", with the compression
+    extension appended if any. Rotated logs are renamed with an
+    increasing index, e.g. "serial.log.1.gz", "serial.log.2.gz", along
+    with their timestamp index, e.g. "serial.log.1.gz.idx".
+    '''
+
+    def __init__(self, path: str, settings: Optional[RawLogSettings] = None,
+                 buffer_size: int = 64 * 1024,
+                 writer_thread: Optional[LogWriterThread] = None):
+        self.settings = settings or RawLogSettings()
+        self.buffer_size = buffer_size
+        self._writer_thread = writer_thread or LogWriterThread.shared()
+        self._extension = COMPRESSION_EXTENSIONS.get(self.settings.compression or '', '')
+        self.path = path + self._extension
+        self._base_path = path
+        self._pending = bytearray()
+        self._index_pending = bytearray()
+        # Offset in the current file of the next byte written
+        self._logged_size = 0
+        # "_lock" protects the data pending, "_file_lock" the file written
+        self._lock = threading.Lock()
+        self._file_lock = threading.RLock()
+        self._file: Optional[IO[bytes]] = None
+        self._index_file: Optional[IO[bytes]] = None
+        self._file_size = 0
+        self._closed = False
+
+        dirpath = os.path.dirname(self.path)
+        if dirpath:
+            os.makedirs(dirpath, exist_ok=True)
+
+        self._next_index = self._last_rotated_index() + 1
+        self._file = self._open_file(self.path)
+        self._index_file = self._open_index(self.path)
+        self._writer_thread.register(self)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def rotated_paths(self) -> List[str]:
+        '''Paths of the rotated logs still on disk, oldest first'''
+        indexed_paths = ((self._rotated_index(path), path)
+                         for path in glob.glob(self._rotated_path('*')))
+        return [path for index, path in sorted(
+            (index, path) for index, path in indexed_paths if index is not None)]
+
+    def write(self, data: bytes) -> int:
+        '''Queue data to be written to the log'''
+        if self._closed or not data:
+            return 0
+
+        with self._lock:
+            if self.settings.timestamp_index:
+                self._index_pending += INDEX_ENTRY.pack(time.monotonic(),
+                                                        self._logged_size, len(data))
+            self._logged_size += len(data)
+            self._pending += data
+            pending_size = len(self._pending)
+
+        if pending_size >= self.buffer_size:
+            self._writer_thread.wake()
+
+        return len(data)
+
+    def flush(self):
+        '''Does nothing, as data is written in the background. Use "sync()"
+        to wait for data to be written'''
+
+    def sync(self, flush: bool = True):
+        '''Write all queued data to the log, and flush it to disk if "flush"'''
+        with self._file_lock:
+            if self._file is None:
+                return
+
+            written = self._write_pending()
+            if (self.settings.max_size is not None
+                    and self._file_size >= self.settings.max_size):
+                self.rotate()
+            elif flush or (written and not self.settings.compression):
+                self._file.flush()
+                if self._index_file:
+                    self._index_file.flush()
+
+    def rotate(self):
+        '''Start a new log file, keeping the current one as a rotated log'''
+        with self._file_lock:
+            if self._file is None:
+                return
+
+            self._write_pending(new_file=True)
+            self._file.close()
+            rotated_path = self._rotated_path(self._next_index)
+            os.replace(self.path, rotated_path)
+            if self._index_file:
+                self._index_file.close()
+                os.replace(index_path(self.path), index_path(rotated_path))
+
+            self._next_index += 1
+            self._remove_old_logs()
+
+            self._file = self._open_file(self.path)
+            self._index_file = self._open_index(self.path)
+            self._file_size = 0
+
+    def start_iteration(self):
+        '''Notify that a new test iteration starts, to rotate the log if
+        configured to do so'''
+        if self.settings.rotate_each_iteration:
+            self.rotate()
+
+    def close(self):
+        '''Write all queued data, and close the log'''
+        if self._closed:
+            return
+
+        self._closed = True
+        self._writer_thread.unregister(self)
+        with self._file_lock:
+            self.sync()
+            if self._file:
+                self._file.close()
+                self._file = None
+            if self._index_file:
+                self._index_file.close()
+                self._index_file = None
+
+    def _write_pending(self, new_file: bool = False) -> int:
+        '''Write queued data to the file, and return its size. If
+        "new_file" is set, data queued later is for the next file'''
+        with self._lock:
+            data = bytes(self._pending)
+            self._pending.clear()
+            index_data = bytes(self._index_pending)
+            self._index_pending.clear()
+            if new_file:
+                self._logged_size = 0
+
+        if data and self._file:
+            self._file.write(data)
+            self._file_size += len(data)
+
+        if index_data and self._index_file:
+            self._index_file.write(index_data)
+
+        return len(data)
+
+    def _open_file(self, path: str) -> IO[bytes]:
+        if self.settings.compression == 'gzip':
+            return cast(IO[bytes], gzip.open(path, 'wb'))
+
+        if self.settings.compression == 'zstd':
+            try:
+                import zstandard  # type: ignore
+            except ImportError:
+                raise ImportError('The "zstandard" package is required for zstd '
+                                  'compressed raw logs, install it with '
+                                  '"pip install zstandard"')
+
+            return zstandard.ZstdCompressor().stream_writer(open(path, 'wb'))
+
+        return open(path, 'wb')
+
+    def _open_index(self, path: str) -> Optional[IO[bytes]]:
+        if not self.settings.timestamp_index:
+            return None
+
+        index_file = open(index_path(path), 'wb')
+        index_file.write(index_header())
+        return index_file
+
+    def _rotated_path(self, index) -> str:
+        return f'{self._base_path}.{index}{self._extension}'
+
+    def _rotated_index(self, path: str) -> Optional[int]:
+        match = re.fullmatch(re.escape(self._base_path) + r'\.(\d+)'
+                             + re.escape(self._extension), path)
+        return int(match.group(1)) if match else None
+
+    def _last_rotated_index(self) -> int:
+        paths = self.rotated_paths
+        return (self._rotated_index(paths[-1]) or 0) if paths else 0
+
+    def _remove_old_logs(self):
+        if self.settings.backup_count is None:
+            return
+
+        rotated_paths = self.rotated_paths
+        for path in rotated_paths[:max(len(rotated_paths) - self.settings.backup_count, 0)]:
+            os.remove(path)
+            if os.path.exists(index_path(path)):
+                os.remove(index_path(path))
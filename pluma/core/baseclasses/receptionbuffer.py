@@ -0,0 +1,281 @@
+import codecs
+
+from bisect import bisect_right
+from collections import deque
+from typing import Deque, Iterator, List, Optional, Pattern, Match, Tuple
+
+
+class ReceptionBuffer:
+    '''Buffer of raw bytes received on a console, decoded on demand.
+
+    Data is stored as bytes and only decoded when text is requested, using
+    an incremental decoder, so that multi-byte characters split across two
+    chunks are decoded correctly.
+    If "max_size" is set, the buffer behaves as a ring buffer and only
+    keeps the most recent "max_size" bytes. Bytes removed are skipped with
+    an offset, and only deleted from memory once they outnumber the bytes
+    held, and the decoded text is trimmed along with them, so that each
+    chunk received costs the same whatever the buffer size.
+
+    Offsets are absolute positions in the stream of bytes appended since
+    the buffer was created, starting from "start_offset", and are not
+    affected by data being flushed or dropped.
+    '''
+
+    # Minimum number of bytes removed before they are deleted from memory
+    compaction_size = 64 * 1024
+
+    def __init__(self, encoding: str, max_size: Optional[int] = None,
+                 start_offset: int = 0):
+        if max_size is not None and max_size < 1:
+            raise ValueError('"max_size" must be a positive number of bytes')
+
+        self.encoding = encoding
+        self.max_size = max_size
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        self._data = bytearray()
+        # Number of bytes at the start of "_data" which were removed
+        self._head = 0
+        self._view: Optional[memoryview] = None
+        self._start_offset = start_offset
+        # Decoded text, in pieces from "start_offset", each ending on a
+        # character boundary at the stream offset given
+        self._pieces: Deque[Tuple[int, str]] = deque()
+        self._text: Optional[str] = ''
+        # Stream offset up to which bytes were fed to the decoder
+        self._decoded_offset = start_offset
+        # End offset and arrival time of each chunk held
+        self._chunk_ends: List[int] = []
+        self._chunk_times: List[float] = []
+
+    @property
+    def size(self) -> int:
+        '''Number of bytes currently held in the buffer'''
+        return len(self._data) - self._head
+
+    @property
+    def start_offset(self) -> int:
+        '''Stream offset of the first byte held in the buffer'''
+        return self._start_offset
+
+    @property
+    def end_offset(self) -> int:
+        '''Stream offset following the last byte held, i.e. the total
+        number of bytes appended to the buffer'''
+        return self._start_offset + self.size
+
+    @property
+    def raw(self) -> bytes:
+        '''Bytes currently held in the buffer'''
+        return bytes(self._data[self._head:])
+
+    @property
+    def text(self) -> str:
+        '''Decoded content of the buffer.
+
+        Trailing bytes of an incomplete character are not included until
+        the rest of the character is received.
+        '''
+        self._decode()
+        if self._text is None:
+            self._text = ''.join(text for __, text in self._pieces)
+
+        return self._text
+
+    def append(self, data: bytes, timestamp: Optional[float] = None):
+        '''Append received bytes to the buffer, optionally recording the
+        time at which they arrived'''
+        if not data:
+            return
+
+        self._release_view()
+        self._data += data
+
+        if timestamp is not None:
+            self._chunk_ends.append(self.end_offset)
+            self._chunk_times.append(timestamp)
+
+        if self.max_size is not None and self.size > self.max_size:
+            self._drop(self.size - self.max_size)
+
+    def time_at(self, offset: int) -> Optional[float]:
+        '''Return the arrival time of the byte at stream offset "offset",
+        or None if unknown'''
+        if not self._start_offset <= offset < self.end_offset:
+            return None
+
+        index = bisect_right(self._chunk_ends, offset)
+        if index >= len(self._chunk_times):
+            return None
+
+        return self._chunk_times[index]
+
+    def search(self, pattern: Pattern[bytes], start_offset: int) -> Optional[Match[bytes]]:
+        '''Search for "pattern" in the buffer, from stream offset "start_offset".
+        Positions in the match returned are relative to the start of the buffer.'''
+        return pattern.search(self._held(), max(start_offset - self._start_offset, 0))
+
+    def finditer(self, pattern: Pattern[bytes], start_offset: int) -> Iterator[Match[bytes]]:
+        '''Iterate over the matches of "pattern" in the buffer, from stream offset
+        "start_offset". Positions in the matches are relative to the start of the buffer.'''
+        return pattern.finditer(self._held(), max(start_offset - self._start_offset, 0))
+
+    def match(self, pattern: Pattern[bytes], offset: int) -> Optional[Match[bytes]]:
+        '''Match "pattern" in the buffer at stream offset "offset".
+        Positions in the match returned are relative to the start of the buffer.'''
+        return pattern.match(self._held(), offset - self._start_offset)
+
+    def peek(self, start_offset: int, end_offset: int) -> bytes:
+        '''Return the bytes held between two stream offsets'''
+        start = max(start_offset, self._start_offset)
+        return self._bytes(start, max(min(end_offset, self.end_offset), start))
+
+    def consume(self, end_offset: int) -> str:
+        '''Remove and return the decoded data up to stream offset "end_offset"'''
+        end_offset = min(max(end_offset, self._start_offset), self.end_offset)
+
+        # Bytes of an incomplete character at the end are kept
+        self._decode()
+        end_offset = self._split_pieces(end_offset)
+        pieces = []
+        while self._pieces and self._pieces[0][0] <= end_offset:
+            pieces.append(self._pieces.popleft()[1])
+
+        self._text = None
+        self._remove(end_offset - self._start_offset)
+        return ''.join(pieces)
+
+    def consume_bytes(self, end_offset: int) -> bytes:
+        '''Remove and return the raw bytes up to stream offset "end_offset",
+        even if they end in the middle of a character'''
+        end_offset = min(max(end_offset, self._start_offset), self.end_offset)
+        data = self._bytes(self._start_offset, end_offset)
+        self._drop(len(data))
+        return data
+
+    def flush(self) -> str:
+        '''Return the decoded content of the buffer, and remove it.
+
+        Bytes of an incomplete character are kept in the buffer, to be
+        decoded along with the next chunk received.
+        '''
+        text = self.text
+        self._remove(self._text_end - self._start_offset)
+        self._pieces.clear()
+        self._text = ''
+        return text
+
+    def clear(self):
+        '''Remove all data from the buffer, including incomplete characters'''
+        self._remove(self.size)
+        self._decoder.reset()
+        self._decoded_offset = self._start_offset
+        self._pieces.clear()
+        self._text = ''
+
+    @property
+    def _text_end(self) -> int:
+        '''Stream offset following the last character decoded'''
+        return self._pieces[-1][0] if self._pieces else self._start_offset
+
+    def _bytes(self, start_offset: int, end_offset: int) -> bytes:
+        return bytes(self._data[self._head + start_offset - self._start_offset:
+                                self._head + end_offset - self._start_offset])
+
+    def _held(self) -> memoryview:
+        '''View of the bytes held, so that regexes match from their start'''
+        if self._view is None:
+            self._view = memoryview(self._data)[self._head:]
+
+        return self._view
+
+    def _release_view(self):
+        '''Release the view of the bytes held, so that they can be resized'''
+        if self._view is None:
+            return
+
+        view, self._view = self._view, None
+        try:
+            view.release()
+        except BufferError:
+            # Still used by a regex iterator: leave it the current bytes
+            self._data = self._data[self._head:]
+            self._head = 0
+
+    def _decode(self):
+        '''Decode the bytes received since the last call'''
+        if self._decoded_offset >= self.end_offset:
+            return
+
+        text = self._decoder.decode(self._bytes(self._decoded_offset, self.end_offset))
+        pending, __ = self._decoder.getstate()
+        self._decoded_offset = self.end_offset
+        if text:
+            self._pieces.append((self.end_offset - len(pending), text))
+            self._text = None
+
+    def _split_pieces(self, offset: int) -> int:
+        '''Make the start of the character holding "offset" the end of a
+        decoded piece, and return it'''
+        if offset >= self._text_end:
+            return self._text_end
+
+        index = 0
+        piece_start = self._start_offset
+        while self._pieces[index][0] <= offset:
+            piece_start = self._pieces[index][0]
+            index += 1
+
+        piece_end = self._pieces[index][0]
+        if offset == piece_start:
+            return offset
+
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors='replace')
+        head = decoder.decode(self._bytes(piece_start, offset))
+        pending, __ = decoder.getstate()
+        offset -= len(pending)
+        if offset > piece_start:
+            # The pending bytes of the head are decoded again with the tail
+            decoder.reset()
+            tail = decoder.decode(self._bytes(offset, piece_end), final=True)
+            self._pieces[index] = (piece_end, tail)
+            self._pieces.insert(index, (offset, head))
+
+        return offset
+
+    def _drop(self, size: int):
+        '''Drop the oldest "size" bytes from the buffer, and their text'''
+        text_end = self._text_end
+        piece_start = self._start_offset
+        self._remove(size)
+
+        while self._pieces and self._pieces[0][0] <= self._start_offset:
+            piece_start = self._pieces.popleft()[0]
+            self._text = None
+
+        if self._pieces and piece_start < self._start_offset:
+            # Decode the rest of the piece which was cut
+            piece_end = self._pieces[0][0]
+            self._pieces[0] = (piece_end, self._bytes(self._start_offset, piece_end).decode(
+                self.encoding, errors='replace'))
+            self._text = None
+        elif self._start_offset > text_end:
+            # Bytes of an incomplete character were dropped
+            self._decoder.reset()
+            self._decoded_offset = self._start_offset
+
+    def _remove(self, size: int):
+        '''Remove the first "size" bytes held, and their chunk times'''
+        if not size:
+            return
+
+        self._release_view()
+        self._head += size
+        self._start_offset += size
+        if not self.size or self._head >= max(self.size, self.compaction_size):
+            del self._data[:self._head]
+            self._head = 0
+
+        chunks_removed = bisect_right(self._chunk_ends, self._start_offset)
+        del self._chunk_ends[:chunks_removed]
+        del self._chunk_times[:chunks_removed]
@@ -1,10 +1,17 @@
+import threading
 import time
-from typing import Dict, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Union
 
 from pluma.core.dataclasses import SystemContext
-from pluma.core.baseclasses import ConsoleBase, HardwareBase, PowerBase, StorageBase
+from pluma.core.baseclasses import ConsoleBase, ConsoleError, HardwareBase, PowerBase, \
+    StorageBase
 from pluma.core import ConsoleExceptionKeywordReceivedError, \
-    BoardFieldInstanceIsNoneError, BoardBootValidationError
+    BoardFieldInstanceIsNoneError, BoardBootValidationError, BoardConsoleWarmUpError
+from .consolewatcher import ConsoleWatcher
+from .sshconsole import SSHConsole
+from .sshsessionpool import SSHSessionPool
 
 
 class Board(HardwareBase):
@@ -13,12 +20,19 @@ class Board(HardwareBase):
                  console: Union[ConsoleBase, Dict[str, ConsoleBase]] = None,
                  bootstr: str = None, boot_max_s: int = None,
                  login_user_match: str = None, login_pass_match: str = None,
-                 system: SystemContext = None):
+                 system: SystemContext = None, watcher: Optional[ConsoleWatcher] = None,
+                 session_pool: Optional[SSHSessionPool] = None):
         self.name = name
         self.power = power
         self.storage = storage
         self.hub = hub
+        # Scans the consoles for exceptions, such as kernel panics
+        self.watcher = watcher
+        # Sessions used by tests running concurrently on the target
+        self.session_pool = session_pool
 
+        # Console used instead of the current one by a thread, see thread_console
+        self._thread_state = threading.local()
         self._current_console_name: Optional[str] = None
         self._consoles: Dict[str, ConsoleBase] = {}
         self.consoles = console
@@ -31,6 +45,8 @@ class Board(HardwareBase):
 
         self.last_boot_len: Optional[float] = None
         self.booted_to_prompt = False
+        # Time taken by each console to be ready, see warm_up_consoles
+        self.console_open_times: Dict[str, float] = {}
 
         self.log_recurse = True
 
@@ -39,6 +55,10 @@ class Board(HardwareBase):
 
     @property
     def console(self) -> Optional[ConsoleBase]:
+        thread_console = getattr(self._thread_state, 'console', None)
+        if thread_console:
+            return thread_console
+
         if self._current_console_name:
             return self.consoles[self._current_console_name]
         else:
@@ -82,6 +102,16 @@ class Board(HardwareBase):
 
         self._consoles = new_consoles
 
+    @contextmanager
+    def thread_console(self, console: ConsoleBase) -> Iterator[ConsoleBase]:
+        '''Use "console" as the board console in the current thread only'''
+        previous = getattr(self._thread_state, 'console', None)
+        self._thread_state.console = console
+        try:
+            yield console
+        finally:
+            self._thread_state.console = previous
+
     def get_console(self, console_name: str = None) -> Optional[ConsoleBase]:
         '''Get a specific console from the Board.'''
         if console_name:
@@ -89,6 +119,48 @@ class Board(HardwareBase):
         else:
             return self.console
 
+    def warm_up_consoles(self) -> Dict[str, float]:
+        '''Open all consoles concurrently, logging in or checking the prompt,
+        and return the time taken by each console to be ready'''
+        consoles: Dict[str, ConsoleBase] = {}
+        for name, console in (self.consoles or {}).items():
+            if console not in consoles.values():
+                consoles[name] = console
+
+        if not consoles:
+            return {}
+
+        self.log(f'Opening consoles {list(consoles)}')
+        with ThreadPoolExecutor(max_workers=len(consoles)) as executor:
+            futures = {name: executor.submit(self._warm_up_console, console)
+                       for name, console in consoles.items()}
+
+        errors = []
+        for name, future in futures.items():
+            try:
+                self.console_open_times[name] = future.result()
+            except Exception as e:
+                errors.append(f'{name}: {e!r}')
+
+        if errors:
+            raise BoardConsoleWarmUpError(
+                f'Failed to open consoles: {", ".join(errors)}')
+
+        return {name: self.console_open_times[name] for name in consoles}
+
+    def _warm_up_console(self, console: ConsoleBase) -> float:
+        start_time = time.monotonic()
+        with self.thread_console(console):
+            console.require_open()
+            if console.requires_login:
+                self.login()
+            elif console.prompt_regex:
+                (__, matched) = console.send_and_expect('', match=console.prompt_regex)
+                if not matched:
+                    raise ConsoleError(f'No prompt detected on {console}')
+
+        return round(time.monotonic() - start_time, 3)
+
     def reboot_and_validate(self, override_bootstr=None, override_timeout=None,
                             exception_bootstr=None):
         timeout = override_timeout or self.boot_max_s
@@ -117,6 +189,16 @@ class Board(HardwareBase):
 
         self.booted_to_prompt = False
         self.last_boot_len = None
+        # The shell conditioning of every console is lost on reboot, and SSH
+        # sessions do not survive it, being reopened once the server is ready
+        self.console.prompt_token = None
+        for console in self.consoles.values():
+            console.prompt_token = None
+            if isinstance(console, SSHConsole):
+                console.close()
+        if self.session_pool:
+            self.session_pool.close()
+
         self.power.reboot()
         start_time = time.time()
         try:
@@ -149,15 +231,16 @@ class Board(HardwareBase):
 
         if self.booted_to_prompt:
             self.log('Booted to prompt. Not need to log in')
-            return
-
-        self.console.login(
-            username=self.system.credentials.login,
-            password=self.system.credentials.password,
-            username_match=self.login_user_match,
-            password_match=self.login_pass_match,
-            success_match=self.system.prompt_regex
-        )
+        else:
+            self.console.login(
+                username=self.system.credentials.login,
+                password=self.system.credentials.password,
+                username_match=self.login_user_match,
+                password_match=self.login_pass_match,
+                success_match=self.system.prompt_regex
+            )
+
+        self.console.condition_shell()
 
 
 def get_board_by_name(boards, name):
@@ -9,3 +9,7 @@ class BoardBootValidationError(BoardError):
 
 class BoardFieldInstanceIsNoneError(BoardError):
     pass
+
+
+class BoardConsoleWarmUpError(BoardError):
+    pass
@@ -0,0 +1,203 @@
+import threading
+import time
+
+from functools import partial
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Union
+
+from .baseclasses import (ConsoleBase, ConsoleExceptionKeywordReceivedError,
+                          ConsoleSubscription, Logger, PatternMatcher, ReceptionBuffer)
+
+log = Logger()
+
+
+@dataclass(frozen=True)
+class WatcherHit:
+    '''Exception pattern found by a ConsoleWatcher'''
+    console: str
+    pattern: str
+    text_matched: str
+    # Stream offset of the match on its console, and time.time() of detection
+    offset: int
+    time: float
+    # Data received on the console before the match, and up to the end
+    # of the chunk it was received in
+    snapshot: str
+
+    def to_dict(self) -> dict:
+        return {
+            'console': self.console,
+            'pattern': self.pattern,
+            'text_matched': self.text_matched,
+            'offset': self.offset,
+            'time': self.time,
+            'snapshot': self.snapshot,
+        }
+
+
+class _WatchedConsole:
+    '''Scanning state of a console watched by a ConsoleWatcher'''
+
+    def __init__(self, name: str, console: ConsoleBase):
+        self.name = name
+        self.console = console
+        self.buffer: Optional[ReceptionBuffer] = None
+        self.matcher: Optional[PatternMatcher] = None
+        self.subscription: Optional[ConsoleSubscription] = None
+        # Stream offset from which the next match can start
+        self.next_match_offset = 0
+
+
+class ConsoleWatcher:
+    '''Continuously scan data received on consoles for exception patterns,
+    such as kernel panics, oopses or segmentation faults.
+
+    Patterns are searched on all data received, whether a test waits on
+    the console or not, using the background reader of each console. On a
+    match, a WatcherHit is recorded with the last "snapshot_size" bytes
+    received on the console. If "abort" is set, any wait on the watched
+    consoles then raises a ConsoleExceptionKeywordReceivedError, so that
+    the test running fails immediately.
+
+    Hits are collected with "pop_hits()", which the TestRunner does after
+    each test task to save them in the test results. This also cancels
+    aborts that no wait raised, so that they do not fail later commands.
+    '''
+
+    DEFAULT_PATTERNS = [
+        r'Kernel panic - not syncing',
+        r'Internal error: Oops',
+        r'\bOops: ',
+        r'\bBUG: ',
+        r'Unable to handle kernel',
+        r'Segmentation fault',
+        r'segfault at ',
+    ]
+
+    # Bytes scanned again before new data, to find matches spanning chunks
+    match_overlap = 4096
+
+    def __init__(self, consoles: Union[ConsoleBase, Dict[str, ConsoleBase]],
+                 patterns: Optional[List[str]] = None, snapshot_size: int = 16 * 1024,
+                 abort: bool = False):
+        if isinstance(consoles, ConsoleBase):
+            consoles = {'main': consoles}
+
+        if snapshot_size < 1:
+            raise ValueError('"snapshot_size" must be a positive number of bytes')
+
+        self.patterns = list(patterns) if patterns is not None else self.DEFAULT_PATTERNS
+        self.snapshot_size = snapshot_size
+        self.abort = abort
+        self._consoles = [_WatchedConsole(name, console) for name, console in consoles.items()]
+        self._hits: List[WatcherHit] = []
+        self._hits_lock = threading.Lock()
+        self._abort_threads: List[threading.Thread] = []
+        self._running = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self):
+        '''Start watching the consoles, and their background reader.'''
+        if self._running:
+            return
+
+        for watched in self._consoles:
+            engine = watched.console.engine
+            watched.matcher = PatternMatcher(self.patterns, encoding=engine.encoding,
+                                             overlap=self.match_overlap)
+            watched.buffer = None
+            watched.subscription = engine.subscribe(
+                callback=partial(self._on_received, watched))
+
+            # Keep reading when the console is reopened
+            watched.console.background_reader = True
+            if watched.console.is_open:
+                engine.start_reader()
+
+        self._running = True
+
+    def stop(self):
+        '''Stop watching the consoles'''
+        for watched in self._consoles:
+            if watched.subscription:
+                watched.subscription.close()
+                watched.subscription = None
+
+        self._running = False
+
+    def pop_hits(self) -> List[WatcherHit]:
+        '''Return the hits recorded since the last call, and forget them'''
+        with self._hits_lock:
+            hits, self._hits = self._hits, []
+            abort_threads, self._abort_threads = self._abort_threads, []
+
+        if hits and self.abort:
+            for thread in abort_threads:
+                thread.join()
+            for watched in self._consoles:
+                watched.console.engine.clear_abort()
+
+        return hits
+
+    def _on_received(self, watched: _WatchedConsole, data: bytes, timestamp: float):
+        '''Scan data received. Runs in the thread receiving the data'''
+        matcher = watched.matcher
+        if matcher is None:
+            return
+
+        if watched.buffer is None:
+            # The engine already holds the data, which gives its stream offset
+            start_offset = watched.console.engine.bytes_received - len(data)
+            watched.buffer = ReceptionBuffer(encoding=watched.console.engine.encoding,
+                                             max_size=self.snapshot_size,
+                                             start_offset=start_offset)
+            watched.next_match_offset = start_offset
+
+        buffer = watched.buffer
+        chunk_start = buffer.end_offset
+        buffer.append(data)
+
+        pattern_match = matcher.search(
+            buffer, start_offset=max(watched.next_match_offset,
+                                     chunk_start - self.match_overlap))
+        while pattern_match:
+            watched.next_match_offset = pattern_match.end
+            self._record_hit(watched, buffer, pattern_match)
+            pattern_match = matcher.search(buffer, start_offset=pattern_match.end)
+
+    def _record_hit(self, watched: _WatchedConsole, buffer: ReceptionBuffer, pattern_match):
+        engine = watched.console.engine
+        hit = WatcherHit(console=watched.name, pattern=pattern_match.pattern,
+                         text_matched=engine.decode(pattern_match.matched),
+                         offset=pattern_match.start, time=time.time(),
+                         snapshot=engine.decode(buffer.raw))
+
+        log.warning(f'Console "{watched.name}" received exception pattern '
+                    f'"{hit.pattern}": {hit.text_matched}')
+
+        with self._hits_lock:
+            self._hits.append(hit)
+
+        if self.abort:
+            error = ConsoleExceptionKeywordReceivedError(
+                f'Console "{watched.name}" received exception pattern "{hit.pattern}"')
+            engine.abort_waits(error)
+
+            # Other engines are aborted from another thread, as this one
+            # holds the lock of its engine, and they may be waiting for it
+            others = [other.console.engine for other in self._consoles
+                      if other is not watched]
+            if others:
+                thread = threading.Thread(target=self._abort_waits, args=(others, error),
+                                          daemon=True)
+                with self._hits_lock:
+                    self._abort_threads.append(thread)
+                thread.start()
+
+    @staticmethod
+    def _abort_waits(engines: list, error: Exception):
+        for engine in engines:
+            engine.abort_waits(error)
@@ -14,3 +14,6 @@ class SystemContext:
     '''Data class holding system related configuration'''
     prompt_regex: Optional[str] = r'\$'
     credentials: Credentials = Credentials()
+    # Set a unique prompt and disable echo and colours in shells, see
+    # ConsoleBase.condition_shell
+    condition_shell: bool = True
@@ -1,11 +1,17 @@
-from .baseclasses import ConsoleBase
+from typing import Optional
+
+from .baseclasses import ConsoleBase, ConsoleEngine, RawLogSettings
 from .dataclasses import SystemContext
 
 
 class HostConsole(ConsoleBase):
-    def __init__(self, command, system: SystemContext = None, raw_logfile: str = None):
+    def __init__(self, command, system: SystemContext = None, raw_logfile: str = None,
+                 engine: Optional[ConsoleEngine] = None, background_reader: bool = False,
+                 raw_log_settings: Optional[RawLogSettings] = None):
         self.command = command
-        super().__init__(system=system, raw_logfile=raw_logfile)
+        super().__init__(system=system, raw_logfile=raw_logfile, engine=engine,
+                         background_reader=background_reader,
+                         raw_log_settings=raw_log_settings)
 
         self._requires_login = False
 
@@ -18,8 +24,11 @@ class HostConsole(ConsoleBase):
 
     def open(self):
         self.engine.open(console_cmd=self.command)
+        self._on_opened()
 
     def interact(self):
         if not self.is_open:
             self.open()
-        self.engine.interact()
+
+        with self.engine.reader_paused():
+            self.engine.interact()
@@ -1,26 +1,46 @@
+import re
+import uuid
+
+from typing import Optional
+
 from serial import Serial
 from nanocom import Nanocom
 
-from .baseclasses import ConsoleBase, LogLevel
+from .baseclasses import ConsoleBase, ConsoleEngine, LogLevel, RawLogSettings
 from .dataclasses import SystemContext
+from .shellfiletransfer import (FileTransferSettings, FileTransferStats, ShellFileTransfer,
+                                posix_cksum)
 
 
 class SerialConsole(ConsoleBase):
     def __init__(self, port, baud, encoding=None, linesep=None,
-                 raw_logfile=None, system: SystemContext = None):
+                 raw_logfile=None, system: SystemContext = None,
+                 engine: Optional[ConsoleEngine] = None, background_reader: bool = False,
+                 raw_log_settings: Optional[RawLogSettings] = None,
+                 file_transfer_settings: Optional[FileTransferSettings] = None,
+                 runs_in_shell: bool = True, send_rate: Optional[float] = None,
+                 send_rate_tuning: bool = False):
         self.port = port
         self.baud = baud
+        self.file_transfer_settings = file_transfer_settings or FileTransferSettings()
         self._timeout = 0.001
         self._ser = None
         super().__init__(encoding=encoding, linesep=linesep,
-                         raw_logfile=raw_logfile, system=system)
+                         raw_logfile=raw_logfile, system=system, engine=engine,
+                         background_reader=background_reader,
+                         raw_log_settings=raw_log_settings)
+        self.runs_in_shell = runs_in_shell
+        self.send_rate = send_rate
+        # Find the fastest safe send rate once logged in, see tune_send_rate
+        self.send_rate_tuning = send_rate_tuning
+        self._send_rate_tuned = False
 
     def __repr__(self):
         return "SerialConsole[{}]".format(self.port)
 
     @property
     def is_open(self):
-        return super().is_open and self._ser and self._ser.isOpen()
+        return bool(super().is_open and self._ser and self._ser.isOpen())
 
     def open(self):
         self.log(f'Trying to open serial port {self.port}', level=LogLevel.DEBUG)
@@ -35,6 +55,7 @@ class SerialConsole(ConsoleBase):
         if not self.is_open:
             raise RuntimeError(f'Failed to open serial port {self.port}')
 
+        self._on_opened()
         self.log(f'Init serial {self.port} success', level=LogLevel.DEBUG)
         return
 
@@ -50,6 +71,81 @@ class SerialConsole(ConsoleBase):
         self._ser = None
         self.log("Closed serial", level=LogLevel.DEBUG)
 
+    @property
+    def support_file_copy(self) -> bool:
+        return True
+
+    def copy_to_target(self, source, destination, timeout=30) -> FileTransferStats:
+        '''Copy a file to the target through its shell, see ShellFileTransfer.
+        The console must be logged in to a shell.'''
+        transfer = ShellFileTransfer(self, settings=self.file_transfer_settings)
+        return transfer.copy_to_target(source=source, destination=destination,
+                                       timeout=timeout)
+
+    def condition_shell(self, timeout: float = 5):
+        super().condition_shell(timeout=timeout)
+        if self.send_rate_tuning and self.runs_in_shell and not self._send_rate_tuned:
+            self.tune_send_rate()
+
+    def tune_send_rate(self, probe_size: int = 1024, refine_steps: int = 3,
+                       timeout: float = 5) -> Optional[float]:
+        '''Find the fastest rate the target shell receives data at without
+        dropping any, set it as "send_rate" and return it.
+
+        A command line holding "probe_size" random characters is sent at
+        the serial line rate, then at halved rates until the target prints
+        the expected checksum of the characters. The rate is then refined
+        between the last failed and successful rates. No limit is set if
+        the line rate succeeds. If no rate succeeds, the lowest one probed
+        is used until the next shell conditioning tunes it again.
+        '''
+        line_rate = self.baud / 10
+        failed_rate = None
+        rate = line_rate
+        while not self._probe_send_rate(rate, probe_size, timeout):
+            if rate / 2 < line_rate / 64:
+                self.send_rate = rate
+                self.log(f'Failed to find a safe send rate for {self}, using {rate:.0f} B/s',
+                         level=LogLevel.WARNING)
+                return rate
+
+            failed_rate = rate
+            rate /= 2
+
+        for __ in range(refine_steps if failed_rate else 0):
+            middle_rate = (rate + failed_rate) / 2
+            if self._probe_send_rate(middle_rate, probe_size, timeout):
+                rate = middle_rate
+            else:
+                failed_rate = middle_rate
+
+        self.send_rate = rate if failed_rate else None
+        self._send_rate_tuned = True
+        self.log(f'Send rate of {self} set to {self.send_rate and round(self.send_rate)} B/s',
+                 level=LogLevel.DEBUG)
+        return self.send_rate
+
+    def _probe_send_rate(self, rate: float, probe_size: int, timeout: float) -> bool:
+        probe_id = uuid.uuid4().hex[:12]
+        payload = (uuid.uuid4().hex * (probe_size // 32 + 1))[:probe_size]
+        self.send_rate = rate
+        # The result is printed with "%s-%s", so that the command echo never matches
+        self.send_nonblocking(f"printf '%s-%s %s\\n' PLUMA {probe_id} "
+                              f'"$(printf %s {payload} | cksum)"')
+        regex = rf'PLUMA-{probe_id} (\d+) (\d+)\r?\n'
+        result = self.engine.wait_for_match(match=regex, timeout=timeout)
+        probe_match = re.match(regex, result.text_matched or '')
+        if probe_match:
+            crc, size = map(int, probe_match.groups())
+            if (crc, size) == (posix_cksum(payload.encode()), probe_size):
+                return True
+
+        # Discard the corrupted command line, which may be incomplete
+        self.send_control('c')
+        self.wait_for_quiet(quiet=0.3, sleep_time=0.1, timeout=timeout)
+        self.read_all()
+        return False
+
     def interact(self, exit_char=None):
         '''
         Take interactive control of a SerialConsole.
@@ -65,29 +161,30 @@ class SerialConsole(ConsoleBase):
         self.log('Starting interactive console')
         print(f'Press {exit_char} to exit')
 
-        com = self._logging_Nanocom(self.engine.raw_logfile, self._ser,
+        com = self._logging_Nanocom(self.engine.raw_log, self._ser,
                                     exit_character=exit_char)
 
-        com.start()
-        try:
-            com.join()
-        except KeyboardInterrupt:
-            pass
-        finally:
-            self.log('Exiting interactive console...')
-            com.close()
+        with self.engine.reader_paused():
+            com.start()
+            try:
+                com.join()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                self.log('Exiting interactive console...')
+                com.close()
 
     class _logging_Nanocom(Nanocom):
         '''
         This class just slightly modifies Nanocom to get it to log
-        received data to a file.
+        received data to the engine raw log writer, if any.
         This is done so that the text from the interactive session
         is written to the raw logfile, along with everything else.
         The reader() method is copy-pasted from Nanocom and modified.
         '''
 
-        def __init__(self, logfile, *args, **kwargs):
-            self.logfile = logfile
+        def __init__(self, raw_log, *args, **kwargs):
+            self.raw_log = raw_log
             Nanocom.__init__(self, *args, **kwargs)
 
         def reader(self):
@@ -96,8 +193,8 @@ class SerialConsole(ConsoleBase):
                     data = self.serial.read(self.serial.in_waiting or 1)
                     if data:
                         self.console.write_bytes(data)
-                        with open(self.logfile, 'ab') as f:
-                            f.write(data)
+                        if self.raw_log:
+                            self.raw_log.write(data)
             except Exception:
                 self.alive = False
                 self.console.cancel()
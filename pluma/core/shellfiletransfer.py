@@ -0,0 +1,248 @@
+import base64
+import os
+import posixpath
+import re
+import shlex
+import time
+import uuid
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional
+
+from .baseclasses import ConsoleBase, ConsoleFileTransferError, Logger
+
+log = Logger()
+
+ENCODINGS = ['base64', 'printf']
+
+
+def _crc_table() -> List[int]:
+    table = []
+    for i in range(256):
+        crc = i << 24
+        for __ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) if crc & 0x80000000 else crc << 1
+        table.append(crc & 0xFFFFFFFF)
+    return table
+
+
+_CRC_TABLE = _crc_table()
+
+
+def posix_cksum(data: bytes) -> int:
+    '''Return the CRC of "data" computed by the POSIX "cksum" command'''
+    crc = 0
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ _CRC_TABLE[(crc >> 24) ^ byte]
+
+    length = len(data)
+    while length:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ _CRC_TABLE[(crc >> 24) ^ (length & 0xFF)]
+        length >>= 8
+
+    return ~crc & 0xFFFFFFFF
+
+
+@dataclass(frozen=True)
+class FileTransferSettings:
+    '''Settings of file transfers over a shell console.
+
+    Files are sent in chunks of "chunk_size" bytes, encoded with "base64"
+    if the target has the "base64" command, or as "printf" escapes
+    otherwise. Up to "window" chunks are sent before waiting for their
+    acknowledgement, as long as they fit in "tty_buffer_size" bytes, the
+    size of the target terminal input buffer. A chunk is sent up to
+    "max_retries" more times if corrupted or lost.
+    '''
+    chunk_size: int = 768
+    window: int = 4
+    encoding: str = 'base64'
+    tty_buffer_size: int = 4096
+    max_retries: int = 5
+
+    def __post_init__(self):
+        if self.encoding not in ENCODINGS:
+            raise ValueError(f'Unsupported file transfer encoding "{self.encoding}", '
+                             f'supported: {ENCODINGS}')
+
+        for name in ['chunk_size', 'window', 'tty_buffer_size']:
+            if getattr(self, name) < 1:
+                raise ValueError(f'"{name}" must be a positive number')
+
+        if self.max_retries < 0:
+            raise ValueError('"max_retries" must be positive or zero')
+
+
+@dataclass
+class FileTransferStats:
+    '''Statistics of a file transfer, to tune the transfer settings'''
+    size: int = 0
+    chunks: int = 0
+    retransmissions: int = 0
+    # Bytes sent on the console, including encoding and commands
+    bytes_sent: int = 0
+    duration: float = 0
+
+    @property
+    def throughput(self) -> float:
+        '''File bytes transferred per second'''
+        return self.size / self.duration if self.duration else 0
+
+
+class ShellFileTransfer:
+    '''Copy files to a target through its shell console, e.g. a serial
+    console, with no agent needed on the target.
+
+    Each chunk is sent as a command line writing it at its offset in the
+    destination file with "dd", then printing the "cksum" CRC of the
+    chunk read back from the file. The CRC is checked against the chunk
+    sent, and the chunk sent again if it differs, or if the acknowledgement
+    of a chunk sent later is received first. The whole file CRC is checked
+    once all chunks are acknowledged.
+
+    Chunks are pipelined: a window of chunks is sent without waiting, but
+    never more than the target terminal can buffer, as it would drop data.
+    Raw bytes cannot be used as the terminal interprets control characters.
+    '''
+
+    def __init__(self, console: ConsoleBase, settings: Optional[FileTransferSettings] = None):
+        self.console = console
+        self.settings = settings or FileTransferSettings()
+
+    def copy_to_target(self, source: str, destination: str,
+                       timeout: float = 30) -> FileTransferStats:
+        '''Copy the host file "source" to "destination" on the target, or into
+        it if it is a directory. Fail if the target does not acknowledge any
+        chunk for "timeout" seconds.'''
+        with open(source, 'rb') as f:
+            data = f.read()
+
+        transfer_id = uuid.uuid4().hex[:12]
+        stats = FileTransferStats(size=len(data),
+                                  chunks=-(-len(data) // self.settings.chunk_size))
+        window = self._window(transfer_id)
+        start_time = time.monotonic()
+
+        target_path = shlex.quote(destination)
+        directory_path = shlex.quote(posixpath.join(destination, os.path.basename(source)))
+        # "true" rather than ":", as shells abort the line if a redirection
+        # fails on a special builtin
+        self._send(stats, f'if [ -d {target_path} ]; then pluma_t={directory_path}; '
+                          f'else pluma_t={target_path}; fi; true >"$pluma_t"; '
+                          f"printf '%s-%s ready %d\\n' PLUMA {transfer_id} $?")
+        ready = self._wait_for(transfer_id, r'ready (\d+)', timeout)
+        if not ready or ready[0] != '0':
+            raise ConsoleFileTransferError(
+                f'Failed to create "{destination}" on the target for the file transfer')
+
+        self._send_chunks(data, transfer_id, window, stats, timeout)
+
+        mode = os.stat(source).st_mode & 0o777
+        self._send(stats, f'chmod {mode:o} "$pluma_t"; '
+                          f"printf '%s-%s done %s\\n' PLUMA {transfer_id} "
+                          '"$(cksum <"$pluma_t")"; unset pluma_t')
+        done = self._wait_for(transfer_id, r'done (\d+) (\d+)', timeout)
+        if not done or (int(done[0]), int(done[1])) != (posix_cksum(data), len(data)):
+            raise ConsoleFileTransferError(
+                f'File "{source}" copied to "{destination}" on the target is corrupted')
+
+        stats.duration = time.monotonic() - start_time
+        log.debug(f'Copied "{source}" to "{destination}": {stats.size} bytes in '
+                  f'{stats.duration:.1f}s ({stats.throughput:.0f} B/s), '
+                  f'{stats.retransmissions} chunks retransmitted')
+        return stats
+
+    def _send_chunks(self, data: bytes, transfer_id: str, window: int,
+                     stats: FileTransferStats, timeout: float):
+        chunk_size = self.settings.chunk_size
+        to_send: Deque[int] = deque(range(stats.chunks))
+        # Sequence number of the last transmission of each chunk in flight
+        in_flight: Dict[int, int] = {}
+        attempts: Dict[int, int] = {}
+        sequence = 0
+
+        while to_send or in_flight:
+            while to_send and len(in_flight) < window:
+                index = to_send.popleft()
+                chunk = data[index * chunk_size:(index + 1) * chunk_size]
+                self._send(stats, self._chunk_command(transfer_id, index, sequence, chunk))
+                in_flight[index] = sequence
+                sequence += 1
+
+            ack = self._wait_for(transfer_id, r'(\d+) (\d+) (\d+) (\d+)', timeout)
+            if not ack:
+                # Nothing acknowledged in time, send all the chunks in flight again
+                lost = sorted(in_flight, key=lambda i: in_flight[i])
+            else:
+                index, ack_sequence, crc, size = map(int, ack)
+                if in_flight.get(index) != ack_sequence:
+                    # Acknowledgement of a previous transmission
+                    continue
+
+                del in_flight[index]
+                # Commands run in order, so earlier ones not acknowledged were lost
+                lost = sorted((i for i, s in in_flight.items() if s < ack_sequence),
+                              key=lambda i: in_flight[i])
+                chunk = data[index * chunk_size:(index + 1) * chunk_size]
+                if (crc, size) != (posix_cksum(chunk), len(chunk)):
+                    lost.insert(0, index)
+
+            for index in lost:
+                attempts[index] = attempts.get(index, 0) + 1
+                if attempts[index] > self.settings.max_retries:
+                    raise ConsoleFileTransferError(
+                        f'File transfer failed: chunk {index} could not be sent after '
+                        f'{self.settings.max_retries} retries')
+
+                in_flight.pop(index, None)
+                stats.retransmissions += 1
+
+            to_send.extendleft(reversed(lost))
+
+    def _chunk_command(self, transfer_id: str, index: int, sequence: int,
+                       chunk: bytes) -> str:
+        chunk_size = self.settings.chunk_size
+        if self.settings.encoding == 'base64':
+            decode = f"printf '%s' {base64.b64encode(chunk).decode()} | base64 -d"
+        else:
+            escaped = ''.join(chr(byte) if chr(byte).isalnum() and byte < 128
+                              else f'\\{byte:03o}' for byte in chunk)
+            decode = f"printf '{escaped}'"
+
+        return (f'{decode} | dd of="$pluma_t" bs={chunk_size} seek={index} '
+                'conv=notrunc 2>/dev/null; '
+                f"printf '%s-%s %d %d %s\\n' PLUMA {transfer_id} {index} {sequence} "
+                f'"$(dd if="$pluma_t" bs={chunk_size} skip={index} count=1 2>/dev/null'
+                ' | cksum)"')
+
+    def _window(self, transfer_id: str) -> int:
+        '''Return the number of chunks which can be sent at once, so that
+        their commands fit in the target terminal buffer'''
+        worst_chunk = bytes(self.settings.chunk_size)
+        line_size = len(self._chunk_command(transfer_id, 999999, 999999, worst_chunk)) + 1
+        if line_size >= self.settings.tty_buffer_size:
+            raise ConsoleFileTransferError(
+                f'File transfer chunk commands ({line_size} bytes) do not fit in the '
+                f'target terminal buffer ({self.settings.tty_buffer_size} bytes), '
+                'use a smaller chunk size')
+
+        return max(1, min(self.settings.window, self.settings.tty_buffer_size // line_size))
+
+    def _send(self, stats: FileTransferStats, command: str):
+        # Keep data received, which holds acknowledgements not read yet
+        self.console.send(command, flush_before=False)
+        stats.bytes_sent += len(command) + len(self.console.engine.linesep)
+
+    def _wait_for(self, transfer_id: str, regex: str,
+                  timeout: float) -> Optional[List[str]]:
+        '''Wait for a line printed by the transfer commands, and return the
+        groups matched in it'''
+        # Lines are printed with "%s-%s", so that the command echo never matches
+        line_regex = rf'PLUMA-{transfer_id} {regex}\r?\n'
+        result = self.console.engine.wait_for_match(match=line_regex, timeout=timeout)
+        line_match = re.match(line_regex, result.text_matched or '')
+        if not line_match:
+            return None
+
+        return list(line_match.groups())
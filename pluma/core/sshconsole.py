@@ -1,13 +1,36 @@
+import os
+import posixpath
+import shlex
 import subprocess
 
-from pluma.core.baseclasses import ConsoleCannotOpenError
+from typing import Dict, List, Optional, Tuple
+
+from pluma.core.baseclasses import (ConsoleCannotOpenError, ConsoleEngine,
+                                    ConsoleFileTransferError, DeploymentResult, Logger,
+                                    RawLogSettings)
+from pluma.core.baseclasses.filedeployment import (MANIFEST_NAME, file_manifest,
+                                                   parse_manifest, write_tar)
 from .hostconsole import HostConsole
 from .dataclasses import SystemContext
+from .sshcontrolmaster import SSHControlMaster
+from .sshreadiness import SSH_PORT, wait_for_ssh_server
+
+log = Logger()
 
 
 class SSHConsole(HostConsole):
-    def __init__(self, target: str, system: SystemContext, raw_logfile: str = None):
+    def __init__(self, target: str, system: SystemContext, raw_logfile: str = None,
+                 engine: Optional[ConsoleEngine] = None, background_reader: bool = False,
+                 raw_log_settings: Optional[RawLogSettings] = None, multiplexing: bool = True,
+                 control_master: Optional[SSHControlMaster] = None,
+                 ready_timeout: float = 60, port: Optional[int] = None):
         self.target = target
+        # SSH server port, None for the SSH client configuration or default
+        self.port = port
+        # Maximum time to wait for the SSH server when opening, e.g. after a reboot
+        self.ready_timeout = ready_timeout
+        # Time waited for the SSH server to be ready when last opened
+        self.ssh_ready_time: Optional[float] = None
 
         if not target:
             raise ValueError("A host/target must be provided for an SSH console")
@@ -18,24 +41,106 @@ class SSHConsole(HostConsole):
         login = system.credentials.login
         password = system.credentials.password
 
-        if not password:
-            command = f'ssh {login}@{target} -o StrictHostKeyChecking=no'
-        else:
-            command = \
-                f'sshpass -p {password} ssh {login}@{target}' \
-                ' -o PreferredAuthentications=password' \
-                ' -o PubkeyAuthentication=no -o StrictHostKeyChecking=no'
+        self.ssh_options = ['-o', 'StrictHostKeyChecking=no']
+        if port:
+            self.ssh_options += ['-o', f'Port={port}']
+        if password:
+            self.ssh_options += ['-o', 'PreferredAuthentications=password',
+                                 '-o', 'PubkeyAuthentication=no']
 
-        super().__init__(command, system=system, raw_logfile=raw_logfile)
+        # Connection shared by the console session and file copies, and
+        # with other consoles to the target if passed
+        self.control_master = control_master
+        if multiplexing and not control_master:
+            self.control_master = SSHControlMaster(f'{login}@{target}',
+                                                   options=self.ssh_options,
+                                                   password=password)
+
+        super().__init__(None, system=system, raw_logfile=raw_logfile, engine=engine,
+                         background_reader=background_reader,
+                         raw_log_settings=raw_log_settings)
+        self.command = ' '.join(shlex.quote(arg) for arg in self.ssh_command())
+        self.runs_in_shell = True
 
     def open(self):
+        self.wait_until_ready()
         try:
+            if self.control_master:
+                self.control_master.start()
+
             super().open()
             self.wait_for_prompt(timeout=5)
+            self.condition_shell()
         except Exception:
             self.close()
             raise ConsoleCannotOpenError
 
+    def wait_until_ready(self, timeout: Optional[float] = None) -> Optional[float]:
+        '''Wait for the SSH server of the target to accept connections, and
+        return the time waited. Raise ConsoleCannotOpenError on timeout.
+
+        Return None without waiting if the client connects through a proxy,
+        as the server may then not be reachable from the host.
+        '''
+        timeout = timeout if timeout is not None else self.ready_timeout
+        config = self.client_config()
+        if any(config.get(key, 'none') != 'none' for key in ('proxyjump', 'proxycommand')):
+            log.debug(f'SSH connection to {self.target} uses a proxy, not waiting for server')
+            return None
+
+        host, port = self.server_address(config)
+        ready_time = wait_for_ssh_server(host, port=port, timeout=timeout)
+        if ready_time is None:
+            raise ConsoleCannotOpenError(
+                f'SSH server on {host}:{port} not ready after {timeout}s')
+
+        self.ssh_ready_time = ready_time
+        log.debug(f'SSH server on {host}:{port} ready after {ready_time:.2f}s')
+        return ready_time
+
+    def server_address(self, config: Optional[Dict[str, str]] = None) -> Tuple[str, int]:
+        '''Return the host and port the SSH client connects to, resolved
+        from its configuration, e.g. for a host alias in ~/.ssh/config'''
+        config = config if config is not None else self.client_config()
+        host = config.get('hostname') or self.target
+        port = config.get('port', '')
+        return host, int(port) if port.isdigit() else self.port or SSH_PORT
+
+    def client_config(self) -> Dict[str, str]:
+        '''Return the SSH client configuration for the target, as reported by
+        "ssh -G", or an empty dictionary if it cannot be read'''
+        try:
+            output = subprocess.run(['ssh', '-G'] + self.ssh_options + [self.target],
+                                    stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL, timeout=5, check=True).stdout
+        except (OSError, subprocess.SubprocessError):
+            return {}
+
+        config = {}
+        for line in output.decode(errors='replace').splitlines():
+            key, __, value = line.partition(' ')
+            if value:
+                config[key.lower()] = value
+
+        return config
+
+    def new_session(self) -> 'SSHConsole':
+        '''Return a new console to the target, sharing the master connection'''
+        return SSHConsole(self.target, system=self.system,
+                          multiplexing=self.control_master is not None,
+                          control_master=self.control_master,
+                          ready_timeout=self.ready_timeout, port=self.port)
+
+    def ssh_command(self, remote_command: Optional[str] = None) -> List[str]:
+        '''Return the command opening an SSH session to the target, or running
+        "remote_command" on it, through the master connection if running'''
+        command = ['ssh'] + self._connection_options() + \
+            [f'{self.system.credentials.login}@{self.target}']
+        if remote_command:
+            command.append(remote_command)
+
+        return self._with_password(command)
+
     @property
     def support_file_copy(self):
         return True
@@ -49,16 +154,82 @@ class SSHConsole(HostConsole):
                               f'{self.system.credentials.login}@{self.target}:{destination}',
                               timeout=timeout)
 
-    def _scp_copy(self, scp_source, scp_destination, timeout=30):
-        command = f'scp {scp_source} {scp_destination}'
-        if self.system.credentials.password:
-            command = f'sshpass -p {self.system.credentials.password} {command}'
+    def deploy_files(self, files: List[str], destination: str,
+                     timeout=30) -> DeploymentResult:
+        '''Copy host files to the "destination" directory on the target, as a
+        single tar stream extracted on the target. Files whose size and hash
+        match the manifest left by the previous deployment are skipped.'''
+        self._start_control_master()
+        directory = shlex.quote(destination)
+        previous_manifest = subprocess.run(
+            self.ssh_command(f'cat {shlex.quote(posixpath.join(destination, MANIFEST_NAME))}'
+                             ' 2>/dev/null'),
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            timeout=timeout).stdout
+        remote_manifest = parse_manifest(previous_manifest.decode(errors='replace'))
+        local_manifest = file_manifest(files)
+
+        result = DeploymentResult()
+        for source in files:
+            name = os.path.basename(source)
+            if remote_manifest.get(name) == local_manifest[name]:
+                result.skipped.append(source)
+            else:
+                result.deployed.append(source)
+
+        if not result.deployed:
+            return result
+
+        command = self.ssh_command(f'mkdir -p {directory} && tar -xf - -C {directory}')
+        with subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                              stderr=subprocess.STDOUT) as process:
+            assert process.stdin is not None
+            try:
+                write_tar(process.stdin, result.deployed, {**remote_manifest, **local_manifest})
+            except BrokenPipeError:
+                # The remote command failed, its output is read below
+                pass
+
+            try:
+                output, _ = process.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                raise ConsoleFileTransferError(
+                    f'Failed to deploy files to "{destination}": timed out after {timeout}s')
+
+        if process.returncode != 0:
+            raise ConsoleFileTransferError(
+                f'Failed to deploy files to "{destination}" on the target:{os.linesep}'
+                f'    "{output.decode(errors="replace")}"')
 
+        return result
+
+    def _scp_copy(self, scp_source, scp_destination, timeout: float = 30):
+        self._start_control_master()
+        command_list = self._with_password(
+            ['scp'] + self._connection_options() + [scp_source, scp_destination])
         try:
-            command_list = command.split()
-            subprocess.check_output(command_list, stderr=subprocess.STDOUT)
+            subprocess.check_output(command_list, stderr=subprocess.STDOUT, timeout=timeout)
         except subprocess.CalledProcessError as e:
             raise Exception(
                 f'Failed to copy (scp) "{scp_source}" to "{scp_destination}".\n'
-                f'  Command {command} failed with error:\n'
+                f'  Command {" ".join(command_list)} failed with error:\n'
                 f'    "{e.output.decode()}"')
+
+    def _start_control_master(self):
+        if self.control_master:
+            # Restart the master if it timed out or the target rebooted
+            self.control_master.start()
+
+    def _connection_options(self) -> List[str]:
+        options = list(self.ssh_options)
+        if self.control_master:
+            options += self.control_master.client_options
+
+        return options
+
+    def _with_password(self, command: List[str]) -> List[str]:
+        if self.system.credentials.password:
+            return ['sshpass', '-p', self.system.credentials.password] + command
+
+        return command
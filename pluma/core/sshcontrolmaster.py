@@ -0,0 +1,104 @@
+import atexit
+import os
+import subprocess
+import tempfile
+
+from typing import List, Optional
+
+from .baseclasses import Logger
+
+log = Logger()
+
+
+class SSHControlMaster:
+    '''OpenSSH master connection to a target, shared by the SSH console
+    session, file copies and any other SSH channel to it.
+
+    The key exchange and authentication are done once, when the master is
+    started, instead of for every "ssh" or "scp" process. Processes use the
+    master through "client_options", and connect directly if it is not
+    running. The master is stopped when the program exits, or after
+    "idle_timeout" seconds without any client if the program is killed.
+    '''
+
+    def __init__(self, destination: str, options: Optional[List[str]] = None,
+                 password: Optional[str] = None, idle_timeout: int = 600):
+        self.destination = destination
+        self.options = options or []
+        self.password = password
+        self.idle_timeout = idle_timeout
+        # "%C" is expanded by ssh to a hash of the connection parameters
+        self.control_path = os.path.join(tempfile.gettempdir(),
+                                         f'pluma-ssh-{os.getpid()}-%C')
+        self._started = False
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}[{self.destination}]'
+
+    @property
+    def client_options(self) -> List[str]:
+        '''ssh and scp options to use the master connection'''
+        return ['-o', 'ControlMaster=no', '-o', f'ControlPath={self.control_path}']
+
+    @property
+    def is_running(self) -> bool:
+        return self._control_command('check') == 0
+
+    def start(self, timeout: float = 10) -> bool:
+        '''Start the master connection if not running yet, and return True if
+        it is running'''
+        if self.is_running:
+            return True
+
+        command = ['ssh', '-f', '-N', '-o', 'ControlMaster=yes',
+                   '-o', f'ControlPath={self.control_path}',
+                   '-o', f'ControlPersist={self.idle_timeout}']
+        command += self.options + [self.destination]
+        if self.password:
+            command = ['sshpass', '-p', self.password] + command
+
+        # The master keeps running in the background with the standard
+        # streams of ssh, so errors are written to a file rather than a pipe
+        with tempfile.TemporaryFile() as errors:
+            try:
+                process = subprocess.run(command, stdin=subprocess.DEVNULL,
+                                         stdout=subprocess.DEVNULL, stderr=errors,
+                                         timeout=timeout)
+                errors.seek(0)
+                error = errors.read().decode(errors='replace').strip()
+                returncode = process.returncode
+            except subprocess.TimeoutExpired:
+                error, returncode = f'timed out after {timeout}s', None
+            except OSError as e:
+                error, returncode = str(e), None
+
+        if returncode != 0:
+            log.warning(f'Failed to start the SSH master connection to {self.destination}, '
+                        f'connecting for each SSH session and copy instead: {error}')
+            return False
+
+        if not self._started:
+            atexit.register(self.stop)
+            self._started = True
+
+        log.debug(f'SSH master connection to {self.destination} started')
+        return True
+
+    def stop(self):
+        '''Stop the master connection, closing the sessions using it'''
+        if not self._started:
+            return
+
+        self._control_command('exit')
+        atexit.unregister(self.stop)
+        self._started = False
+
+    def _control_command(self, command: str) -> Optional[int]:
+        try:
+            return subprocess.run(['ssh', '-O', command,
+                                   '-o', f'ControlPath={self.control_path}',
+                                   self.destination],
+                                  stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                  stderr=subprocess.DEVNULL, timeout=5).returncode
+        except (subprocess.TimeoutExpired, OSError):
+            return None
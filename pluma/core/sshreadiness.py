@@ -0,0 +1,66 @@
+import errno
+import select
+import socket
+import time
+
+from typing import Optional
+
+SSH_PORT = 22
+
+
+def probe_ssh_server(host: str, port: int = SSH_PORT, timeout: float = 1) -> bool:
+    '''Return whether an SSH server accepts connections on "host", and
+    sends its identification banner, within "timeout" seconds'''
+    deadline = time.monotonic() + timeout
+    try:
+        addresses = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror:
+        return False
+
+    family, socktype, proto, __, address = addresses[0]
+    with socket.socket(family, socktype, proto) as sock:
+        # Connect without blocking, so that an unreachable host does not
+        # hold the probe for the system connection timeout
+        sock.setblocking(False)
+        error = sock.connect_ex(address)
+        if error not in (0, errno.EINPROGRESS):
+            return False
+
+        __, writable, __ = select.select([], [sock], [], max(0, deadline - time.monotonic()))
+        if not writable or sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) != 0:
+            return False
+
+        readable, __, __ = select.select([sock], [], [], max(0, deadline - time.monotonic()))
+        if not readable:
+            return False
+
+        try:
+            return sock.recv(4).startswith(b'SSH-')
+        except OSError:
+            return False
+
+
+def wait_for_ssh_server(host: str, port: int = SSH_PORT, timeout: float = 60,
+                        initial_interval: float = 0.1,
+                        max_interval: float = 2) -> Optional[float]:
+    '''Wait for an SSH server to be ready on "host", and return the time
+    waited in seconds, or None if not ready within "timeout".
+
+    The server is probed again with an exponential backoff, from
+    "initial_interval" up to "max_interval" seconds between probes.
+    '''
+    start = time.monotonic()
+    deadline = start + timeout
+    interval = initial_interval
+    while True:
+        probe_start = time.monotonic()
+        if probe_ssh_server(host, port, timeout=max(0, min(max_interval, deadline - probe_start))):
+            return time.monotonic() - start
+
+        if time.monotonic() >= deadline:
+            return None
+
+        # Refused connections fail at once, wait before probing again
+        time.sleep(max(0, min(interval - (time.monotonic() - probe_start),
+                              deadline - time.monotonic())))
+        interval = min(interval * 2, max_interval)
@@ -0,0 +1,77 @@
+import threading
+
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from .baseclasses import ConsoleError, Logger
+from .sshconsole import SSHConsole
+
+log = Logger()
+
+
+class SSHSessionPool:
+    '''Pool of SSH sessions to a target, to run commands concurrently.
+
+    Sessions are created from "console" as needed, sharing its master
+    connection, and kept open to be reused. At most "size" sessions are
+    checked out at once, which limits the load put on the target.
+    '''
+
+    def __init__(self, console: SSHConsole, size: int = 4):
+        if size < 1:
+            raise ValueError('The SSH session pool size must be a positive number')
+
+        self.console = console
+        self.size = size
+        self._semaphore = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle: List[SSHConsole] = []
+        self._sessions: List[SSHConsole] = []
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}[{self.console.target}, {self.size}]'
+
+    @contextmanager
+    def checkout(self, timeout: Optional[float] = None) -> Iterator[SSHConsole]:
+        '''Check out an open session, waiting up to "timeout" for one to be
+        available, and return it to the pool when done'''
+        if not self._semaphore.acquire(timeout=timeout):
+            raise ConsoleError(f'No SSH session available in {self} after {timeout}s')
+
+        try:
+            session = self._take_session()
+            try:
+                session.require_open()
+                yield session
+            finally:
+                self._return_session(session)
+        finally:
+            self._semaphore.release()
+
+    def close(self):
+        '''Close all sessions'''
+        with self._lock:
+            sessions, self._sessions, self._idle = self._sessions, [], []
+
+        for session in sessions:
+            session.close()
+
+    def _take_session(self) -> SSHConsole:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+
+            session = self.console.new_session()
+            self._sessions.append(session)
+            log.debug(f'{self}: opening session {len(self._sessions)}')
+            return session
+
+    def _return_session(self, session: SSHConsole):
+        with self._lock:
+            if session not in self._sessions:
+                # Pool closed while checked out
+                session.close()
+            elif session.is_open:
+                self._idle.append(session)
+            else:
+                self._sessions.remove(session)
@@ -3,78 +3,104 @@ from pluma import Board
 
 
 class FileExists(ShellTest):
+    parallel_safe = True
+
     def __init__(self, board: Board, path: str, run_on_host: bool = False):
         super().__init__(board, script=f'[ -e "{path}" ]', runs_in_shell=True,
                          run_on_host=run_on_host)
 
 
 class FileIsRegular(ShellTest):
+    parallel_safe = True
+
     def __init__(self, board: Board, path: str, run_on_host: bool = False):
         super().__init__(board, script=f'[ -f "{path}" ]', runs_in_shell=True,
                          run_on_host=run_on_host)
 
 
 class FileIsDir(ShellTest):
+    parallel_safe = True
+
     def __init__(self, board: Board, path: str, run_on_host: bool = False):
         super().__init__(board, script=f'[ -d "{path}" ]', runs_in_shell=True,
                          run_on_host=run_on_host)
 
 
 class FileIsNotEmpty(ShellTest):
+    parallel_safe = True
+
     def __init__(self, board: Board, path: str, run_on_host: bool = False):
         super().__init__(board, script=f'[ -s "{path}" ]', runs_in_shell=True,
                          run_on_host=run_on_host)
 
 
 class FileIsEmpty(ShellTest):
+    parallel_safe = True
+
     def __init__(self, board: Board, path: str, run_on_host: bool = False):
         super().__init__(board, script=f'[ ! -s "{path}" ]', runs_in_shell=True,
                          run_on_host=run_on_host)
 
 
 class FileIsCharDevice(ShellTest):
+    parallel_safe = True
+
     def __init__(self, board: Board, path: str, run_on_host: bool = False):
         super().__init__(board, script=f'[ -c "{path}" ]', runs_in_shell=True,
                          run_on_host=run_on_host)
 
 
 class FileIsBlockDevice(ShellTest):
+    parallel_safe = True
+
     def __init__(self, board: Board, path: str, run_on_host: bool = False):
         super().__init__(board, script=f'[ -b "{path}" ]', runs_in_shell=True,
                          run_on_host=run_on_host)
 
 
 class FileIsSymlink(ShellTest):
+    parallel_safe = True
+
     def __init__(self, board: Board, path: str, run_on_host: bool = False):
         super().__init__(board, script=f'[ -h "{path}" ]', runs_in_shell=True,
                          run_on_host=run_on_host)
 
 
 class FileIsSocket(ShellTest):
+    parallel_safe = True
+
     def __init__(self, board: Board, path: str, run_on_host: bool = False):
         super().__init__(board, script=f'[ -S "{path}" ]', runs_in_shell=True,
                          run_on_host=run_on_host)
 
 
 class FileIsReadable(ShellTest):
+    parallel_safe = True
+
     def __init__(self, board: Board, path: str, run_on_host: bool = False):
         super().__init__(board, script=f'[ -r "{path}" ]', runs_in_shell=True,
                          run_on_host=run_on_host)
 
 
 class FileIsWritable(ShellTest):
+    parallel_safe = True
+
     def __init__(self, board: Board, path: str, run_on_host: bool = False):
         super().__init__(board, script=f'[ -w "{path}" ]', runs_in_shell=True,
                          run_on_host=run_on_host)
 
 
 class FileIsExecutable(ShellTest):
+    parallel_safe = True
+
     def __init__(self, board: Board, path: str, run_on_host: bool = False):
         super().__init__(board, script=f'[ -x "{path}" ]', runs_in_shell=True,
                          run_on_host=run_on_host)
 
 
 class CheckFileSize(ShellTest):
+    parallel_safe = True
+
     def __init__(self, board: Board, path: str, min: str = None, max: str = None,
                  run_on_host: bool = False):
         conditions = []
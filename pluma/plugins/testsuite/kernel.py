@@ -5,6 +5,8 @@ from pluma.test import TestBase, TaskFailed, CommandRunner
 
 class KernelModulesLoaded(TestBase):
     '''Verifies that a set of kernel modules are loaded'''
+    parallel_safe = True
+
     def __init__(self, board, modules: list):
         super().__init__(board)
 
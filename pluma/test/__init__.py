@@ -6,6 +6,8 @@ from .plan import Plan
 from .testrunner import TestRunner
 from .unittest import deferred_function
 from .testcontroller import TestController
+from .outputstream import OutputStream
+from .commandframe import CommandFrame, CommandResult
 from .commandrunner import CommandRunner
 from .shelltest import ShellTest
 from .executabletest import ExecutableTest
@@ -0,0 +1,156 @@
+import codecs
+import re
+import uuid
+from dataclasses import dataclass
+from typing import List, Optional
+
+from pluma.core.baseclasses import ConsoleBase, MatchResult
+from .outputstream import OutputStream
+
+
+@dataclass
+class CommandResult:
+    '''Output and return code of a command ran by CommandRunner.
+    "stderr" is only set if the error output was read separately.'''
+    command: str
+    output: str
+    retcode: int
+    stderr: Optional[str] = None
+
+
+class CommandFrame:
+    '''Frame the output of a command ran in an existing shell session.
+
+    The command is wrapped so that the shell prints a header with a nonce,
+    the command output as it runs, and a trailer with the exit code. The
+    command is on its own line, so that it can end with "&" or a comment.
+    The output is then read up to the trailer, without stripping the
+    command echo. Only a POSIX shell is needed on the target.
+
+    If "separate_stderr" is set, the error output is returned separately,
+    otherwise it is merged with the standard output. It is then written to
+    a file in /tmp on the target, and printed after the trailer.
+
+    The standard output can also be streamed to an OutputStream as it is
+    received, instead of being held in memory in full.
+    '''
+
+    def __init__(self, command: str, separate_stderr: bool = False,
+                 frame_id: Optional[str] = None):
+        self.command = command
+        self.separate_stderr = separate_stderr
+        self.frame_id = frame_id or uuid.uuid4().hex[:12]
+        # Data received before the frame header, e.g. the command echo
+        self.unframed_output = ''
+
+    @property
+    def shell_lines(self) -> List[str]:
+        '''Shell command lines running the command and framing its output'''
+        # Markers are printed with "%s-%s", so that the echo never matches them.
+        # The header is in the group, so that it is printed after the
+        # continuation prompts of the shell.
+        tag = f'PLUMA {self.frame_id}'
+        errors = f'/tmp/pluma-{self.frame_id}.e'
+        error_redirection = f'2>{errors}' if self.separate_stderr else '2>&1'
+        trailer = (f'}} {error_redirection} ; '
+                   "printf '\\n%s-%s %d\\n' " + tag + '-end "$?"')
+        if self.separate_stderr:
+            trailer += (f' ; cat {errors} ; '
+                        "printf '\\n%s-%s\\n' " + tag + f'-err ; rm -f {errors}')
+
+        return ["{ printf '%s-%s\\n' " + tag + ' ;', self.command, trailer]
+
+    @property
+    def shell_command(self) -> str:
+        return '\n'.join(self.shell_lines)
+
+    @property
+    def header_regex(self) -> str:
+        return rf'PLUMA-{self.frame_id}(\r?)\n'
+
+    def trailer_regex(self, newlines_translated: bool) -> str:
+        '''Regex matching the trailer, and the new line printed before it'''
+        newline = r'\r\n' if newlines_translated else r'\n'
+        return rf'{newline}PLUMA-{self.frame_id}-end (\d+)\r?\n'
+
+    def error_trailer_regex(self, newlines_translated: bool) -> str:
+        newline = r'\r\n' if newlines_translated else r'\n'
+        return rf'{newline}PLUMA-{self.frame_id}-err\r?\n'
+
+    def read(self, console: ConsoleBase, timeout: Optional[float] = None,
+             output_stream: Optional[OutputStream] = None) -> Optional[CommandResult]:
+        '''Read the framed output of the command, sent with "shell_lines".
+        Return None if it was not received within "timeout", for each part.
+
+        If "output_stream" is set, the standard output is written to it as
+        received, with only the end of the trailer held in memory, and only
+        its excerpt is returned. "timeout" then applies to each reception.'''
+        engine = console.engine
+        header = engine.wait_for_match(match=self.header_regex, timeout=timeout)
+        if not header.text_matched:
+            self.unframed_output = header.text_received
+            return None
+
+        self.unframed_output = header.text_received[:-len(header.text_matched)]
+
+        # The terminal may turn each new line into a carriage return and a new line
+        header_match = re.match(self.header_regex, header.text_matched)
+        newlines_translated = header_match is not None and header_match.group(1) == '\r'
+        trailer_regex = self.trailer_regex(newlines_translated)
+        if output_stream is not None:
+            trailer = self._stream(console, trailer_regex, newlines_translated,
+                                   output_stream, timeout)
+        else:
+            trailer = engine.wait_for_match(match=trailer_regex, timeout=timeout)
+        trailer_match = re.match(trailer_regex, trailer.text_matched or '')
+        if not trailer_match:
+            return None
+
+        retcode = int(trailer_match.group(1))
+        if output_stream is not None:
+            output = output_stream.excerpt
+        else:
+            output = self._decode(trailer, newlines_translated)
+
+        error = None
+        if self.separate_stderr:
+            error_trailer = engine.wait_for_match(
+                match=self.error_trailer_regex(newlines_translated), timeout=timeout)
+            if not error_trailer.text_matched:
+                return None
+
+            error = self._decode(error_trailer, newlines_translated)
+
+        return CommandResult(command=self.command, output=output,
+                             retcode=retcode, stderr=error)
+
+    def _stream(self, console: ConsoleBase, trailer_regex: str, newlines_translated: bool,
+                output_stream: OutputStream, timeout: Optional[float]) -> MatchResult:
+        '''Write the output received before the trailer to "output_stream"
+        as it is received, and return the trailer match'''
+        decoder = codecs.getincrementaldecoder(console.engine.encoding)(errors='replace')
+        carriage_return = ''
+
+        def write(data: bytes, final: bool = False):
+            nonlocal carriage_return
+            text = carriage_return + decoder.decode(data, final=final)
+            if newlines_translated:
+                # Keep a carriage return which may precede the next new line
+                carriage_return = '\r' if not final and text.endswith('\r') else ''
+                text = text[:len(text) - len(carriage_return)].replace('\r\n', '\n')
+
+            output_stream.write(text)
+
+        # The exit code has at most 3 digits
+        max_trailer_size = len(f'\r\nPLUMA-{self.frame_id}-end 255\r\n')
+        trailer = console.engine.stream_until_match(
+            match=trailer_regex, callback=write, max_match_size=max_trailer_size,
+            timeout=timeout)
+        write(b'', final=True)
+        return trailer
+
+    @staticmethod
+    def _decode(result: MatchResult, newlines_translated: bool) -> str:
+        '''Return the text received before the trailer of "result"'''
+        text = result.text_received[:len(result.text_received) - len(result.text_matched or '')]
+        return text.replace('\r\n', '\n') if newlines_translated else text
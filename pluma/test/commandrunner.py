@@ -1,57 +1,186 @@
+import codecs
 import os
 import re
-from typing import List, Optional
+import signal
+import subprocess
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import IO, Callable, List, NoReturn, Optional
 
 from pluma.core.baseclasses import ConsoleBase, Logger
-from pluma.test import TestingException, TaskFailed
+from pluma.test import TaskFailed
+from .commandframe import CommandFrame, CommandResult
+from .outputstream import OutputStream
 
 log = Logger()
 
+# Time for the output of a host command to be read once it exited or was killed
+OUTPUT_GRACE_PERIOD = 0.5
+
 
 class CommandRunner():
     @staticmethod
     def run(test_name: str, console: ConsoleBase, command: str,
             timeout: Optional[float] = None) -> str:
-        '''Run a command in a Shell context'''
-        retcode_token = 'pluma-retcode='
-        base_command = command
-        command += f' ; echo {retcode_token}$?'
-        output, matched = console.send_and_expect(
-            command, timeout=timeout, match=retcode_token+r'-?\d+')
-
-        if not matched:
+        '''Run a command in a Shell context, and return its output stripped
+        of surrounding whitespace. Fails if the command returns an error.'''
+        result = CommandRunner.run_framed(test_name=test_name, console=console,
+                                          command=command, timeout=timeout)
+        output = result.output.strip()
+        if result.retcode != 0:
             CommandRunner.log_error(test_name=test_name, sent=command, output=output,
-                                    error='No response within timeout, or failed device'
-                                    ' failed to send return code. If this is not running'
-                                    ' in a shell, set "runs_in_shell" to "false".')
+                                    error=f'Command "{command}" returned with exit code'
+                                    f' {result.retcode}')
 
-        output = re.sub(re.escape(matched) + r'$', '', output)
-        retcode_match = re.search(retcode_token+r'(-?\d+)', matched)
-        if not retcode_match:
-            raise TestingException('Failed to find return code value')
+        return output
 
-        retcode = int(retcode_match.group(1))
-        if retcode == 0:
-            error = None
-        elif retcode is None:
-            error = 'failed to retrieve return code for command'
-        else:
-            error = f'returned with exit code {retcode}'
+    @staticmethod
+    def run_framed(test_name: str, console: ConsoleBase, command: str,
+                   timeout: Optional[float] = None,
+                   separate_stderr: bool = False,
+                   output_stream: Optional[OutputStream] = None) -> CommandResult:
+        '''Run a command in a Shell context, and return its exact output and
+        return code, whether it succeeded or not. See CommandFrame.
+
+        If "output_stream" is set, the output is written to it as received,
+        and only its excerpt is returned.'''
+        frame = CommandFrame(command, separate_stderr=separate_stderr)
+        console.send_nonblocking(console.engine.linesep.join(frame.shell_lines))
+        return CommandRunner._read_frame(test_name=test_name, console=console,
+                                         frame=frame, timeout=timeout,
+                                         output_stream=output_stream)
 
-        output = CommandRunner.cleanup_command_output(command, output)
-        if error:
-            CommandRunner.log_error(test_name=test_name, sent=command, output=output,
-                                    error=f'Command "{command}" {error}')
+    @staticmethod
+    def run_batch(test_name: str, console: ConsoleBase, commands: List[str],
+                  timeout: Optional[float] = None,
+                  separate_stderr: bool = False) -> List[CommandResult]:
+        '''Run commands in a Shell context, sending them all at once.
+
+        Each command output is framed, see CommandFrame, so that the outputs
+        are parsed in a single pass once received. This avoids waiting for a
+        round trip per command. As commands are sent before the previous ones
+        complete, they must not read from their standard input, and all of
+        them run even if one fails. "timeout" applies to each command.
+        '''
+        frames = [CommandFrame(command, separate_stderr=separate_stderr)
+                  for command in commands]
+        if not frames:
+            return []
+
+        console.send_nonblocking(console.engine.linesep.join(
+            line for frame in frames for line in frame.shell_lines))
+
+        return [CommandRunner._read_frame(test_name=test_name, console=console,
+                                          frame=frame, timeout=timeout)
+                for frame in frames]
+
+    @staticmethod
+    def run_on_host(test_name: str, command: str, timeout: Optional[float] = None,
+                    separate_stderr: bool = False,
+                    output_callback: Optional[Callable[[str], None]] = None,
+                    fail_on_timeout: bool = True,
+                    output_stream: Optional[OutputStream] = None) -> CommandResult:
+        '''Run a command on the host in a new process, without a terminal or
+        shell session, and return its exact output and return code.
+
+        The output is passed to "output_callback" as it is received. If
+        "output_stream" is set, the standard output is written to it instead
+        of being held in memory, and only its excerpt is returned. The
+        command and its children are killed if not complete within
+        "timeout", which fails unless "fail_on_timeout" is False.
+        '''
+        timeout = timeout if timeout is not None else 5
+        deadline = time.monotonic() + timeout
+        process = subprocess.Popen(command, shell=True, stdin=subprocess.DEVNULL,
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE if separate_stderr
+                                   else subprocess.STDOUT,
+                                   start_new_session=True)
+
+        # The output is only held in memory if not written to "output_stream"
+        outputs: List[Optional[List[str]]] = [[], []]
+        callbacks = [output_callback, output_callback]
+        if output_stream is not None:
+            callbacks[0] = _chain_callbacks(output_stream.write, output_callback)
+            outputs[0] = None
+
+        readers = [threading.Thread(target=_read_stream, daemon=True,
+                                    args=(stream, output, callback))
+                   for stream, output, callback in zip([process.stdout, process.stderr],
+                                                       outputs, callbacks)
+                   if stream]
+        for reader in readers:
+            reader.start()
+
+        timed_out = False
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+
+        # Background processes started by the command may keep its output
+        # open after it exits. Output already sent is still read once the
+        # deadline passed, e.g. when the command was killed.
+        readers_deadline = max(deadline, time.monotonic() + OUTPUT_GRACE_PERIOD)
+        for reader in readers:
+            reader.join(timeout=max(0, readers_deadline - time.monotonic()))
+
+        if output_stream is not None:
+            output = output_stream.excerpt
         else:
-            log.debug(CommandRunner.format_command_log(sent=base_command, output=output))
+            output = ''.join(outputs[0] or [])
+        result = CommandResult(command=command, output=output,
+                               retcode=process.returncode,
+                               stderr=''.join(outputs[1] or []) if separate_stderr else None)
+        if timed_out and fail_on_timeout:
+            CommandRunner.log_error(test_name=test_name, sent=command, output=result.output,
+                                    error=f'Command did not complete within {timeout}s')
 
-        return output
+        log.debug(CommandRunner.format_command_log(sent=command, output=result.output))
+        return result
+
+    @staticmethod
+    def run_batch_on_host(test_name: str, commands: List[str],
+                          timeout: Optional[float] = None,
+                          separate_stderr: bool = False,
+                          max_workers: int = 4) -> List[CommandResult]:
+        '''Run independent commands on the host concurrently, "max_workers" at
+        most at a time, and return their results in order. See run_on_host.'''
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(CommandRunner.run_on_host, test_name=test_name,
+                                   command=command, timeout=timeout,
+                                   separate_stderr=separate_stderr)
+                       for command in commands]
+            return [future.result() for future in futures]
+
+    @staticmethod
+    def _read_frame(test_name: str, console: ConsoleBase, frame: CommandFrame,
+                    timeout: Optional[float] = None,
+                    output_stream: Optional[OutputStream] = None) -> CommandResult:
+        timeout = timeout if timeout is not None else 5
+
+        result = frame.read(console, timeout=timeout, output_stream=output_stream)
+        if result is None:
+            CommandRunner.log_error(test_name=test_name, sent=frame.command,
+                                    output=frame.unframed_output,
+                                    error='No response within timeout, or failed device'
+                                    ' failed to send return code. If this is not running'
+                                    ' in a shell, set "runs_in_shell" to "false".')
+
+        log.debug(CommandRunner.format_command_log(sent=frame.command, output=result.output))
+        return result
 
     @staticmethod
     def run_raw(test_name: str, console: ConsoleBase, command: str,
                 timeout: Optional[float] = None) -> str:
         '''Run a command with minimal assumptions regarding the context'''
-        output = console.send_and_read(command, timeout=timeout, quiet_time=timeout)
+        output = console.send_and_read(command, timeout=timeout, quiet_time=timeout,
+                                       sentinel=False)
         output = CommandRunner.cleanup_command_output(command, output)
 
         if not output:
@@ -64,7 +193,7 @@ class CommandRunner():
 
     @staticmethod
     def log_error(test_name: str, sent: str, output: str, error: str,
-                  match_regex: List[str] = None, error_regex: List[str] = None):
+                  match_regex: List[str] = None, error_regex: List[str] = None) -> NoReturn:
         message = f'Script test "{test_name}": {error}:{os.linesep}'
         message += CommandRunner.format_command_log(sent=sent, output=output,
                                                     match_regex=match_regex,
@@ -172,3 +301,30 @@ class CommandRunner():
                 return True
 
         return False
+
+
+def _read_stream(stream: IO[bytes], output: Optional[List[str]],
+                 callback: Optional[Callable[[str], None]]):
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    # Read from the file descriptor, so that data is passed on as it arrives
+    for data in iter(partial(os.read, stream.fileno(), 64 * 1024), b''):
+        text = decoder.decode(data)
+        if output is not None:
+            output.append(text)
+        if callback and text:
+            callback(text)
+
+    text = decoder.decode(b'', final=True)
+    if output is not None:
+        output.append(text)
+    if callback and text:
+        callback(text)
+
+
+def _chain_callbacks(*callbacks: Optional[Callable[[str], None]]) -> Callable[[str], None]:
+    def call_all(text: str):
+        for callback in callbacks:
+            if callback:
+                callback(text)
+
+    return call_all
@@ -1,11 +1,15 @@
 import os
+import posixpath
+import shlex
 from pluma.core.board import Board
-from typing import Tuple
+from typing import Optional, Tuple
 
 from pluma.test import TestBase, CommandRunner
-from pluma.core.baseclasses import ConsoleBase
+from pluma.core.baseclasses import ConsoleBase, Logger, ManifestEntry
+from pluma.core.baseclasses.filedeployment import file_manifest
 from pluma.utils import random_dir_name
-from pluma import HostConsole
+
+log = Logger()
 
 
 class ExecutableTest(TestBase):
@@ -14,16 +18,28 @@ class ExecutableTest(TestBase):
     By default, this test will try to deploy the executable on the target
     and run it. This can be changed to run an executable on the host, or on
     the target directly, skipping the deployment.
+
+    If "cache_directory" is set, the executable is deployed in that target
+    directory instead of a temporary one, in a folder named after its
+    content hash, and reused by the following runs. Only the
+    "cache_max_entries" most recently used executables are kept.
     '''
 
     def __init__(self, board: Board, executable_file: str, host_file: bool = True,
-                 run_on_host: bool = False, timeout: float = None):
+                 run_on_host: bool = False, timeout: float = None,
+                 cache_directory: Optional[str] = None, cache_max_entries: int = 8):
         abs_path = os.path.abspath(executable_file)
         super().__init__(board, test_name=executable_file)
         self.executable_file = os.path.abspath(executable_file)
         self.host_file = host_file
         self.run_on_host = run_on_host
         self.timeout = timeout if timeout is not None else 5
+        self.cache_directory = cache_directory
+        self.cache_max_entries = cache_max_entries
+        self._manifest_entry: Optional[Tuple[float, ManifestEntry]] = None
+
+        if self.cache_max_entries < 1:
+            raise ValueError('"cache_max_entries" must be a positive number')
 
         if self.host_file and not os.path.isfile(abs_path):
             raise ValueError(
@@ -55,23 +71,32 @@ class ExecutableTest(TestBase):
                 'Use a different console like SSH, or run the test on the host')
 
     def test_body(self):
-        filepath = ''
-        console = None
-        temp_folder = None
         if self.run_on_host:
-            console = HostConsole('sh')
-            filepath = self.executable_file
-        else:
-            console = self.board.console
-            if not console:
-                raise ValueError('Current console is null, cannot copy executable')
+            result = CommandRunner.run_on_host(test_name=self._test_name,
+                                               command=self.executable_file,
+                                               timeout=self.timeout)
+            if result.retcode != 0:
+                CommandRunner.log_error(test_name=self._test_name, sent=result.command,
+                                        output=result.output,
+                                        error=f'Command "{result.command}" returned with'
+                                        f' exit code {result.retcode}')
+            return
+
+        temp_folder = None
+        console = self.board.console
+        if not console:
+            raise ValueError('Current console is null, cannot copy executable')
 
-            if self.host_file:
-                self.check_console_supports_copy(console)
+        if self.host_file:
+            self.check_console_supports_copy(console)
+            if self.cache_directory:
+                filepath = self.deploy_file_in_cache(file=self.executable_file,
+                                                     console=console)
+            else:
                 filepath, temp_folder = self.deploy_file_in_tmp_folder(
                     file=self.executable_file, console=console)
-            else:
-                filepath = self.executable_file
+        else:
+            filepath = self.executable_file
 
         try:
             CommandRunner.run(test_name=self._test_name, command=filepath,
@@ -94,3 +119,40 @@ class ExecutableTest(TestBase):
                                destination=destination)
 
         return destination, temp_folder
+
+    def deploy_file_in_cache(self, file: str, console: ConsoleBase) -> str:
+        '''Deploy the file in the cache directory if not there yet, and return
+        its full path'''
+        if not self.cache_directory:
+            raise ValueError('No cache directory set, cannot cache executable')
+
+        entry = self._file_manifest_entry(file)
+        entry_folder = posixpath.join(self.cache_directory, entry.sha256[:32])
+        destination = posixpath.join(entry_folder, os.path.basename(file))
+
+        # The size check catches copies interrupted by a previous run, and
+        # "touch" marks the entry as recently used
+        cached = CommandRunner.run_framed(
+            test_name=self._test_name, console=console, timeout=self.timeout,
+            command=f'[ $(wc -c 2>/dev/null <{shlex.quote(destination)} || echo -1) '
+            f'-eq {entry.size} ] && touch {shlex.quote(entry_folder)}')
+        if cached.retcode == 0:
+            log.debug(f'Using executable cached on target: {destination}')
+            return destination
+
+        cache = shlex.quote(self.cache_directory)
+        CommandRunner.run(test_name=self._test_name, console=console, timeout=self.timeout,
+                          command=f'mkdir -p {shlex.quote(entry_folder)} && '
+                          f'ls -t {cache} | tail -n +{self.cache_max_entries + 1} | '
+                          f'while read -r pluma_entry; do rm -rf {cache}/"$pluma_entry"; done')
+        console.copy_to_target(source=file, destination=destination)
+
+        return destination
+
+    def _file_manifest_entry(self, file: str) -> ManifestEntry:
+        '''Return the size and hash of the file, hashing it only if modified'''
+        modified = os.path.getmtime(file)
+        if not self._manifest_entry or self._manifest_entry[0] != modified:
+            self._manifest_entry = (modified, file_manifest([file])[os.path.basename(file)])
+
+        return self._manifest_entry[1]
@@ -0,0 +1,100 @@
+import re
+from typing import Callable, List, Optional
+
+
+class OutputStream:
+    '''Destination of a command output received in chunks, holding a bounded
+    part of it in memory.
+
+    Chunks are written to the file "path", or appended to it if "append" is
+    set, and passed to "callback" as they are received. "match_regex" and
+    "error_regex" patterns are searched in each line once complete, so they
+    cannot span several lines. Only the first and last "excerpt_size"
+    characters are kept, see "excerpt".
+    '''
+
+    def __init__(self, path: Optional[str] = None,
+                 callback: Optional[Callable[[str], None]] = None,
+                 match_regex: Optional[List[str]] = None,
+                 error_regex: Optional[List[str]] = None,
+                 excerpt_size: int = 4096, max_line_size: int = 64 * 1024,
+                 append: bool = False):
+        self.path = path
+        self.callback = callback
+        self.match_regex = match_regex or []
+        self.error_regex = error_regex or []
+        self.excerpt_size = excerpt_size
+        # Longer lines are searched in parts
+        self.max_line_size = max_line_size
+
+        # Number of characters written
+        self.size = 0
+        # Patterns of "match_regex" not matched yet
+        self.unmatched_regex = list(self.match_regex)
+        # Patterns of "error_regex" matched
+        self.matched_error_regex: List[str] = []
+        self._head = ''
+        self._tail = ''
+        self._line = ''
+        self._file = open(path, 'a' if append else 'w') if path else None
+
+    def __enter__(self) -> 'OutputStream':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, text: str):
+        if not text:
+            return
+
+        self.size += len(text)
+        if len(self._head) < self.excerpt_size:
+            self._head += text[:self.excerpt_size - len(self._head)]
+        self._tail = (self._tail + text[-self.excerpt_size:])[-self.excerpt_size:]
+
+        if self._file:
+            self._file.write(text)
+        if self.callback:
+            self.callback(text)
+
+        lines = (self._line + text).split('\n')
+        self._line = lines.pop()
+        for line in lines:
+            self._search(line)
+
+        if len(self._line) > self.max_line_size:
+            self._search(self._line)
+            self._line = ''
+
+    def close(self):
+        '''Search the last line, and close the output file'''
+        if self._line:
+            self._search(self._line)
+            self._line = ''
+
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    @property
+    def matched_all(self) -> bool:
+        '''Whether all the "match_regex" patterns were matched'''
+        return not self.unmatched_regex
+
+    @property
+    def excerpt(self) -> str:
+        '''Output written, with its middle part cut if too long'''
+        overlap = len(self._head) + len(self._tail) - self.size
+        if overlap >= 0:
+            return self._head + self._tail[overlap:]
+
+        return (f'{self._head}\n[... {-overlap} characters not shown ...]\n'
+                f'{self._tail}')
+
+    def _search(self, line: str):
+        self.unmatched_regex = [regex for regex in self.unmatched_regex
+                                if not re.search(regex, line, re.MULTILINE)]
+        self.matched_error_regex += [regex for regex in self.error_regex
+                                     if regex not in self.matched_error_regex
+                                     and re.search(regex, line, re.MULTILINE)]
@@ -1,28 +1,59 @@
-from typing import List, Optional, Union
+import os
+import tempfile
+import uuid
+from typing import Callable, List, Optional, Union
 
 from pluma.core.baseclasses import Logger
 from pluma import HostConsole, Board
 from pluma.core.baseclasses import ConsoleBase
-from pluma.test import CommandRunner, TestBase, TaskFailed
+from pluma.core.shellfiletransfer import posix_cksum
+from pluma.test import CommandResult, CommandRunner, OutputStream, TestBase, TaskFailed
 
 log = Logger()
 
 
 class ShellTest(TestBase):
-    '''Execute script within the target (or host) shell'''
+    '''Execute script within the target (or host) shell.
+
+    If "batch" is set, all scripts are sent at once and their outputs
+    parsed as they are received, see CommandRunner.run_batch.
+
+    Scripts ran on the host share a shell session, unless
+    "subprocess_on_host" is set. Each script then runs in a new process,
+    see CommandRunner.run_on_host, concurrently if "batch" is set.
+
+    If "upload" is set, the scripts are written to a file on the target,
+    stopping at the first failure, and ran with a single command. The file
+    is copied if the console supports it, e.g. with scp over SSH, or typed
+    in as a heredoc otherwise.
+
+    If "stream_output" or "output_file" is set, the output of each command
+    is checked as it is received, and written to "output_file", instead of
+    being held in memory. Only an excerpt of it is logged and returned.
+    Expected and error patterns are then matched line by line.
+    '''
 
     def __init__(self, board: Board, script: Union[str, List[str]], name: str = None,
                  should_match_regex: List[str] = None,
                  should_not_match_regex: List[str] = None, run_on_host: bool = False,
                  timeout: Optional[float] = None,  runs_in_shell: bool = True,
-                 login_automatically: bool = False):
+                 login_automatically: bool = False, batch: bool = False,
+                 upload: bool = False, stream_output: bool = False,
+                 output_file: Optional[str] = None, subprocess_on_host: bool = False):
         super().__init__(board, test_name=name)
         self.should_match_regex = should_match_regex
         self.should_not_match_regex = should_not_match_regex
         self.run_on_host = run_on_host
+        self.subprocess_on_host = subprocess_on_host
         self.timeout = timeout if timeout is not None else 5.0
         self.runs_in_shell = runs_in_shell
         self.login_automatically = login_automatically
+        self.batch = batch
+        self.upload = upload
+        self.output_file = output_file
+        self.stream_output = stream_output or output_file is not None
+        # Whether outputs are appended to "output_file", after the first command
+        self._append_output = False
 
         if isinstance(script, str):
             self.scripts = [script]
@@ -35,7 +66,28 @@ class ShellTest(TestBase):
                 ' was defined. Define a console in "pluma-target.yml", or use '
                 ' "run_on_host" test attribute to run on the host instead.')
 
+        if self.subprocess_on_host and not self.run_on_host:
+            raise ValueError(
+                f'Cannot run script test "{self._test_name}" in subprocesses: this'
+                ' requires "run_on_host".')
+
+        if self.batch and not self.runs_in_shell:
+            raise ValueError(
+                f'Cannot run script test "{self._test_name}" in batch: batch mode'
+                ' requires "runs_in_shell".')
+
+        if self.upload and (self.batch or self.run_on_host or not self.runs_in_shell):
+            raise ValueError(
+                f'Cannot upload script test "{self._test_name}": uploading requires'
+                ' "runs_in_shell", and cannot be used with "batch" or "run_on_host".')
+
+        if self.stream_output and (self.batch or not self.runs_in_shell):
+            raise ValueError(
+                f'Cannot stream the output of script test "{self._test_name}": streaming'
+                ' requires "runs_in_shell", and cannot be used with "batch".')
+
     def test_body(self):
+        self._append_output = False
         self.run_commands()
 
     def run_commands(self, console: Optional[ConsoleBase] = None,
@@ -44,6 +96,9 @@ class ShellTest(TestBase):
         scripts = scripts or self.scripts
 
         if console is None:
+            if self.run_on_host and self.subprocess_on_host:
+                return self.run_on_host_commands(scripts=scripts, timeout=timeout)
+
             if self.run_on_host:
                 console = HostConsole('sh')
             else:
@@ -55,16 +110,148 @@ class ShellTest(TestBase):
         if self.runs_in_shell and self.login_automatically and console.requires_login:
             self.board.login()
 
+        if self.batch:
+            return self.run_batch(console=console, scripts=scripts, timeout=timeout)
+
+        if self.upload:
+            return self.run_uploaded(console=console, scripts=scripts, timeout=timeout)
+
         output = ''
         for script in scripts:
             output += self.run_command(console=console, script=script, timeout=timeout)
 
         return output
 
+    def run_batch(self, console: ConsoleBase, scripts: List[str],
+                  timeout: Optional[float] = None) -> str:
+        timeout = timeout or self.timeout
+
+        results = CommandRunner.run_batch(test_name=self._test_name, console=console,
+                                          commands=scripts, timeout=timeout)
+        return self.check_results(results)
+
+    def run_uploaded(self, console: ConsoleBase, scripts: List[str],
+                     timeout: Optional[float] = None) -> str:
+        timeout = timeout or self.timeout
+        content = 'set -e\n' + '\n'.join(scripts) + '\n'
+        path = f'/tmp/pluma-script-{uuid.uuid4().hex[:12]}.sh'
+
+        self.upload_script(console=console, content=content, path=path, timeout=timeout)
+        command = f'sh {path} ; pluma_s=$? ; rm -f {path} ; ( exit $pluma_s )'
+        if self.stream_output:
+            return self.run_streamed(command, lambda stream: CommandRunner.run_framed(
+                test_name=self._test_name, console=console, command=command,
+                timeout=timeout, output_stream=stream))
+
+        result = CommandRunner.run_framed(test_name=self._test_name, console=console,
+                                          command=command, timeout=timeout)
+        return self.check_results([result])
+
+    def upload_script(self, console: ConsoleBase, content: str, path: str,
+                      timeout: Optional[float] = None):
+        '''Write "content" to "path" on the target'''
+        if console.support_file_copy:
+            with tempfile.NamedTemporaryFile('w', suffix='.sh', delete=False) as f:
+                f.write(content)
+
+            try:
+                if timeout is not None:
+                    console.copy_to_target(source=f.name, destination=path, timeout=timeout)
+                else:
+                    console.copy_to_target(source=f.name, destination=path)
+            finally:
+                os.remove(f.name)
+
+            return
+
+        # The delimiter is quoted, so that the content is not expanded
+        delimiter = f'PLUMA_EOF_{uuid.uuid4().hex[:12]}'
+        console.send_nonblocking(f"cat >{path} <<'{delimiter}'\n{content}{delimiter}")
+        checksum = CommandRunner.run(test_name=self._test_name, console=console,
+                                     command=f'cksum <{path}', timeout=timeout)
+        if checksum.split() != [str(posix_cksum(content.encode())), str(len(content.encode()))]:
+            CommandRunner.log_error(test_name=self._test_name, sent=f'cksum <{path}',
+                                    output=checksum,
+                                    error=f'Script uploaded to "{path}" is corrupted')
+
+    def run_on_host_commands(self, scripts: List[str],
+                             timeout: Optional[float] = None) -> str:
+        timeout = timeout or self.timeout
+
+        if self.batch:
+            return self.check_results(CommandRunner.run_batch_on_host(
+                test_name=self._test_name, commands=scripts, timeout=timeout))
+
+        output = ''
+        for script in scripts:
+            if self.stream_output:
+                output += self.run_streamed(script, lambda stream: CommandRunner.run_on_host(
+                    test_name=self._test_name, command=script, timeout=timeout,
+                    output_stream=stream))
+                continue
+
+            # Commands not ran in a shell are only stopped by the timeout
+            result = CommandRunner.run_on_host(test_name=self._test_name, command=script,
+                                               timeout=timeout,
+                                               fail_on_timeout=self.runs_in_shell)
+            output += self.check_results([result])
+
+        return output
+
+    def run_streamed(self, script: str,
+                     run: Callable[[OutputStream], CommandResult]) -> str:
+        '''Run a command with "run", streaming its output, check the result and
+        return the output excerpt'''
+        with OutputStream(path=self.output_file, append=self._append_output,
+                          match_regex=self.should_match_regex,
+                          error_regex=self.should_not_match_regex) as stream:
+            result = run(stream)
+
+        self._append_output = True
+        output = result.output.strip()
+        if result.retcode != 0:
+            CommandRunner.log_error(test_name=self._test_name, sent=script, output=output,
+                                    error=f'Command "{script}" returned with exit code'
+                                    f' {result.retcode}')
+
+        if stream.matched_error_regex:
+            CommandRunner.log_error(test_name=self._test_name, sent=script, output=output,
+                                    error_regex=stream.matched_error_regex,
+                                    error='Response matched an error pattern')
+
+        if not stream.matched_all:
+            CommandRunner.log_error(test_name=self._test_name, sent=script, output=output,
+                                    match_regex=stream.unmatched_regex,
+                                    error='Response did not match all expected patterns')
+
+        log.log(CommandRunner.format_command_log(sent=script, output=output))
+        return output
+
+    def check_results(self, results: List[CommandResult]) -> str:
+        '''Check the return code and output of each command, and return their
+        outputs concatenated'''
+        output = ''
+        for result in results:
+            if self.runs_in_shell and result.retcode != 0:
+                CommandRunner.log_error(test_name=self._test_name, sent=result.command,
+                                        output=result.output,
+                                        error=f'Command "{result.command}" returned with'
+                                        f' exit code {result.retcode}')
+
+            self.check_command_output(script=result.command, output=result.output.strip())
+            output += result.output.strip()
+
+        return output
+
     def run_command(self, console: ConsoleBase, script: str,
                     timeout: Optional[float] = None) -> str:
         timeout = timeout or self.timeout
 
+        if self.stream_output:
+            return self.run_streamed(script, lambda stream: CommandRunner.run_framed(
+                test_name=self._test_name, console=console, command=script,
+                timeout=timeout, output_stream=stream))
+
         if self.runs_in_shell:
             output = CommandRunner.run(test_name=self._test_name, console=console,
                                        command=script, timeout=timeout)
@@ -72,10 +259,13 @@ class ShellTest(TestBase):
             output = CommandRunner.run_raw(test_name=self._test_name, console=console,
                                            command=script, timeout=timeout)
 
+        self.check_command_output(script=script, output=output)
+        return output
+
+    def check_command_output(self, script: str, output: str):
         if self.should_match_regex or self.should_not_match_regex:
             CommandRunner.check_output(test_name=self._test_name, command=script, output=output,
                                        match_regex=self.should_match_regex,
                                        error_regex=self.should_not_match_regex)
 
         log.log(CommandRunner.format_command_log(sent=script, output=output))
-        return output
@@ -7,6 +7,9 @@ class TestBase(ABC):
     """Base class for tests"""
 
     test_count = 0
+    # Set for tests with no side effects on the target, which can run
+    # concurrently with other such tests, each in its own console session
+    parallel_safe = False
 
     def __init__(self, board: Board = None, test_name: str = None):
         """Construct a TestBase with a board, and test suffix"""
@@ -398,6 +398,8 @@ class TestController():
                          self.stats['num_tests_total']))
 
         self._init_iteration()
+        if iteration > 0:
+            self._start_console_logs_iteration()
 
         self.debug_log(f'Running TestRunner: {self.testrunner}')
         success = self.testrunner.run()
@@ -411,6 +413,16 @@ class TestController():
 
         return success
 
+    def _start_console_logs_iteration(self):
+        ''' Notify the board console logs that a new iteration starts '''
+        board = self.testrunner.board
+        if not board:
+            return
+
+        for console in board.consoles.values():
+            if console.engine.raw_log:
+                console.engine.raw_log.start_iteration()
+
     def run(self):
         ''' Run the test suite with saved settings '''
         try:
@@ -1,11 +1,14 @@
 import traceback
 import time
 from abc import ABC, abstractmethod
-from typing import Iterable, List, Union, cast
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Union, cast
 
 from pluma import utils
-from pluma.core.baseclasses import LogLevel, Logger
+from pluma.core.baseclasses import (ConsoleError, ConsoleExceptionKeywordReceivedError,
+                                    LogLevel, Logger)
 from pluma.core.board import Board
+from pluma.core.consolewatcher import ConsoleWatcher, WatcherHit
 from pluma.test import TestBase, TestGroup, AbortTesting
 from pluma.test.testgroup import GroupedTest
 
@@ -45,6 +48,9 @@ class TestRunnerBase(ABC):
         for test in self.tests:
             self._init_test_data(test_parent=self, test=test)
 
+        if self.watcher:
+            self.watcher.start()
+
         try:
             # Defer the actual test running to classes that inherit this base
             return self._run(self.tests)
@@ -53,6 +59,12 @@ class TestRunnerBase(ABC):
             log.log('Testing aborted', color='red', bold=True, level=LogLevel.IMPORTANT)
             log.notice(f'  due to exception {e}', color='red')
             return False
+        finally:
+            if self.watcher:
+                self.watcher.stop()
+            session_pool = getattr(self.board, 'session_pool', None)
+            if session_pool:
+                session_pool.close()
 
     def __call__(self):
         return self.run()
@@ -96,12 +108,14 @@ class TestRunnerBase(ABC):
 
         try:
             task_func()
+            self._check_watcher_hits(test)
         # If exception is one we deliberately caused, don't handle it
         except KeyboardInterrupt as e:
             raise e
         except InterruptedError as e:
             raise e
         except Exception as e:
+            self._save_watcher_hits(test)
             self.data[str(test)]['tasks']['failed'][task_name] = str(e)
 
             # If request to abort testing, do so but don't run side effects and always reraise
@@ -116,6 +130,32 @@ class TestRunnerBase(ABC):
 
         return True
 
+    @property
+    def watcher(self) -> Optional[ConsoleWatcher]:
+        '''Console watcher of the board, if any'''
+        return getattr(self.board, 'watcher', None)
+
+    def _save_watcher_hits(self, test: TestBase) -> List[WatcherHit]:
+        '''Save exceptions found by the board console watcher in the test data'''
+        if not self.watcher:
+            return []
+
+        hits = self.watcher.pop_hits()
+        if hits:
+            test.data.setdefault('console_exceptions', []).extend(
+                hit.to_dict() for hit in hits)
+
+        return hits
+
+    def _check_watcher_hits(self, test: TestBase):
+        '''Save console watcher exceptions, and fail the task if required'''
+        hits = self._save_watcher_hits(test)
+        watcher = self.watcher
+        if hits and watcher and watcher.abort:
+            raise ConsoleExceptionKeywordReceivedError(
+                f'Console "{hits[0].console}" received exception pattern '
+                f'"{hits[0].pattern}": {hits[0].text_matched}')
+
     def _handle_failed_task(self, test: TestBase, task_name: str, exception: Exception):
         '''Run any side effects for a task failure, such as writing logs or sending emails'''
         failed = {
@@ -157,46 +197,121 @@ class TestRunnerBase(ABC):
 
 
 class TestRunner(TestRunnerBase):
-    '''Run a set of tests sequentially'''
+    '''Run a set of tests sequentially.
+
+    If the board has an SSH session pool, consecutive parallel safe tests
+    run concurrently instead, each with a session of the pool as the board
+    console.
+    '''
 
     def _run(self, tests: Iterable[TestBase]) -> bool:
         success = True
 
         log.debug(f'Running tests: {list(map(str, self.tests))}')
 
-        for test in tests:
-            # Print test message
-            column_limit = 70
-            test_name = utils.resize_string(str(test), column_limit)
-
-            is_group_test = isinstance(test, GroupedTest)
-            log.log(test_name + '  ', level=LogLevel.IMPORTANT, newline=is_group_test)
-
-            log.hold()
-            test_success = self._run_task(test, "setup")
-            if test_success:
-                test_success = self._run_task(test, "test_body")
-                if test_success and is_group_test:
-                    log.release()
-                    test_success = self._run(cast(GroupedTest, test).tests)
-                    log.hold()
-
-                # Run teardown even if 'test_body' failed
-                test_success &= self._run_task(test, "teardown")
-
-            if is_group_test:
-                log.log(test_name + '  ', level=LogLevel.IMPORTANT, newline=False,
-                        bypass_hold=True)
-
-            if test_success:
-                log.log('PASS', color='green', level=LogLevel.IMPORTANT, bypass_hold=True)
+        tests = list(tests)
+        while tests:
+            parallel_tests = self._parallel_tests(tests)
+            if len(parallel_tests) > 1:
+                success &= self._run_parallel(parallel_tests)
+                tests = tests[len(parallel_tests):]
             else:
-                log.log('FAIL', color='red', level=LogLevel.IMPORTANT, bypass_hold=True)
-
-            log.release()
-            success &= test_success
+                success &= self._run_test(tests.pop(0))
 
             if not success and not self.continue_on_fail:
                 raise AbortTesting('Aborting the execution (stop on failure)')
 
         return success
+
+    def _run_test(self, test: TestBase) -> bool:
+        # Print test message
+        test_name = self._test_title(test)
+        is_group_test = isinstance(test, GroupedTest)
+        log.log(test_name + '  ', level=LogLevel.IMPORTANT, newline=is_group_test)
+
+        log.hold()
+        test_success = self._run_tasks(test)
+
+        if is_group_test:
+            log.log(test_name + '  ', level=LogLevel.IMPORTANT, newline=False,
+                    bypass_hold=True)
+
+        self._log_result(test_success)
+        log.release()
+        return test_success
+
+    def _run_tasks(self, test: TestBase) -> bool:
+        test_success = self._run_task(test, "setup")
+        if test_success:
+            test_success = self._run_task(test, "test_body")
+            if test_success and isinstance(test, GroupedTest):
+                log.release()
+                test_success = self._run(cast(GroupedTest, test).tests)
+                log.hold()
+
+            # Run teardown even if 'test_body' failed
+            test_success &= self._run_task(test, "teardown")
+
+        return test_success
+
+    def _parallel_tests(self, tests: List[TestBase]) -> List[TestBase]:
+        '''Return the parallel safe tests at the start of "tests"'''
+        if not self.board or not getattr(self.board, 'session_pool', None):
+            return []
+
+        parallel_tests = []
+        for test in tests:
+            if not test.parallel_safe or isinstance(test, GroupedTest):
+                break
+
+            parallel_tests.append(test)
+
+        return parallel_tests
+
+    def _run_parallel(self, tests: List[TestBase]) -> bool:
+        '''Run tests concurrently, each in a session checked out from the
+        board session pool, and print their results in order'''
+        session_pool = self.board.session_pool
+        assert session_pool is not None
+        log.debug(f'Running {len(tests)} tests concurrently with {session_pool}')
+
+        log.hold()
+        try:
+            with ThreadPoolExecutor(max_workers=session_pool.size) as executor:
+                results = list(executor.map(self._run_tasks_in_session, tests))
+        except BaseException:
+            log.release()
+            raise
+
+        for test, test_success in zip(tests, results):
+            log.log(self._test_title(test) + '  ', level=LogLevel.IMPORTANT,
+                    newline=False, bypass_hold=True)
+            self._log_result(test_success)
+
+        log.release()
+        return all(results)
+
+    def _run_tasks_in_session(self, test: TestBase) -> bool:
+        session_pool = self.board.session_pool
+        assert session_pool is not None
+        try:
+            with session_pool.checkout() as session, \
+                    self.board.thread_console(session):
+                return self._run_tasks(test)
+        except ConsoleError as e:
+            # Failed to open a session, before running any task
+            self.data[str(test)]['tasks']['failed']['setup'] = str(e)
+            self._handle_failed_task(test, 'setup', e)
+            return False
+
+    @staticmethod
+    def _test_title(test: TestBase) -> str:
+        column_limit = 70
+        return utils.resize_string(str(test), column_limit)
+
+    @staticmethod
+    def _log_result(test_success: bool):
+        if test_success:
+            log.log('PASS', color='green', level=LogLevel.IMPORTANT, bypass_hold=True)
+        else:
+            log.log('FAIL', color='red', level=LogLevel.IMPORTANT, bypass_hold=True)
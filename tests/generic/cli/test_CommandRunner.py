@@ -1,5 +1,9 @@
+import os
+import time
 import pytest
+from unittest.mock import MagicMock
 
+from pluma import HostConsole
 from pluma.test import CommandRunner, TaskFailed
 
 
@@ -75,3 +79,140 @@ def test_CommandRunner_check_output_should_error(match_regex, error_regex, outpu
     with pytest.raises(TaskFailed):
         CommandRunner.check_output(test_name='test', command='cmd', output=output,
                                    match_regex=match_regex, error_regex=error_regex)
+
+
+@pytest.mark.xfail(os.getenv('PLUMA_ENV') == 'CI', reason='CI fails to properly spawn a shell')
+def test_CommandRunner_run_batch_returns_output_and_retcode_per_command():
+    console = HostConsole('/bin/sh')
+    results = CommandRunner.run_batch(test_name='test', console=console, timeout=2,
+                                      commands=['echo abc', 'echo def; false',
+                                                'printf "no newline"', '(exit 3)'])
+    console.close()
+
+    assert [(result.output, result.retcode) for result in results] == [
+        ('abc\n', 0), ('def\n', 1), ('no newline', 0), ('', 3)]
+    assert results[1].command == 'echo def; false'
+
+
+@pytest.mark.xfail(os.getenv('PLUMA_ENV') == 'CI', reason='CI fails to properly spawn a shell')
+def test_CommandRunner_run_batch_sends_commands_at_once():
+    console = HostConsole('/bin/sh')
+    console.open()
+    console.engine.send_line = MagicMock(wraps=console.engine.send_line)
+
+    CommandRunner.run_batch(test_name='test', console=console, timeout=2,
+                            commands=['echo abc', 'echo def'])
+    console.close()
+
+    console.engine.send_line.assert_called_once()
+
+
+def test_CommandRunner_run_batch_should_error_without_end_marker(basic_console):
+    with pytest.raises(TaskFailed):
+        CommandRunner.run_batch(test_name='test', console=basic_console, timeout=0.1,
+                                commands=['echo abc'])
+
+
+@pytest.mark.xfail(os.getenv('PLUMA_ENV') == 'CI', reason='CI fails to properly spawn a shell')
+def test_CommandRunner_run_returns_output_without_echo():
+    console = HostConsole('/bin/sh')
+    output = CommandRunner.run(test_name='test', console=console, timeout=2,
+                               command='echo "echo abc"; echo def')
+    console.close()
+
+    assert output == 'echo abc\ndef'
+
+
+@pytest.mark.xfail(os.getenv('PLUMA_ENV') == 'CI', reason='CI fails to properly spawn a shell')
+def test_CommandRunner_run_should_error_on_failed_command():
+    console = HostConsole('/bin/sh')
+    with pytest.raises(TaskFailed):
+        CommandRunner.run(test_name='test', console=console, timeout=2, command='false')
+    console.close()
+
+
+@pytest.mark.xfail(os.getenv('PLUMA_ENV') == 'CI', reason='CI fails to properly spawn a shell')
+def test_CommandRunner_run_framed_separates_stderr():
+    console = HostConsole('/bin/sh')
+    result = CommandRunner.run_framed(test_name='test', console=console, timeout=2,
+                                      command='echo out; echo err >&2',
+                                      separate_stderr=True)
+    console.close()
+
+    assert (result.output, result.stderr, result.retcode) == ('out\n', 'err\n', 0)
+
+
+@pytest.mark.xfail(os.getenv('PLUMA_ENV') == 'CI', reason='CI fails to properly spawn a shell')
+@pytest.mark.parametrize('command, output', [('', ''), ('sleep 0.1 &', ''),
+                                             ('printf abc # note', 'abc')])
+def test_CommandRunner_run_framed_completes_any_command(command, output):
+    console = HostConsole('/bin/sh')
+
+    start = time.monotonic()
+    result = CommandRunner.run_framed(test_name='test', console=console,
+                                      command=command, timeout=3)
+
+    assert time.monotonic() - start < 2
+    assert (result.output, result.retcode) == (output, 0)
+    console.close()
+
+
+def test_CommandRunner_run_on_host_returns_exact_output_and_retcode():
+    result = CommandRunner.run_on_host(test_name='test', command='printf "a\\nb\\n"; exit 3')
+
+    assert result.output == 'a\nb\n'
+    assert result.retcode == 3
+    assert result.stderr is None
+
+
+def test_CommandRunner_run_on_host_separates_stderr():
+    result = CommandRunner.run_on_host(test_name='test', command='echo out; echo err >&2',
+                                       separate_stderr=True)
+
+    assert result.output == 'out\n'
+    assert result.stderr == 'err\n'
+
+
+def test_CommandRunner_run_on_host_streams_output():
+    chunks = []
+    CommandRunner.run_on_host(test_name='test', command='echo first; sleep 0.3; echo second',
+                              output_callback=chunks.append)
+
+    assert chunks == ['first\n', 'second\n']
+
+
+def test_CommandRunner_run_on_host_should_error_on_timeout():
+    start = time.time()
+    with pytest.raises(TaskFailed):
+        CommandRunner.run_on_host(test_name='test', command='sleep 10', timeout=0.3)
+
+    assert time.time() - start < 2
+
+
+def test_CommandRunner_run_on_host_kills_command_on_timeout_if_not_failing():
+    result = CommandRunner.run_on_host(test_name='test', command='echo started; sleep 10',
+                                       timeout=0.3, fail_on_timeout=False)
+
+    assert result.output == 'started\n'
+    assert result.retcode != 0
+
+
+def test_CommandRunner_run_on_host_reads_output_sent_before_timeout():
+    # The slow callback delays reading the second chunk past the timeout
+    result = CommandRunner.run_on_host(test_name='test', command='printf a; sleep 0.25; '
+                                       'printf b; sleep 10', timeout=0.5,
+                                       output_callback=lambda text: time.sleep(0.75),
+                                       fail_on_timeout=False)
+
+    assert result.output == 'ab'
+
+
+def test_CommandRunner_run_batch_on_host_runs_concurrently():
+    start = time.time()
+    results = CommandRunner.run_batch_on_host(test_name='test', max_workers=3,
+                                              commands=['sleep 0.5; echo 1', 'sleep 0.5; echo 2',
+                                                        'sleep 0.5; false'])
+
+    assert time.time() - start < 1.2
+    assert [result.output for result in results] == ['1\n', '2\n', '']
+    assert [result.retcode for result in results] == [0, 0, 1]
@@ -1,8 +1,8 @@
 import time
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, PropertyMock
 
-from pluma import Board
+from pluma import Board, SSHConsole
 from pluma.core.baseclasses import ConsoleBase
 from pluma.test import TaskFailed
 from pluma.cli import DeviceActionRegistry, DeviceActionBase, LoginAction, WaitAction, \
@@ -115,6 +115,43 @@ def test_SetAction_should_set_console():
     assert board.console is serial_console
 
 
+def test_SetAction_should_wait_for_ssh_server():
+    ssh_console = MagicMock(SSHConsole)
+    type(ssh_console).is_open = PropertyMock(return_value=False)
+    ssh_console.wait_until_ready.return_value = 2.5
+    board = Board("board", console={'ssh': ssh_console})
+
+    action = SetAction(board, device_console='ssh')
+    action.execute()
+
+    ssh_console.wait_until_ready.assert_called_once()
+    assert action.data == {'ssh_ready_s': 2.5}
+
+
+def test_SetAction_should_wait_for_ssh_server_if_open():
+    ssh_console = MagicMock(SSHConsole)
+    type(ssh_console).is_open = PropertyMock(return_value=True)
+    ssh_console.wait_until_ready.return_value = 0.01
+    board = Board("board", console={'ssh': ssh_console})
+
+    action = SetAction(board, device_console='ssh')
+    action.execute()
+
+    ssh_console.wait_until_ready.assert_called_once()
+    assert action.data == {'ssh_ready_s': 0.01}
+
+
+def test_SetAction_should_not_save_ssh_ready_time_if_not_waited():
+    ssh_console = MagicMock(SSHConsole)
+    ssh_console.wait_until_ready.return_value = None
+    board = Board("board", console={'ssh': ssh_console})
+
+    action = SetAction(board, device_console='ssh')
+    action.execute()
+
+    assert action.data == {}
+
+
 @pytest.mark.parametrize('console_type', ['ssh', 'serial'])
 def test_SetAction_should_error_if_no_console(mock_board, console_type):
     mock_board.get_console.return_value = None
@@ -142,7 +179,7 @@ def test_DeployAction_should_error_if_console_does_not_support_copy(mock_board):
 
 def test_DeployAction_should_deploy_files(mock_board):
     mock_board.console.support_file_copy = True
-    mock_board.console.copy_to_target = MagicMock()
+    mock_board.console.deploy_files = MagicMock()
     files = ['/a/abc.so', 'other']
     destination = '/some/where'
     timeout = 666
@@ -151,10 +188,5 @@ def test_DeployAction_should_deploy_files(mock_board):
                           timeout=timeout)
     action.execute()
 
-    assert mock_board.console.copy_to_target.call_count == len(files)
-    index = 0
-    for call in mock_board.console.copy_to_target.call_args_list:
-        assert call[1]['source'] == files[index]
-        assert call[1]['destination'] == destination
-        assert call[1]['timeout'] == timeout
-        index += 1
+    mock_board.console.deploy_files.assert_called_once_with(
+        files=files, destination=destination, timeout=timeout)
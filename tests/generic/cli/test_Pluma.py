@@ -3,6 +3,7 @@ import os
 from pluma.cli.testsconfig import TestsConfig
 from pluma.cli.plumacontext import PlumaContext
 import pytest
+from unittest.mock import patch
 
 from pluma.cli import Pluma, ConfigurationError, TestsConfigError, TargetConfigError
 
@@ -45,6 +46,17 @@ def test_Pluma_create_context_from_yaml_strs():
     assert isinstance(config, TestsConfig)
 
 
+def test_Pluma_check_should_warm_up_consoles_if_enabled():
+    context, config = Pluma.create_context_from_files(config_file_path('minimal-tests'),
+                                                      config_file_path('minimal-target'))
+    context.warm_up = True
+
+    with patch.object(context.board, 'warm_up_consoles', return_value={}) as warm_up:
+        Pluma.run(context, config, check_only=True)
+
+    warm_up.assert_called_once()
+
+
 def test_Pluma_minimal():
     run_all('minimal-tests', 'minimal-target')
 
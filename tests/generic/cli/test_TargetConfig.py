@@ -19,6 +19,13 @@ def test_TargetConfig_create_context_should_error_on_unconsumed(target_config):
         TargetConfig.create_context(Configuration(invalid_config))
 
 
+def test_TargetConfig_create_context_should_parse_warm_up(target_config):
+    assert TargetConfig.create_context(Configuration(target_config)).warm_up is False
+
+    target_config['warm_up'] = True
+    assert TargetConfig.create_context(Configuration(target_config)).warm_up is True
+
+
 def test_TargetConfig_create_context_passes_serial_console_to_create_power_control(
         serial_config):
     config = Configuration({'console': {'serial': serial_config}})
@@ -57,6 +64,37 @@ def test_TargetFactory_create_serial(serial_config):
     assert console.engine.raw_logfile == log_file
 
 
+def test_TargetFactory_create_serial_with_log_settings(serial_config):
+    serial_config['log_compression'] = 'gzip'
+    serial_config['log_max_size'] = 1024
+    serial_config['log_rotate_each_iteration'] = True
+    serial_config['log_timestamp_index'] = False
+
+    console = TargetFactory.create_serial(Configuration(serial_config), SystemContext())
+    settings = console.engine.raw_log_settings
+    assert settings.compression == 'gzip'
+    assert settings.max_size == 1024
+    assert settings.rotate_each_iteration is True
+    assert settings.backup_count is None
+    assert settings.timestamp_index is False
+
+
+def test_TargetFactory_create_serial_with_file_transfer_settings(serial_config):
+    serial_config['file_transfer_chunk_size'] = 256
+    serial_config['file_transfer_encoding'] = 'printf'
+
+    console = TargetFactory.create_serial(Configuration(serial_config), SystemContext())
+    settings = console.file_transfer_settings
+    assert (settings.chunk_size, settings.window, settings.encoding) == (256, 4, 'printf')
+
+
+def test_TargetFactory_create_serial_should_error_on_invalid_log_compression(serial_config):
+    serial_config['log_compression'] = 'abc'
+
+    with pytest.raises(TargetConfigError):
+        TargetFactory.create_serial(Configuration(serial_config), SystemContext())
+
+
 def test_TargetFactory_create_serial_should_return_none_with_no_config():
     assert TargetFactory.create_serial(None, None) is None
 
@@ -122,6 +160,29 @@ def test_TargetFactory_create_ssh_should_prefer_ssh_credentials(ssh_config):
     assert console.system.credentials.password == sshpassword
 
 
+def test_TargetFactory_create_ssh_multiplexing_can_be_disabled(ssh_config):
+    assert TargetFactory.create_ssh(Configuration(copy.deepcopy(ssh_config)),
+                                    SystemContext()).control_master
+
+    ssh_config['multiplexing'] = False
+    console = TargetFactory.create_ssh(Configuration(ssh_config), SystemContext())
+    assert console.control_master is None
+
+
+def test_TargetFactory_create_session_pool(ssh_config):
+    ssh = TargetFactory.create_ssh(Configuration(ssh_config), SystemContext())
+    pool = TargetFactory.create_session_pool(Configuration({'size': 2}), {'ssh': ssh})
+
+    assert pool.console is ssh
+    assert pool.size == 2
+
+
+def test_TargetFactory_create_session_pool_should_error_without_ssh_console(mock_console):
+    with pytest.raises(TargetConfigError):
+        TargetFactory.create_session_pool(Configuration({'size': 2}),
+                                          {'serial': mock_console})
+
+
 def test_TargetFactory_create_power_control_should_return_none_with_no_console():
     power = TargetFactory.create_power_control(power_config=None, console=None)
     assert power is None
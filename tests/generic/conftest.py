@@ -41,7 +41,7 @@ class MockConsoleEngine(ConsoleEngine):
     def _read_from_console(self):
         received = self.received
         self.received = ''
-        return received
+        return self.encode(received)
 
     def _close_fd(self):
         self._is_open = False
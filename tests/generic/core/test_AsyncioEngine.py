@@ -0,0 +1,150 @@
+import asyncio
+import time
+import pytest
+
+from pluma.core.baseclasses import AsyncioEngine, EventLoopThread
+
+
+def run_in_loop(engine: AsyncioEngine, coroutine):
+    return asyncio.run_coroutine_threadsafe(coroutine, engine.loop).result()
+
+
+def test_AsyncioEngine_uses_shared_loop_by_default():
+    assert AsyncioEngine().loop is EventLoopThread.shared().loop
+    assert AsyncioEngine().loop is AsyncioEngine().loop
+
+
+def test_AsyncioEngine_open_shell_should_succeed():
+    engine = AsyncioEngine()
+    engine.open(console_cmd='sh')
+    assert engine.is_open
+    engine.close()
+
+
+def test_AsyncioEngine_close_shell_should_succeed():
+    engine = AsyncioEngine()
+    engine.open(console_cmd='sh')
+    engine.close()
+    assert engine.is_open is False
+
+
+def test_AsyncioEngine_shell_runs_commands():
+    engine = AsyncioEngine()
+    engine.open(console_cmd='sh')
+    engine.send_line('echo abc$((1+2))')
+
+    match = engine.wait_for_match(match='abc3', timeout=2)
+    engine.close()
+
+    assert match.regex_matched == 'abc3'
+
+
+def test_AsyncioEngine_open_fd_should_succeed(pty_pair):
+    engine = AsyncioEngine()
+    engine.open(console_fd=pty_pair.main.fd)
+    assert engine.is_open
+
+
+def test_AsyncioEngine_send_line_write_content_and_line_break(pty_pair):
+    sent = 'abcdef'
+    engine = AsyncioEngine()
+    engine.open(console_fd=pty_pair.main.fd)
+    engine.send_line(sent)
+
+    assert pty_pair.secondary.read(timeout=0.5) == sent+'\n'
+
+
+def test_AsyncioEngine_read_all_reads_from_console(pty_pair):
+    received = 'abcdef'
+    engine = AsyncioEngine()
+    engine.open(console_fd=pty_pair.main.fd)
+
+    pty_pair.secondary.write(received)
+    assert engine.wait_for_data(timeout=0.5)
+
+    assert engine.read_all() == received
+    assert engine.read_all() == ''
+
+
+def test_AsyncioEngine_wait_for_match_return_match(pty_pair):
+    engine = AsyncioEngine()
+    engine.open(console_fd=pty_pair.main.fd)
+
+    pty_pair.secondary.write('abcd abcdyz')
+    match = engine.wait_for_match(match=[r'ab\S+yz'], timeout=0.5)
+
+    assert match.regex_matched == r'ab\S+yz'
+    assert match.text_matched == 'abcdyz'
+    assert match.text_received == 'abcd abcdyz'
+
+
+@pytest.mark.parametrize('timeout', [0.2, 1])
+def test_AsyncioEngine_wait_for_match_should_return_after_timeout(pty_pair, timeout):
+    engine = AsyncioEngine()
+    engine.open(console_fd=pty_pair.main.fd)
+
+    start_time = time.time()
+    match = engine.wait_for_match(match=['abc'], timeout=timeout)
+
+    assert match.regex_matched is None
+    assert 0.8 * timeout < time.time() - start_time < 1.2*timeout
+
+
+def test_AsyncioEngine_send_control_sends_correct_bytes(pty_pair_raw):
+    engine = AsyncioEngine()
+    engine.open(console_fd=pty_pair_raw.main.fd)
+
+    engine.send_control('C')
+
+    # The engine reads the terminal echo itself
+    assert engine.wait_for_match(match=r'\^C', timeout=0.5).regex_matched
+
+
+def test_AsyncioEngine_async_api(pty_pair):
+    engine = AsyncioEngine()
+    engine.open(console_fd=pty_pair.main.fd)
+
+    run_in_loop(engine, engine.send_line_async('abc'))
+    assert pty_pair.secondary.read(timeout=0.5) == 'abc\n'
+
+    pty_pair.secondary.write('prompt$ ')
+    match = run_in_loop(engine, engine.wait_for_match_async(match=r'\$ ', timeout=0.5))
+    assert match.text_received.endswith('prompt$ ')
+
+    pty_pair.secondary.write('def')
+    time.sleep(0.1)
+    assert run_in_loop(engine, engine.read_all_async()) == 'def'
+
+
+def test_AsyncioEngine_async_wait_for_match_serves_consoles_concurrently():
+    engines = [AsyncioEngine() for _ in range(3)]
+
+    async def run_command(engine: AsyncioEngine, index: int):
+        await engine.send_line_async(f'sleep 0.3; echo done-$((1+{index}))')
+        return await engine.wait_for_match_async(match=rf'done-{1+index}', timeout=3)
+
+    async def run_all():
+        return await asyncio.gather(*(run_command(engine, index)
+                                      for index, engine in enumerate(engines)))
+
+    for engine in engines:
+        engine.open(console_cmd='sh')
+
+    start_time = time.time()
+    matches = run_in_loop(engines[0], run_all())
+    elapsed = time.time() - start_time
+
+    for engine in engines:
+        engine.close()
+
+    assert all(match.regex_matched for match in matches)
+    assert elapsed < 0.8
+
+
+def test_AsyncioEngine_works_with_ConsoleBase(basic_console_class, pty_pair):
+    console = basic_console_class(engine=AsyncioEngine())
+    console.engine.open(console_fd=pty_pair.main.fd)
+
+    pty_pair.secondary.write('abc')
+    assert console.wait_for_quiet(quiet=0.1, timeout=1)
+    assert console.read_all() == 'abc'
@@ -1,8 +1,9 @@
+import threading
 import pytest
 from unittest.mock import MagicMock
 
-from pluma import Board
-from pluma.core.baseclasses import ConsoleBase
+from pluma import Board, BoardConsoleWarmUpError, SSHConsole, SSHSessionPool
+from pluma.core.baseclasses import ConsoleBase, PowerBase
 
 ssh_console = MagicMock(ConsoleBase)
 serial_console = MagicMock(ConsoleBase)
@@ -102,3 +103,87 @@ def test_Board_consoles_setter_should_error_on_invalid_type(consoles):
     board = Board(name='board')
     with pytest.raises(TypeError):
         board.consoles = consoles
+
+
+def test_Board_thread_console_should_only_apply_to_current_thread():
+    console = MagicMock(ConsoleBase)
+    session = MagicMock(ConsoleBase)
+    board = Board('board', console=console)
+    seen_by_other_thread = []
+
+    with board.thread_console(session):
+        assert board.console is session
+        thread = threading.Thread(target=lambda: seen_by_other_thread.append(board.console))
+        thread.start()
+        thread.join()
+
+    assert seen_by_other_thread == [console]
+    assert board.console is console
+
+
+def test_Board_warm_up_consoles_should_open_consoles_concurrently():
+    opened_together = threading.Barrier(2, timeout=5)
+    serial = MagicMock(ConsoleBase, requires_login=True)
+    serial.require_open.side_effect = lambda: opened_together.wait()
+    ssh = MagicMock(ConsoleBase, requires_login=False)
+    ssh.require_open.side_effect = lambda: opened_together.wait()
+    ssh.send_and_expect.return_value = ('', '# ')
+    board = Board('board', console={'serial': serial, 'ssh': ssh})
+
+    open_times = board.warm_up_consoles()
+
+    assert set(open_times) == {'serial', 'ssh'}
+    assert board.console_open_times == open_times
+    serial.login.assert_called_once()
+    ssh.login.assert_not_called()
+
+
+def test_Board_warm_up_consoles_should_error_if_a_console_fails():
+    serial = MagicMock(ConsoleBase, requires_login=True)
+    ssh = MagicMock(ConsoleBase, requires_login=False)
+    ssh.require_open.side_effect = RuntimeError('unreachable')
+    board = Board('board', console={'serial': serial, 'ssh': ssh})
+
+    with pytest.raises(BoardConsoleWarmUpError, match='ssh'):
+        board.warm_up_consoles()
+
+    assert 'serial' in board.console_open_times
+
+
+def test_Board_reboot_and_validate_should_close_ssh_consoles():
+    serial = MagicMock(ConsoleBase)
+    serial.send_and_expect.return_value = ('', 'login:')
+    ssh = MagicMock(SSHConsole)
+    board = Board(name='board', power=MagicMock(PowerBase),
+                  console={'serial': serial, 'ssh': ssh})
+
+    board.reboot_and_validate()
+
+    ssh.close.assert_called_once()
+    serial.close.assert_not_called()
+    board.power.reboot.assert_called_once()
+
+
+def test_Board_reboot_and_validate_should_close_session_pool():
+    console = MagicMock(ConsoleBase)
+    console.send_and_expect.return_value = ('', 'login:')
+    board = Board(name='board', power=MagicMock(PowerBase), console=console,
+                  session_pool=MagicMock(SSHSessionPool))
+
+    board.reboot_and_validate()
+
+    board.session_pool.close.assert_called_once()
+
+
+def test_Board_reboot_and_validate_should_reset_conditioning_of_all_consoles():
+    serial = MagicMock(ConsoleBase)
+    serial.send_and_expect.return_value = ('', 'login:')
+    telnet = MagicMock(ConsoleBase)
+    board = Board(name='board', power=MagicMock(PowerBase),
+                  console={'serial': serial, 'telnet': telnet})
+    serial.prompt_token = telnet.prompt_token = 'PLUMA-id$ '
+
+    board.reboot_and_validate()
+
+    assert serial.prompt_token is None
+    assert telnet.prompt_token is None
@@ -6,7 +6,7 @@ from unittest.mock import MagicMock
 from utils import nonblocking
 
 from pluma.core.baseclasses import (ConsoleError, ConsoleInvalidJSONReceivedError,
-                                    MatchResult)
+                                    MatchResult, PexpectEngine)
 from pluma.core.dataclasses import SystemContext
 
 
@@ -72,6 +72,78 @@ def test_ConsoleBase_wait_for_quiet_should_return_when_quiet(basic_console,
     assert 0.8*total_time < elapsed < 1.2*total_time
 
 
+@pytest.fixture
+def pty_console(basic_console_class, pty_pair):
+    console = basic_console_class(engine=PexpectEngine())
+    console.engine.open(console_fd=pty_pair.main.fd)
+    return console
+
+
+@pytest.mark.parametrize('quiet_time', [0.05, 0.3])
+def test_ConsoleBase_wait_for_quiet_with_fd_should_not_wait_sleep_time(pty_console,
+                                                                       quiet_time):
+    start = time.time()
+    success = pty_console.wait_for_quiet(quiet=quiet_time, sleep_time=1, timeout=2)
+    elapsed = time.time() - start
+
+    assert success is True
+    assert 0.8*quiet_time < elapsed < quiet_time + 0.1
+
+
+def test_ConsoleBase_wait_for_quiet_with_fd_should_measure_quiet_from_last_byte(
+        pty_console, pty_pair):
+    quiet_time = 0.3
+    async_result = nonblocking(pty_console.wait_for_quiet,
+                               quiet=quiet_time, timeout=5)
+
+    time.sleep(0.2)
+    pty_pair.secondary.write('abc')
+    last_byte_time = time.time()
+
+    success = async_result.get()
+    elapsed = time.time() - last_byte_time
+
+    assert success is True
+    assert 0.8*quiet_time < elapsed < quiet_time + 0.1
+
+
+@pytest.mark.parametrize('timeout', [0.2, 1])
+def test_ConsoleBase_wait_for_quiet_with_fd_should_wait_at_most_timeout(pty_console,
+                                                                        pty_pair, timeout):
+    async_result = nonblocking(pty_console.wait_for_quiet,
+                               quiet=timeout*2, timeout=timeout)
+
+    start = time.time()
+    while not async_result.ready():
+        pty_pair.secondary.write('abc')
+        time.sleep(0.025)
+
+    elapsed = time.time() - start
+    assert async_result.get() is False
+    assert 0.8*timeout < elapsed < 1.2*timeout
+
+
+def test_ConsoleBase_wait_for_bytes_with_fd_should_return_on_reception(pty_console,
+                                                                       pty_pair):
+    async_result = nonblocking(pty_console.wait_for_bytes,
+                               timeout=2, sleep_time=1)
+
+    time.sleep(0.1)
+    start = time.time()
+    pty_pair.secondary.write('abc')
+
+    assert async_result.get() is True
+    assert time.time() - start < 0.1
+
+
+def test_ConsoleBase_wait_for_bytes_with_fd_should_wait_at_most_timeout(pty_console):
+    start = time.time()
+    success = pty_console.wait_for_bytes(timeout=0.2)
+
+    assert success is False
+    assert 0.16 < time.time() - start < 0.3
+
+
 def test_ConsoleBase_send_and_read_sends_data(basic_console):
     sent = 'abc'
     basic_console.send_and_read(cmd=sent, send_newline=False, timeout=0.1)
@@ -151,33 +223,48 @@ def test_ConsoleBase_wait_for_prompt_should_call_wait_for_match(basic_console_cl
     console.engine.wait_for_match.assert_called_with(match=prompt, timeout=timeout)
 
 
+def reply_on_send(console, output: str):
+    def send(data: str):
+        console.engine.received += output
+    console.engine.send = send
+
+
 def test_ConsoleBase_get_json_data_should_error_if_not_json(basic_console):
-    basic_console.send_and_expect = MagicMock(return_value=('abc\ndef', None))
+    reply_on_send(basic_console, 'abc\ndef')
 
     with pytest.raises(ConsoleInvalidJSONReceivedError):
-        basic_console.get_json_data(cmd='command')
-
-    basic_console.send_and_expect.assert_called_once()
+        basic_console.get_json_data(cmd='command', timeout=0.1)
 
 
 def test_ConsoleBase_get_json_data_return_object(basic_console):
-    json_data = '{"abc":"def", "other":"value"}'
-    received = f'there will be json {json_data} the end.'
-    basic_console.send_and_expect = MagicMock(return_value=(received, json_data))
+    json_data = '{"abc":"def", "other": {"value": "with } and \\" in string"}}'
+    reply_on_send(basic_console, f'there will be json {json_data} the end.')
 
     json_result = basic_console.get_json_data(cmd='command')
 
-    basic_console.send_and_expect.assert_called_once()
     assert json_result == json.loads(json_data)
+    assert basic_console.read_all() == ' the end.'
 
 
-def test_ConsoleBase_get_json_data_should_match_json(basic_console):
-    json_data = '{"abc":"def", "other":"value"}'
+def test_ConsoleBase_get_json_data_returns_once_object_complete(basic_console):
+    reply_on_send(basic_console, '{"abc": 1}')
 
-    result = MatchResult('some_regex', json_data, f'there will be json {json_data} the end.')
-    basic_console.engine.wait_for_match = MagicMock(return_value=result)
-    json_result = basic_console.get_json_data(cmd='command')
-    assert json_result == json.loads(json_data)
+    start = time.time()
+    assert basic_console.get_json_data(cmd='command', timeout=5) == {'abc': 1}
+    assert time.time() - start < 1
+
+
+def test_ConsoleBase_get_json_data_skips_invalid_objects(basic_console):
+    reply_on_send(basic_console, '$ {not json} {"abc": 1}')
+
+    assert basic_console.get_json_data(cmd='command', timeout=0.1) == {'abc': 1}
+
+
+def test_ConsoleBase_get_json_data_should_error_if_too_large(basic_console):
+    reply_on_send(basic_console, '{"abc": "' + 'a' * 100)
+
+    with pytest.raises(ConsoleInvalidJSONReceivedError):
+        basic_console.get_json_data(cmd='command', timeout=0.1, max_size=50)
 
 
 def test_ConsoleBase_send_control_calls_engines_send_control(basic_console):
@@ -274,4 +361,67 @@ def test_ConsoleBase_should_call_open_for_send_control(basic_console):
     basic_console.open = MagicMock(side_effect=basic_console.open)
 
     basic_console.send_control('C')
-    basic_console.open.assert_called()
\ No newline at end of file
+    basic_console.open.assert_called()
+
+
+def test_ConsoleBase_deploy_files_copies_each_file(basic_console):
+    basic_console.copy_to_target = MagicMock()
+
+    result = basic_console.deploy_files(files=['a', 'b'], destination='/dest', timeout=3)
+
+    assert [call[1] for call in basic_console.copy_to_target.call_args_list] == [
+        {'source': 'a', 'destination': '/dest', 'timeout': 3},
+        {'source': 'b', 'destination': '/dest', 'timeout': 3}]
+    assert result.deployed == ['a', 'b']
+    assert result.skipped == []
+
+
+def test_ConsoleBase_send_and_read_with_sentinel_returns_data_before_marker(basic_console):
+    basic_console.runs_in_shell = True
+    basic_console.prompt_token = 'PLUMA-id$ '
+    basic_console.engine.wait_for_match = MagicMock(return_value=MatchResult(
+        regex_matched='PLUMA-id', text_matched='PLUMA-id\n', text_received='out\nPLUMA-id\n'))
+
+    assert basic_console.send_and_read('cmd') == 'out\n'
+    assert basic_console.engine.sent.startswith("cmd ; printf '%s-%s\\n' PLUMA ")
+
+
+def test_ConsoleBase_send_and_read_without_sentinel_until_shell_conditioned(basic_console):
+    basic_console.runs_in_shell = True
+
+    assert not basic_console.sends_end_marker
+    basic_console.prompt_token = 'PLUMA-id$ '
+    assert basic_console.sends_end_marker
+
+
+@pytest.mark.parametrize('cmd', ['', 'sleep 1 &', 'echo a # b', 'echo a |', 'if true; then',
+                                 "echo 'a", 'cat <<EOF'])
+def test_ConsoleBase_send_and_read_sends_marker_on_own_line_if_line_continues(basic_console,
+                                                                              cmd):
+    basic_console.engine.wait_for_match = MagicMock(return_value=MatchResult(
+        regex_matched=None, text_matched=None, text_received=''))
+
+    basic_console.send_and_read(cmd, sentinel=True, timeout=0)
+
+    linesep = basic_console.engine.linesep
+    assert basic_console.engine.sent.startswith(f"{cmd}{linesep}printf '%s-%s\\n' PLUMA ")
+
+
+def test_ConsoleBase_condition_shell_only_applies_to_shell_consoles(basic_console):
+    basic_console.condition_shell()
+
+    assert basic_console.prompt_token is None
+    assert basic_console.engine.sent == ''
+
+
+def test_ConsoleBase_send_paces_long_data_at_send_rate(basic_console):
+    basic_console.engine.send = MagicMock(wraps=basic_console.engine.send)
+    basic_console.send_rate = 1000
+    basic_console.send_chunk_size = 50
+
+    start = time.monotonic()
+    basic_console.send('a' * 199)
+
+    assert basic_console.engine.send.call_count == 4
+    assert basic_console.engine.sent == 'a' * 199 + basic_console.engine.linesep
+    assert time.monotonic() - start >= 0.19
@@ -0,0 +1,155 @@
+import time
+
+import pytest
+
+from utils import nonblocking
+from pluma import Board, ConsoleWatcher
+from pluma.core.baseclasses import ConsoleExceptionKeywordReceivedError, PexpectEngine
+from pluma.test import TestRunner
+from pluma.test.testbase import NoopTest
+
+
+@pytest.fixture
+def pty_console(basic_console_class, pty_pair):
+    console = basic_console_class(engine=PexpectEngine())
+    console.engine.open(console_fd=pty_pair.main.fd)
+    yield console
+    console.engine.close()
+
+
+def wait_for_hits(watcher: ConsoleWatcher, timeout: float = 2) -> list:
+    end = time.time() + timeout
+    hits = []
+    while not hits and time.time() < end:
+        time.sleep(0.05)
+        hits = watcher.pop_hits()
+
+    return hits
+
+
+def test_ConsoleWatcher_records_hit_without_waiting_on_console(pty_console, pty_pair):
+    watcher = ConsoleWatcher(pty_console)
+    watcher.start()
+    assert pty_console.engine.reader_running
+
+    pty_pair.secondary.write('booting... Kernel panic - not syncing: Fatal exception')
+    hits = wait_for_hits(watcher)
+
+    assert len(hits) == 1
+    assert hits[0].console == 'main'
+    assert hits[0].pattern == 'Kernel panic - not syncing'
+    assert hits[0].text_matched == 'Kernel panic - not syncing'
+    assert hits[0].offset == len('booting... ')
+    assert hits[0].snapshot == 'booting... Kernel panic - not syncing: Fatal exception'
+
+
+def test_ConsoleWatcher_does_not_consume_console_data(pty_console, pty_pair):
+    watcher = ConsoleWatcher(pty_console)
+    watcher.start()
+
+    pty_pair.secondary.write('Segmentation fault')
+    assert wait_for_hits(watcher)
+    assert pty_console.read_all() == 'Segmentation fault'
+
+
+def test_ConsoleWatcher_records_every_hit(pty_console, pty_pair):
+    watcher = ConsoleWatcher(pty_console, patterns=['abc', 'def'])
+    watcher.start()
+
+    pty_pair.secondary.write('abc def abc')
+    time.sleep(0.3)
+
+    assert [hit.text_matched for hit in watcher.pop_hits()] == ['abc', 'def', 'abc']
+    assert watcher.pop_hits() == []
+
+
+def test_ConsoleWatcher_finds_pattern_split_across_chunks(pty_console, pty_pair):
+    watcher = ConsoleWatcher(pty_console)
+    watcher.start()
+
+    pty_pair.secondary.write('Segmentation f')
+    time.sleep(0.2)
+    pty_pair.secondary.write('ault')
+
+    hits = wait_for_hits(watcher)
+    assert [hit.offset for hit in hits] == [0]
+
+
+def test_ConsoleWatcher_snapshot_limited_to_snapshot_size(pty_console, pty_pair):
+    watcher = ConsoleWatcher(pty_console, patterns=['oops'], snapshot_size=10)
+    watcher.start()
+
+    pty_pair.secondary.write('0123456789abcdef oops')
+    hits = wait_for_hits(watcher)
+
+    assert hits[0].snapshot == 'bcdef oops'
+
+
+def test_ConsoleWatcher_does_not_record_after_stop(pty_console, pty_pair):
+    watcher = ConsoleWatcher(pty_console, patterns=['oops'])
+    watcher.start()
+    watcher.stop()
+
+    pty_pair.secondary.write('oops')
+    time.sleep(0.3)
+
+    assert watcher.pop_hits() == []
+
+
+def test_ConsoleWatcher_abort_interrupts_wait(pty_console, pty_pair):
+    watcher = ConsoleWatcher(pty_console, patterns=['oops'], abort=True)
+    watcher.start()
+
+    async_result = nonblocking(pty_console.engine.wait_for_match, match='login:', timeout=5)
+    time.sleep(0.1)
+    start = time.time()
+    pty_pair.secondary.write('oops')
+
+    with pytest.raises(ConsoleExceptionKeywordReceivedError):
+        async_result.get()
+    assert time.time() - start < 1
+
+
+def test_ConsoleWatcher_pop_hits_clears_abort_not_raised(pty_console, pty_pair):
+    watcher = ConsoleWatcher(pty_console, patterns=['oops'], abort=True)
+    watcher.start()
+
+    pty_pair.secondary.write('oops')
+    assert wait_for_hits(watcher)
+
+    async_result = nonblocking(pty_console.engine.wait_for_match, match='login:', timeout=2)
+    time.sleep(0.1)
+    pty_pair.secondary.write('login:')
+    assert async_result.get().regex_matched == 'login:'
+
+
+def test_ConsoleWatcher_hits_saved_in_test_data(pty_console, pty_pair):
+    class PanickingTest(NoopTest):
+        def test_body(self):
+            pty_pair.secondary.write('Kernel panic - not syncing')
+            time.sleep(0.3)
+
+    watcher = ConsoleWatcher(pty_console)
+    board = Board('board', console=pty_console, watcher=watcher)
+    test = PanickingTest(board)
+    runner = TestRunner(board=board, tests=test)
+
+    assert runner.run()
+    test_data = runner.data[str(test)]['data']
+    assert test_data['console_exceptions'][0]['pattern'] == 'Kernel panic - not syncing'
+
+
+def test_ConsoleWatcher_abort_fails_test(pty_console, pty_pair):
+    class PanickingTest(NoopTest):
+        def test_body(self):
+            pty_pair.secondary.write('Kernel panic - not syncing')
+            time.sleep(0.3)
+
+    watcher = ConsoleWatcher(pty_console, abort=True)
+    board = Board('board', console=pty_console, watcher=watcher)
+    test = PanickingTest(board)
+    runner = TestRunner(board=board, tests=test)
+
+    assert runner.run() is False
+    assert len(runner.data[str(test)]['data']['console_exceptions']) == 1
+    assert 'test_body' in runner.data[str(test)]['tasks']['failed']
@@ -1,4 +1,5 @@
 import os
+import time
 import pytest
 
 from pluma import HostConsole
@@ -14,3 +15,94 @@ def test_hostconsole_bin_sh_send():
                                           )
 
     assert matched
+
+
+@pytest.mark.xfail(os.getenv('PLUMA_ENV') == 'CI', reason='CI fails to properly spawn a shell')
+def test_hostconsole_background_reader_started_on_open():
+    console = HostConsole('/bin/sh', background_reader=True)
+    console.open()
+    assert console.engine.reader_running
+
+    __, matched = console.send_and_expect(cmd='echo hello-$((1+1))',
+                                          match='hello-2',
+                                          timeout=2)
+    assert matched
+
+    console.close()
+    assert not console.engine.reader_running
+
+
+@pytest.mark.xfail(os.getenv('PLUMA_ENV') == 'CI', reason='CI fails to properly spawn a shell')
+def test_hostconsole_send_and_read_with_sentinel_waits_for_command_end():
+    console = HostConsole('/bin/sh')
+
+    output = console.send_and_read('echo one-$((1+1)); sleep 0.6; echo two-$((1+1))',
+                                   sentinel=True)
+
+    assert 'one-2' in output
+    assert 'two-2' in output
+    assert 'PLUMA-' not in output
+    console.close()
+
+
+@pytest.mark.xfail(os.getenv('PLUMA_ENV') == 'CI', reason='CI fails to properly spawn a shell')
+@pytest.mark.parametrize('cmd', ['echo hi-$((1+1))', 'echo hi-$((1+1)) # note'])
+def test_hostconsole_send_and_read_with_sentinel_removes_marker_echo(cmd):
+    console = HostConsole('/bin/sh')
+    console.send_and_read('true', sentinel=True)
+
+    output = console.send_and_read(cmd, sentinel=True, timeout=3)
+
+    assert 'PLUMA' not in output
+    assert 'printf' not in output
+    assert output.count('hi-2') == 1
+    console.close()
+
+
+@pytest.mark.xfail(os.getenv('PLUMA_ENV') == 'CI', reason='CI fails to properly spawn a shell')
+def test_hostconsole_send_and_read_with_sentinel_drops_late_output():
+    console = HostConsole('/bin/sh')
+    console.send_and_read('true', sentinel=True)
+
+    console.send_and_read('sleep 0.5; echo late-$((1+1))', sentinel=True, timeout=0.1)
+    output = console.send_and_read('echo next-$((1+1))', sentinel=True, timeout=3)
+
+    assert 'late-2' not in output
+    assert 'PLUMA' not in output
+    assert 'next-2' in output
+    console.close()
+
+
+@pytest.mark.xfail(os.getenv('PLUMA_ENV') == 'CI', reason='CI fails to properly spawn a shell')
+@pytest.mark.parametrize('cmd', ['', 'sleep 0.1 &', 'echo hi-$((1+1)) # note'])
+def test_hostconsole_send_and_read_with_sentinel_completes_any_command(cmd):
+    console = HostConsole('/bin/sh')
+    console.send_and_read('true', sentinel=True)
+
+    start = time.monotonic()
+    output = console.send_and_read(cmd, sentinel=True, timeout=3)
+
+    assert time.monotonic() - start < 2
+    assert 'Syntax error' not in output
+    if '#' in cmd:
+        assert 'hi-2' in output
+    console.close()
+
+
+@pytest.mark.xfail(os.getenv('PLUMA_ENV') == 'CI', reason='CI fails to properly spawn a shell')
+def test_hostconsole_condition_shell_sets_prompt_token_and_disables_echo():
+    console = HostConsole('/bin/sh')
+    console.runs_in_shell = True
+    console.send_and_read('TERM=vt100; export TERM')
+
+    console.condition_shell()
+
+    assert console.prompt_token
+    output = console.send_and_read('echo term-$TERM')
+    assert 'term-dumb' in output
+    assert 'echo' not in output
+
+    console.restore_shell()
+    assert console.prompt_token is None
+    assert 'term-vt100' in console.send_and_read('echo term-$TERM')
+    console.close()
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from pluma.core.baseclasses import (ConsoleInvalidJSONReceivedError, JsonFramer,
+                                    ReceptionBuffer)
+
+
+def test_JsonFramer_returns_none_without_object():
+    buffer = ReceptionBuffer(encoding='ascii')
+    buffer.append(b'no object "here" }')
+
+    assert JsonFramer().search(buffer) is None
+
+
+def test_JsonFramer_frames_top_level_object():
+    data = b'{"a": {"b": [1, 2]}, "c": {}}'
+    buffer = ReceptionBuffer(encoding='ascii')
+    buffer.append(b'$ cmd\n' + data + b'\n$ ')
+
+    assert JsonFramer().search(buffer) == (6, 6 + len(data))
+
+
+def test_JsonFramer_ignores_braces_in_strings():
+    data = b'{"a": "}{", "b\\"}": "\\\\"}'
+    buffer = ReceptionBuffer(encoding='ascii')
+    buffer.append(data + b' {}')
+
+    start, end = JsonFramer().search(buffer)
+    assert json.loads(data[start:end]) == {'a': '}{', 'b"}': '\\'}
+
+
+@pytest.mark.parametrize('split', range(1, 25))
+def test_JsonFramer_frames_object_received_in_chunks(split):
+    data = b'{"a": "}{", "b\\"}": "\\\\"}'
+    buffer = ReceptionBuffer(encoding='ascii')
+    framer = JsonFramer()
+
+    buffer.append(data[:split])
+    assert framer.search(buffer) is None
+    buffer.append(data[split:])
+    assert framer.search(buffer) == (0, len(data))
+
+
+def test_JsonFramer_restart_after_finds_next_object():
+    buffer = ReceptionBuffer(encoding='ascii')
+    buffer.append(b'{invalid {"a": 1}}')
+    framer = JsonFramer()
+
+    assert framer.search(buffer) == (0, 18)
+    framer.restart_after(0)
+    assert framer.search(buffer) == (9, 17)
+
+
+def test_JsonFramer_error_if_object_exceeds_max_size():
+    buffer = ReceptionBuffer(encoding='ascii')
+    buffer.append(b'prompt$ {"a": "' + b'a' * 20)
+
+    with pytest.raises(ConsoleInvalidJSONReceivedError):
+        JsonFramer(max_size=20).search(buffer)
+
+
+def test_JsonFramer_resumes_scan_inside_unterminated_string():
+    data = b'{"a": "' + b'x\\"\\\\' * 50 + b'"}'
+    buffer = ReceptionBuffer(encoding='ascii')
+    framer = JsonFramer()
+
+    for index in range(len(data) - 1):
+        buffer.append(data[index:index + 1])
+        assert framer.search(buffer) is None
+        # Only a trailing backslash is scanned again
+        assert framer._position >= buffer.end_offset - 1
+
+    buffer.append(data[-1:])
+    assert framer.search(buffer) == (0, len(data))
@@ -0,0 +1,85 @@
+import pytest
+
+from pluma.core.baseclasses import PatternMatcher, ReceptionBuffer
+
+
+def buffer_with(*chunks: bytes) -> ReceptionBuffer:
+    buffer = ReceptionBuffer(encoding='ascii')
+    for chunk in chunks:
+        buffer.append(chunk)
+    return buffer
+
+
+def test_PatternMatcher_returns_none_if_no_match():
+    matcher = PatternMatcher(['abc', 'def'])
+    assert matcher.search(buffer_with(b'nothing here')) is None
+
+
+def test_PatternMatcher_returns_match_details():
+    matcher = PatternMatcher([r'ab\S+yz'])
+    match = matcher.search(buffer_with(b'abcd abcdyz end'))
+
+    assert match.index == 0
+    assert match.pattern == r'ab\S+yz'
+    assert match.start == 5
+    assert match.end == 11
+    assert match.matched == b'abcdyz'
+
+
+@pytest.mark.parametrize('patterns', [['second', 'first'], ['fir(s)t', r'(s)\w+nd']])
+def test_PatternMatcher_returns_earliest_match(patterns):
+    matcher = PatternMatcher(patterns)
+    match = matcher.search(buffer_with(b'first then second'))
+
+    assert match.matched == b'first'
+
+
+@pytest.mark.parametrize('patterns, received', [(['abc', 'a'], b'abcd'),
+                                                (['a', 'abc'], b'abcd'),
+                                                ([r'(a)b\1', 'a'], b'abad')])
+def test_PatternMatcher_first_pattern_wins_at_same_position(patterns, received):
+    matcher = PatternMatcher(patterns)
+    match = matcher.search(buffer_with(received))
+
+    assert match.index == 0
+
+
+def test_PatternMatcher_finds_match_across_chunks():
+    buffer = buffer_with(b'login')
+    matcher = PatternMatcher('login: ')
+    assert matcher.search(buffer) is None
+
+    buffer.append(b': ')
+    match = matcher.search(buffer)
+
+    assert match.start == 0
+    assert match.end == 7
+
+
+def test_PatternMatcher_only_rescans_overlap():
+    buffer = buffer_with(b'abcdef')
+    matcher = PatternMatcher('abc.*ghi', overlap=2)
+    assert matcher.search(buffer) is None
+
+    buffer.append(b'ghi')
+    assert matcher.search(buffer) is None
+
+
+def test_PatternMatcher_without_overlap_rescans_everything():
+    buffer = buffer_with(b'abcdef')
+    matcher = PatternMatcher('abc.*ghi', overlap=None)
+    assert matcher.search(buffer) is None
+
+    buffer.append(b'ghi')
+    assert matcher.search(buffer).matched == b'abcdefghi'
+
+
+def test_PatternMatcher_offsets_are_stream_offsets():
+    buffer = buffer_with(b'abc')
+    buffer.flush()
+    buffer.append(b'def')
+
+    match = PatternMatcher('e').search(buffer)
+
+    assert match.start == 4
+    assert match.end == 5
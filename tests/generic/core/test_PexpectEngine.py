@@ -1,6 +1,7 @@
 import time
 import pytest
 
+from utils import nonblocking
 from pluma.core.baseclasses import PexpectEngine
 
 
@@ -71,6 +72,117 @@ def test_PexpectEngine_read_all_can_preserve_buffer(pty_pair):
     assert received3_actual == ''
 
 
+def test_PexpectEngine_read_all_reads_in_chunks(pty_pair):
+    received = 'abcdef' * 100
+    engine = PexpectEngine(read_chunk_size=256)
+    engine.open(console_fd=pty_pair.main.fd)
+
+    pty_pair.secondary.write(received)
+    received_actual = engine.read_all()
+
+    assert received_actual == received
+    assert engine.read_stats.bytes_read == len(received)
+    assert engine.read_stats.read_calls == 3
+
+
+def test_PexpectEngine_read_all_max_read_size_limits_drain(pty_pair):
+    received = 'abcdef' * 100
+    engine = PexpectEngine(read_chunk_size=256, max_read_size=300)
+    engine.open(console_fd=pty_pair.main.fd)
+
+    pty_pair.secondary.write(received)
+    received1_actual = engine.read_all()
+    received2_actual = engine.read_all()
+
+    assert received1_actual == received[:300]
+    assert received2_actual == received[300:]
+
+
+def test_PexpectEngine_read_all_returns_immediately_when_empty(pty_pair):
+    engine = PexpectEngine()
+    engine.open(console_fd=pty_pair.main.fd)
+
+    start_time = time.time()
+    for _ in range(10):
+        engine.read_all()
+
+    assert time.time() - start_time < 0.05
+    assert engine.read_stats.drains == 10
+    assert engine.read_stats.bytes_read == 0
+
+
+def test_PexpectEngine_read_all_decodes_character_split_across_reads(pty_pair_raw):
+    encoded = '€'.encode('utf-8')
+    engine = PexpectEngine(encoding='utf-8')
+    engine.open(console_fd=pty_pair_raw.main.fd)
+
+    pty_pair_raw.secondary.write(encoded[:1])
+    received1_actual = engine.read_all()
+    pty_pair_raw.secondary.write(encoded[1:])
+    received2_actual = engine.read_all()
+
+    assert received1_actual == ''
+    assert received2_actual == '€'
+
+
+def test_PexpectEngine_reception_buffer_size_is_in_bytes(pty_pair_raw):
+    encoded = 'a€'.encode('utf-8')
+    engine = PexpectEngine(encoding='utf-8')
+    engine.open(console_fd=pty_pair_raw.main.fd)
+
+    pty_pair_raw.secondary.write(encoded)
+    engine.read_all(preserve_read_buffer=True)
+
+    assert engine.reception_buffer_size == len(encoded)
+    assert engine.bytes_received == len(encoded)
+
+
+def test_PexpectEngine_reception_buffer_max_size_bounds_buffer(pty_pair):
+    engine = PexpectEngine(reception_buffer_max_size=4)
+    engine.open(console_fd=pty_pair.main.fd)
+
+    pty_pair.secondary.write('abcdef')
+    received = engine.read_all(preserve_read_buffer=True)
+
+    assert received == 'cdef'
+    assert engine.reception_buffer_size == 4
+    assert engine.bytes_received == 6
+
+
+def test_PexpectEngine_fileno_returns_console_fd(pty_pair):
+    engine = PexpectEngine()
+    assert engine.fileno() is None
+
+    engine.open(console_fd=pty_pair.main.fd)
+    assert engine.fileno() == pty_pair.main.fd
+
+
+def test_PexpectEngine_wait_for_data_returns_when_data_available(pty_pair):
+    engine = PexpectEngine()
+    engine.open(console_fd=pty_pair.main.fd)
+
+    assert engine.wait_for_data(timeout=0.1) is False
+
+    pty_pair.secondary.write('abc')
+    start_time = time.time()
+    assert engine.wait_for_data(timeout=2) is True
+    assert time.time() - start_time < 0.1
+
+
+def test_PexpectEngine_receive_records_last_reception_time(pty_pair):
+    engine = PexpectEngine()
+    engine.open(console_fd=pty_pair.main.fd)
+    assert engine.last_reception_time is None
+
+    engine.receive()
+    assert engine.last_reception_time is None
+
+    pty_pair.secondary.write('abc')
+    before = time.monotonic()
+    assert engine.receive() == 3
+    assert before <= engine.last_reception_time <= time.monotonic()
+
+
 def test_PexpectEngine_wait_for_match_return_match_and_if_matched(pty_pair):
     pattern = r'ab\S+yz'
     pattern_text = 'abcdyz'
@@ -120,6 +232,59 @@ def test_PexpectEngine_wait_for_match_should_match_only_once(pty_pair):
     assert match.regex_matched is None
 
 
+def test_PexpectEngine_wait_for_match_keeps_data_after_match(pty_pair):
+    engine = PexpectEngine()
+    engine.open(console_fd=pty_pair.main.fd)
+
+    pty_pair.secondary.write('abc def ghi')
+    match = engine.wait_for_match(match=['def'], timeout=0.5)
+
+    assert match.text_received == 'abc def'
+    assert engine.read_all() == ' ghi'
+
+
+def test_PexpectEngine_wait_for_match_includes_buffered_data(pty_pair):
+    engine = PexpectEngine()
+    engine.open(console_fd=pty_pair.main.fd)
+
+    pty_pair.secondary.write('abc')
+    engine.read_all(preserve_read_buffer=True)
+    pty_pair.secondary.write('def')
+    match = engine.wait_for_match(match=['cd'], timeout=0.5)
+
+    assert match.text_matched == 'cd'
+    assert match.text_received == 'abcd'
+
+
+def test_PexpectEngine_wait_for_match_returns_match_offset_and_time(pty_pair):
+    engine = PexpectEngine()
+    engine.open(console_fd=pty_pair.main.fd)
+
+    pty_pair.secondary.write('abc')
+    engine.read_all()
+    pty_pair.secondary.write('def ghi')
+    before = time.monotonic()
+    match = engine.wait_for_match(match=['ghi'], timeout=0.5)
+
+    assert match.match_offset == 7
+    assert before <= match.match_time <= time.monotonic()
+
+
+def test_PexpectEngine_wait_for_match_matches_data_received_while_waiting(pty_pair):
+    engine = PexpectEngine()
+    engine.open(console_fd=pty_pair.main.fd)
+
+    async_result = nonblocking(engine.wait_for_match, match=['login: '], timeout=2)
+    time.sleep(0.1)
+    pty_pair.secondary.write('log')
+    time.sleep(0.1)
+    pty_pair.secondary.write('in: ')
+
+    match = async_result.get()
+    assert match.regex_matched == 'login: '
+    assert match.text_received == 'login: '
+
+
 @pytest.mark.parametrize('timeout', [0.2, 1])
 def test_PexpectEngine_wait_for_match_should_return_after_timeout(pty_pair, timeout):
     engine = PexpectEngine()
@@ -166,3 +331,116 @@ def test_PexpectEngine_error_on_invalid_code(pty_pair_raw):
 
     with pytest.raises(Exception):
         engine.send_control('!')
+
+
+def test_PexpectEngine_subscription_receives_data_from_subscription_time(pty_pair):
+    engine = PexpectEngine()
+    engine.open(console_fd=pty_pair.main.fd)
+
+    pty_pair.secondary.write('abc')
+    engine.receive()
+    subscription = engine.subscribe()
+    pty_pair.secondary.write('def')
+
+    assert engine.read_all() == 'abcdef'
+    assert subscription.offset == 3
+    assert subscription.read() == 'def'
+    assert subscription.read() == ''
+    assert subscription.offset == 6
+
+
+def test_PexpectEngine_subscriptions_have_independent_cursors(pty_pair):
+    engine = PexpectEngine()
+    engine.open(console_fd=pty_pair.main.fd)
+    first = engine.subscribe()
+    second = engine.subscribe()
+
+    pty_pair.secondary.write('abc')
+    engine.receive()
+    assert first.read() == 'abc'
+
+    pty_pair.secondary.write('def')
+    engine.receive()
+    assert first.read() == 'def'
+    assert second.read_bytes() == b'abcdef'
+    assert engine.read_all() == 'abcdef'
+
+
+def test_PexpectEngine_subscription_wait_for_match_does_not_consume_engine_data(pty_pair):
+    engine = PexpectEngine()
+    engine.open(console_fd=pty_pair.main.fd)
+    subscription = engine.subscribe()
+
+    pty_pair.secondary.write('abc def ghi')
+    match = subscription.wait_for_match(match='def', timeout=0.5)
+
+    assert match.text_received == 'abc def'
+    assert match.match_offset == 4
+    assert subscription.read() == ' ghi'
+    assert engine.read_all() == 'abc def ghi'
+
+
+def test_PexpectEngine_subscription_callback_receives_chunks(pty_pair):
+    engine = PexpectEngine()
+    engine.open(console_fd=pty_pair.main.fd)
+    chunks = []
+    subscription = engine.subscribe(callback=lambda data, timestamp: chunks.append(data))
+
+    pty_pair.secondary.write('abc')
+    engine.receive()
+    subscription.close()
+    pty_pair.secondary.write('def')
+    engine.receive()
+
+    assert chunks == [b'abc']
+
+
+def test_PexpectEngine_reader_receives_data_in_background(pty_pair):
+    engine = PexpectEngine()
+    engine.open(console_fd=pty_pair.main.fd)
+    subscription = engine.subscribe()
+    engine.start_reader()
+    assert engine.reader_running
+
+    pty_pair.secondary.write('abc')
+    time.sleep(0.2)
+
+    assert engine.bytes_received == 3
+    assert subscription.read() == 'abc'
+    assert engine.read_all() == 'abc'
+
+    engine.close()
+    assert not engine.reader_running
+
+
+def test_PexpectEngine_wait_for_match_with_reader_returns_immediately_on_match(pty_pair):
+    engine = PexpectEngine()
+    engine.open(console_fd=pty_pair.main.fd)
+    engine.start_reader()
+
+    async_result = nonblocking(engine.wait_for_match, match=['login: '], timeout=2)
+    time.sleep(0.1)
+    pty_pair.secondary.write('log')
+    time.sleep(0.1)
+    start_time = time.time()
+    pty_pair.secondary.write('in: ')
+
+    match = async_result.get()
+    assert match.text_received == 'login: '
+    assert time.time() - start_time < 0.1
+    engine.stop_reader()
+
+
+def test_PexpectEngine_reader_can_be_paused(pty_pair):
+    engine = PexpectEngine()
+    engine.open(console_fd=pty_pair.main.fd)
+    engine.start_reader()
+
+    with engine.reader_paused():
+        assert not engine.reader_running
+        pty_pair.secondary.write('abc')
+        time.sleep(0.2)
+        assert engine.bytes_received == 0
+
+    assert engine.reader_running
+    engine.close()
@@ -0,0 +1,113 @@
+import os
+import time
+
+import pytest
+
+from pluma.core.baseclasses import (PexpectEngine, RawLogIndex, RawLogSettings,
+                                    RawLogWriter)
+
+
+def write_chunks(writer: RawLogWriter, chunks: list, delay: float = 0.05) -> list:
+    '''Write chunks to the log, and return the time around each write'''
+    times = []
+    for chunk in chunks:
+        before = time.time()
+        writer.write(chunk)
+        times.append((before, time.time()))
+        time.sleep(delay)
+
+    return times
+
+
+def test_RawLogIndex_has_entry_per_chunk(tmp_path):
+    writer = RawLogWriter(str(tmp_path / 'raw.log'))
+    times = write_chunks(writer, [b'abc', b'defgh'])
+    writer.close()
+
+    with RawLogIndex(writer.path) as index:
+        assert len(index) == 2
+        assert [(entry.offset, entry.size) for entry in index] == [(0, 3), (3, 5)]
+        for entry, (before, after) in zip(index, times):
+            assert before - 0.01 <= entry.time <= after + 0.01
+
+
+def test_RawLogIndex_time_at_offset(tmp_path):
+    writer = RawLogWriter(str(tmp_path / 'raw.log'))
+    write_chunks(writer, [b'abc', b'defgh'])
+    writer.close()
+
+    with RawLogIndex(writer.path) as index:
+        assert index.time_at(0) == index.time_at(2) == index[0].time
+        assert index.time_at(3) == index.time_at(7) == index[1].time
+        assert index[1].time > index[0].time
+        assert index.time_at(8) is None
+
+
+def test_RawLogIndex_search_returns_match_times(tmp_path):
+    writer = RawLogWriter(str(tmp_path / 'raw.log'),
+                          settings=RawLogSettings(compression='gzip'))
+    write_chunks(writer, [b'Booting...\n', b'login: ', b'root\nlogin: '])
+    writer.close()
+
+    with RawLogIndex(writer.path) as index:
+        matches = list(index.search('login: '))
+
+        assert [match.start for match, __ in matches] == [11, 23]
+        assert [match_time for __, match_time in matches] == [index[1].time,
+                                                              index[2].time]
+
+
+def test_RawLogIndex_search_finds_matches_across_chunks(tmp_path):
+    writer = RawLogWriter(str(tmp_path / 'raw.log'))
+    writer.write(b'a' * 100 + b'needle' + b'a' * 100)
+    writer.close()
+
+    with RawLogIndex(writer.path) as index:
+        matches = list(index.search('needle', chunk_size=103, overlap=16))
+
+    assert [(match.start, match.matched) for match, __ in matches] == [(100, b'needle')]
+
+
+def test_RawLogIndex_rotated_with_log(tmp_path):
+    writer = RawLogWriter(str(tmp_path / 'raw.log'), settings=RawLogSettings(backup_count=1))
+    for chunk in [b'abc', b'def', b'ghi']:
+        writer.write(chunk)
+        writer.rotate()
+    writer.write(b'jk')
+    writer.close()
+
+    assert not os.path.exists(str(tmp_path / 'raw.log.2.idx'))
+    with RawLogIndex(str(tmp_path / 'raw.log.3')) as index:
+        assert [(entry.offset, entry.size) for entry in index] == [(0, 3)]
+    with RawLogIndex(writer.path) as index:
+        assert [(entry.offset, entry.size) for entry in index] == [(0, 2)]
+
+
+def test_RawLogIndex_not_written_if_disabled(tmp_path):
+    writer = RawLogWriter(str(tmp_path / 'raw.log'),
+                          settings=RawLogSettings(timestamp_index=False))
+    writer.write(b'abc')
+    writer.close()
+
+    assert not os.path.exists(writer.path + '.idx')
+
+
+def test_RawLogIndex_error_on_invalid_index(tmp_path):
+    (tmp_path / 'raw.log.idx').write_bytes(b'not an index, but long enough')
+
+    with pytest.raises(ValueError):
+        RawLogIndex(str(tmp_path / 'raw.log'))
+
+
+def test_RawLogIndex_written_by_engine(pty_pair, tmp_path):
+    logfile = str(tmp_path / 'raw.log')
+    engine = PexpectEngine(raw_logfile=logfile)
+    engine.open(console_fd=pty_pair.main.fd)
+
+    pty_pair.secondary.write('abc')
+    assert engine.wait_for_match('abc', timeout=0.5).regex_matched
+    engine.close()
+
+    with RawLogIndex(logfile) as index:
+        assert sum(entry.size for entry in index) == 3
+        assert index.time_at(0) is not None
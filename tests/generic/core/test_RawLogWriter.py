@@ -0,0 +1,144 @@
+import gzip
+import os
+import time
+
+import pytest
+
+from pluma.core.baseclasses import PexpectEngine, RawLogSettings, RawLogWriter
+
+
+def read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_RawLogWriter_sync_writes_pending_data(tmp_path):
+    writer = RawLogWriter(str(tmp_path / 'raw.log'))
+    writer.write(b'abc')
+    writer.sync()
+
+    assert read_file(writer.path) == b'abc'
+    writer.close()
+
+
+def test_RawLogWriter_writes_in_background(tmp_path):
+    writer = RawLogWriter(str(tmp_path / 'raw.log'))
+    writer.write(b'abc')
+    time.sleep(0.5)
+
+    assert read_file(writer.path) == b'abc'
+    writer.close()
+
+
+def test_RawLogWriter_close_writes_pending_data(tmp_path):
+    writer = RawLogWriter(str(tmp_path / 'raw.log'))
+    writer.write(b'abc')
+    writer.write(b'def')
+    writer.close()
+
+    assert read_file(writer.path) == b'abcdef'
+    assert writer.write(b'ghi') == 0
+
+
+def test_RawLogWriter_gzip_compression(tmp_path):
+    writer = RawLogWriter(str(tmp_path / 'raw.log'),
+                          settings=RawLogSettings(compression='gzip'))
+    writer.write(b'abc' * 1000)
+    writer.close()
+
+    assert writer.path == str(tmp_path / 'raw.log.gz')
+    assert os.path.getsize(writer.path) < 1000
+    with gzip.open(writer.path, 'rb') as f:
+        assert f.read() == b'abc' * 1000
+
+
+def test_RawLogWriter_zstd_compression(tmp_path):
+    zstandard = pytest.importorskip('zstandard')
+
+    writer = RawLogWriter(str(tmp_path / 'raw.log'),
+                          settings=RawLogSettings(compression='zstd'))
+    writer.write(b'abc' * 1000)
+    writer.close()
+
+    assert writer.path == str(tmp_path / 'raw.log.zst')
+    with open(writer.path, 'rb') as f:
+        assert zstandard.ZstdDecompressor().stream_reader(f).read() == b'abc' * 1000
+
+
+def test_RawLogWriter_error_on_unsupported_compression():
+    with pytest.raises(ValueError):
+        RawLogSettings(compression='lzma')
+
+
+def test_RawLogWriter_rotates_on_max_size(tmp_path):
+    writer = RawLogWriter(str(tmp_path / 'raw.log'), settings=RawLogSettings(max_size=4))
+    writer.write(b'abcd')
+    writer.sync()
+    writer.write(b'ef')
+    writer.close()
+
+    assert writer.rotated_paths == [str(tmp_path / 'raw.log.1')]
+    assert read_file(str(tmp_path / 'raw.log.1')) == b'abcd'
+    assert read_file(writer.path) == b'ef'
+
+
+def test_RawLogWriter_rotates_each_iteration_if_enabled(tmp_path):
+    writer = RawLogWriter(str(tmp_path / 'raw.log'),
+                          settings=RawLogSettings(rotate_each_iteration=True))
+    writer.write(b'abc')
+    writer.start_iteration()
+    writer.write(b'def')
+    writer.start_iteration()
+    writer.close()
+
+    assert writer.rotated_paths == [str(tmp_path / 'raw.log.1'), str(tmp_path / 'raw.log.2')]
+    assert read_file(str(tmp_path / 'raw.log.1')) == b'abc'
+    assert read_file(str(tmp_path / 'raw.log.2')) == b'def'
+    assert read_file(writer.path) == b''
+
+
+def test_RawLogWriter_does_not_rotate_each_iteration_by_default(tmp_path):
+    writer = RawLogWriter(str(tmp_path / 'raw.log'))
+    writer.write(b'abc')
+    writer.start_iteration()
+    writer.close()
+
+    assert writer.rotated_paths == []
+    assert read_file(writer.path) == b'abc'
+
+
+def test_RawLogWriter_keeps_backup_count_rotated_logs(tmp_path):
+    writer = RawLogWriter(str(tmp_path / 'raw.log'),
+                          settings=RawLogSettings(backup_count=2))
+    for data in [b'a', b'b', b'c']:
+        writer.write(data)
+        writer.rotate()
+    writer.close()
+
+    assert writer.rotated_paths == [str(tmp_path / 'raw.log.2'), str(tmp_path / 'raw.log.3')]
+    assert read_file(str(tmp_path / 'raw.log.3')) == b'c'
+
+
+def test_RawLogWriter_continues_rotated_log_numbering(tmp_path):
+    (tmp_path / 'raw.log.7').write_bytes(b'old')
+
+    writer = RawLogWriter(str(tmp_path / 'raw.log'))
+    writer.rotate()
+    writer.close()
+
+    assert writer.rotated_paths == [str(tmp_path / 'raw.log.7'), str(tmp_path / 'raw.log.8')]
+
+
+def test_RawLogWriter_used_by_engine_for_raw_log(pty_pair, tmp_path):
+    logfile = str(tmp_path / 'raw.log')
+    engine = PexpectEngine(raw_logfile=logfile,
+                           raw_log_settings=RawLogSettings(compression='gzip'))
+    engine.open(console_fd=pty_pair.main.fd)
+    assert isinstance(engine.raw_log, RawLogWriter)
+
+    pty_pair.secondary.write('abcdef')
+    assert engine.wait_for_match('def', timeout=0.5).regex_matched
+    engine.close()
+
+    with gzip.open(logfile + '.gz', 'rb') as f:
+        assert f.read() == b'abcdef'
@@ -0,0 +1,129 @@
+import re
+
+import pytest
+
+from pluma.core.baseclasses import ReceptionBuffer
+
+
+def test_ReceptionBuffer_text_returns_decoded_data():
+    buffer = ReceptionBuffer(encoding='utf-8')
+    buffer.append(b'abc')
+    buffer.append(b'def')
+
+    assert buffer.text == 'abcdef'
+    assert buffer.size == 6
+
+
+def test_ReceptionBuffer_decodes_character_split_across_chunks():
+    encoded = 'é€'.encode('utf-8')
+    buffer = ReceptionBuffer(encoding='utf-8')
+
+    buffer.append(encoded[:2])
+    assert buffer.text == 'é'
+
+    buffer.append(encoded[2:3])
+    assert buffer.text == 'é'
+
+    buffer.append(encoded[3:])
+    assert buffer.text == 'é€'
+
+
+def test_ReceptionBuffer_flush_returns_and_removes_content():
+    buffer = ReceptionBuffer(encoding='utf-8')
+    buffer.append(b'abc')
+
+    assert buffer.flush() == 'abc'
+    assert buffer.text == ''
+    assert buffer.size == 0
+
+
+def test_ReceptionBuffer_flush_keeps_incomplete_character():
+    encoded = 'a€'.encode('utf-8')
+    buffer = ReceptionBuffer(encoding='utf-8')
+
+    buffer.append(encoded[:2])
+    assert buffer.flush() == 'a'
+    assert buffer.size == 1
+
+    buffer.append(encoded[2:])
+    assert buffer.flush() == '€'
+
+
+def test_ReceptionBuffer_consume_inside_character_keeps_it_whole():
+    buffer = ReceptionBuffer(encoding='utf-8')
+    buffer.append('😀😀'.encode('utf-8'))
+
+    assert buffer.consume(5) == '😀'
+    assert buffer.text == '😀'
+    assert buffer.size == 4
+
+
+def test_ReceptionBuffer_offsets_are_absolute():
+    buffer = ReceptionBuffer(encoding='ascii')
+    buffer.append(b'abc')
+    buffer.flush()
+    buffer.append(b'de')
+
+    assert buffer.start_offset == 3
+    assert buffer.end_offset == 5
+
+
+def test_ReceptionBuffer_max_size_keeps_most_recent_bytes():
+    buffer = ReceptionBuffer(encoding='ascii', max_size=4)
+    buffer.append(b'abc')
+    assert buffer.text == 'abc'
+
+    buffer.append(b'def')
+
+    assert buffer.size == 4
+    assert buffer.text == 'cdef'
+    assert buffer.raw == b'cdef'
+    assert buffer.start_offset == 2
+    assert buffer.end_offset == 6
+
+
+def test_ReceptionBuffer_max_size_keeps_text_in_step():
+    buffer = ReceptionBuffer(encoding='utf-8', max_size=100)
+    buffer.compaction_size = 150
+
+    for index in range(1000):
+        buffer.append(f'{index:09d}\n'.encode())
+        assert buffer.text.endswith(f'{index:09d}\n')
+
+    assert buffer.text == ''.join(f'{index:09d}\n' for index in range(990, 1000))
+    assert buffer.consume(buffer.start_offset + 15) == '000000990\n00000'
+    assert buffer.text == ''.join(f'{index:09d}\n' for index in range(991, 1000))[5:]
+
+
+def test_ReceptionBuffer_max_size_replaces_character_cut():
+    buffer = ReceptionBuffer(encoding='utf-8', max_size=3)
+    buffer.append('€'.encode('utf-8'))
+    assert buffer.text == '€'
+
+    buffer.append(b'b')
+
+    assert buffer.text == '\ufffd\ufffdb'
+
+
+def test_ReceptionBuffer_search_positions_relative_to_start():
+    buffer = ReceptionBuffer(encoding='ascii', max_size=6)
+    buffer.append(b'abcdef')
+    buffer.append(b'ghi')
+
+    match = buffer.search(re.compile(b'^d'), buffer.start_offset)
+    assert buffer.start_offset + match.start() == 3
+
+
+def test_ReceptionBuffer_clear_removes_everything():
+    buffer = ReceptionBuffer(encoding='utf-8')
+    buffer.append('a€'.encode('utf-8')[:2])
+    buffer.clear()
+
+    assert buffer.size == 0
+    assert buffer.text == ''
+    assert buffer.end_offset == 2
+
+
+def test_ReceptionBuffer_error_on_invalid_max_size():
+    with pytest.raises(ValueError):
+        ReceptionBuffer(encoding='ascii', max_size=0)
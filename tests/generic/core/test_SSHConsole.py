@@ -1,2 +1,152 @@
+import json
+from subprocess import CompletedProcess
+from unittest.mock import patch
+
+import pytest
+
+from pluma import SSHConsole, SSHControlMaster
+from pluma.core.baseclasses import ConsoleCannotOpenError, ConsoleFileTransferError
+from pluma.core.dataclasses import Credentials, SystemContext
+
+
+@pytest.fixture
+def local_ssh_console(minimal_ssh_console):
+    '''SSH console running remote commands on the host'''
+    with patch.object(SSHConsole, 'ssh_command', lambda self, command: ['sh', '-c', command]), \
+            patch.object(SSHControlMaster, 'start'):
+        yield minimal_ssh_console
+
+
+@pytest.fixture
+def deploy_sources(tmp_path):
+    sources = []
+    for name in ['one.txt', 'two.bin']:
+        path = tmp_path / 'sources' / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(name.encode() * 100)
+        sources.append(str(path))
+
+    return sources
+
+
 def test_SSHConsole_does_require_login(minimal_ssh_console):
     assert minimal_ssh_console.requires_login is False
+
+
+def test_SSHConsole_session_uses_control_master(minimal_ssh_console):
+    control_path = minimal_ssh_console.control_master.control_path
+    assert f'ControlPath={control_path}' in minimal_ssh_console.command
+    assert 'ControlMaster=no' in minimal_ssh_console.command
+
+
+def test_SSHConsole_session_without_multiplexing():
+    console = SSHConsole(target='localhost',
+                         system=SystemContext(credentials=Credentials('root')),
+                         multiplexing=False)
+    assert console.control_master is None
+    assert 'ControlPath' not in console.command
+
+
+def test_SSHConsole_open_fails_if_ssh_server_not_ready(minimal_ssh_console):
+    with patch('pluma.core.sshconsole.wait_for_ssh_server', return_value=None) as wait, \
+            patch.object(SSHControlMaster, 'start') as start:
+        with pytest.raises(ConsoleCannotOpenError):
+            minimal_ssh_console.open()
+
+    wait.assert_called_once_with(minimal_ssh_console.target, port=22,
+                                 timeout=minimal_ssh_console.ready_timeout)
+    start.assert_not_called()
+
+
+def test_SSHConsole_wait_until_ready_saves_ready_time(minimal_ssh_console):
+    with patch('pluma.core.sshconsole.wait_for_ssh_server', return_value=1.5):
+        assert minimal_ssh_console.wait_until_ready(timeout=3) == 1.5
+
+    assert minimal_ssh_console.ssh_ready_time == 1.5
+
+
+def test_SSHConsole_server_address_uses_port_set():
+    console = SSHConsole(target='localhost', port=2222,
+                         system=SystemContext(credentials=Credentials('root')))
+
+    assert 'Port=2222' in console.command
+    with patch('subprocess.run', side_effect=FileNotFoundError):
+        assert console.server_address() == ('localhost', 2222)
+
+
+def test_SSHConsole_server_address_resolved_from_ssh_config(minimal_ssh_console):
+    config = CompletedProcess(args=[], returncode=0,
+                              stdout=b'user root\nhostname 10.0.0.2\nport 2200\n')
+    with patch('subprocess.run', return_value=config) as run:
+        assert minimal_ssh_console.server_address() == ('10.0.0.2', 2200)
+
+    assert run.call_args[0][0][:2] == ['ssh', '-G']
+
+
+@pytest.mark.parametrize('proxy', ['proxyjump bastion', 'proxycommand nc %h %p'])
+def test_SSHConsole_wait_until_ready_skipped_through_proxy(minimal_ssh_console, proxy):
+    config = CompletedProcess(args=[], returncode=0,
+                              stdout=f'hostname 10.0.0.2\n{proxy}\n'.encode())
+    with patch('subprocess.run', return_value=config), \
+            patch('pluma.core.sshconsole.wait_for_ssh_server') as wait:
+        assert minimal_ssh_console.wait_until_ready() is None
+
+    wait.assert_not_called()
+
+
+def test_SSHConsole_ssh_command_runs_remote_command_with_password():
+    console = SSHConsole(target='localhost',
+                         system=SystemContext(credentials=Credentials('root', 'pass')))
+    command = console.ssh_command('uname -a')
+
+    assert command[:4] == ['sshpass', '-p', 'pass', 'ssh']
+    assert command[-2:] == ['root@localhost', 'uname -a']
+    assert f'ControlPath={console.control_master.control_path}' in command
+
+
+def test_SSHConsole_copy_to_target_reuses_control_master(minimal_ssh_console):
+    with patch('subprocess.check_output') as check_output, \
+            patch.object(SSHControlMaster, 'start') as start:
+        minimal_ssh_console.copy_to_target('local.txt', '/tmp/remote.txt')
+
+    start.assert_called_once()
+    command = check_output.call_args[0][0]
+    assert command[0] == 'scp'
+    assert command[-2:] == ['local.txt', 'root@localhost:/tmp/remote.txt']
+    assert f'ControlPath={minimal_ssh_console.control_master.control_path}' in command
+
+
+def test_SSHConsole_deploy_files_sends_files_and_manifest(local_ssh_console, deploy_sources,
+                                                          tmp_path):
+    destination = tmp_path / 'destination'
+
+    result = local_ssh_console.deploy_files(deploy_sources, str(destination))
+
+    assert result.deployed == deploy_sources
+    assert result.skipped == []
+    assert (destination / 'one.txt').read_bytes() == b'one.txt' * 100
+    assert (destination / 'two.bin').read_bytes() == b'two.bin' * 100
+    manifest = json.loads((destination / '.pluma-manifest').read_text())
+    assert manifest['one.txt']['size'] == 700
+
+
+def test_SSHConsole_deploy_files_skips_unchanged_files(local_ssh_console, deploy_sources,
+                                                       tmp_path):
+    destination = str(tmp_path / 'destination')
+    local_ssh_console.deploy_files(deploy_sources, destination)
+
+    with open(deploy_sources[1], 'ab') as f:
+        f.write(b'changed')
+    result = local_ssh_console.deploy_files(deploy_sources, destination)
+
+    assert result.deployed == [deploy_sources[1]]
+    assert result.skipped == [deploy_sources[0]]
+    assert (tmp_path / 'destination' / 'two.bin').read_bytes().endswith(b'changed')
+
+
+def test_SSHConsole_deploy_files_fails_if_not_extracted(local_ssh_console, deploy_sources,
+                                                        tmp_path):
+    (tmp_path / 'file').write_text('not a directory')
+
+    with pytest.raises(ConsoleFileTransferError):
+        local_ssh_console.deploy_files(deploy_sources, str(tmp_path / 'file' / 'destination'))
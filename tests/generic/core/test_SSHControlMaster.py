@@ -0,0 +1,70 @@
+import atexit
+import subprocess
+from unittest.mock import patch
+
+import pytest
+
+from pluma import SSHControlMaster
+
+
+@pytest.fixture
+def control_master():
+    master = SSHControlMaster('root@target', options=['-o', 'StrictHostKeyChecking=no'],
+                              password='pass', idle_timeout=60)
+    yield master
+    atexit.unregister(master.stop)
+
+
+def completed(returncode):
+    return subprocess.CompletedProcess(args=[], returncode=returncode)
+
+
+def test_SSHControlMaster_client_options_use_control_path(control_master):
+    assert control_master.client_options == [
+        '-o', 'ControlMaster=no', '-o', f'ControlPath={control_master.control_path}']
+    assert '%C' in control_master.control_path
+
+
+def test_SSHControlMaster_start_runs_master_in_background(control_master):
+    with patch('subprocess.run', side_effect=[completed(255), completed(0)]) as run:
+        assert control_master.start() is True
+
+    check_command = run.call_args_list[0][0][0]
+    assert check_command[:3] == ['ssh', '-O', 'check']
+
+    master_command = run.call_args_list[1][0][0]
+    assert master_command[:6] == ['sshpass', '-p', 'pass', 'ssh', '-f', '-N']
+    assert 'ControlMaster=yes' in master_command
+    assert f'ControlPath={control_master.control_path}' in master_command
+    assert 'ControlPersist=60' in master_command
+    assert 'StrictHostKeyChecking=no' in master_command
+    assert master_command[-1] == 'root@target'
+
+
+def test_SSHControlMaster_start_does_nothing_if_running(control_master):
+    with patch('subprocess.run', return_value=completed(0)) as run:
+        assert control_master.start() is True
+
+    run.assert_called_once()
+
+
+def test_SSHControlMaster_start_returns_false_on_failure(control_master):
+    with patch('subprocess.run', return_value=completed(255)):
+        assert control_master.start() is False
+
+
+def test_SSHControlMaster_start_returns_false_if_ssh_missing(control_master):
+    with patch('subprocess.run', side_effect=[completed(255), FileNotFoundError('sshpass')]):
+        assert control_master.start() is False
+
+
+def test_SSHControlMaster_stop_exits_master(control_master):
+    with patch('subprocess.run', side_effect=[completed(255), completed(0)]):
+        control_master.start()
+
+    with patch('subprocess.run', return_value=completed(0)) as run:
+        control_master.stop()
+        control_master.stop()
+
+    run.assert_called_once()
+    assert run.call_args[0][0][:3] == ['ssh', '-O', 'exit']
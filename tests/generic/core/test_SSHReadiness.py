@@ -0,0 +1,66 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from pluma.core.sshreadiness import probe_ssh_server, wait_for_ssh_server
+
+
+@pytest.fixture
+def server_socket():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    yield sock
+    sock.close()
+
+
+def serve_banner(sock: socket.socket, banner: bytes, delay: float = 0):
+    '''Start listening after "delay", and send "banner" to the first client'''
+    if not delay:
+        sock.listen(1)
+
+    def serve():
+        if delay:
+            time.sleep(delay)
+            sock.listen(1)
+
+        client, __ = sock.accept()
+        with client:
+            client.sendall(banner)
+            time.sleep(1)
+
+    threading.Thread(target=serve, daemon=True).start()
+
+
+def test_probe_ssh_server_detects_banner(server_socket):
+    serve_banner(server_socket, b'SSH-2.0-test\r\n')
+    assert probe_ssh_server('127.0.0.1', server_socket.getsockname()[1]) is True
+
+
+def test_probe_ssh_server_rejects_other_server(server_socket):
+    serve_banner(server_socket, b'HTTP/1.1 400\r\n')
+    assert probe_ssh_server('127.0.0.1', server_socket.getsockname()[1]) is False
+
+
+def test_probe_ssh_server_times_out_without_banner(server_socket):
+    server_socket.listen(1)
+    start = time.monotonic()
+    assert probe_ssh_server('127.0.0.1', server_socket.getsockname()[1],
+                            timeout=0.2) is False
+    assert time.monotonic() - start < 1
+
+
+def test_wait_for_ssh_server_waits_for_server_to_start(server_socket):
+    serve_banner(server_socket, b'SSH-2.0-test\r\n', delay=0.3)
+    ready_time = wait_for_ssh_server('127.0.0.1', server_socket.getsockname()[1], timeout=5)
+    assert ready_time is not None
+    assert 0.3 <= ready_time < 5
+
+
+def test_wait_for_ssh_server_returns_none_on_timeout(server_socket):
+    # Bound but not listening, connections are refused
+    start = time.monotonic()
+    assert wait_for_ssh_server('127.0.0.1', server_socket.getsockname()[1],
+                               timeout=0.5) is None
+    assert time.monotonic() - start < 2
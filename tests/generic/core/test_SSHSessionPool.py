@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+from unittest.mock import MagicMock
+
+from pluma import SSHConsole, SSHSessionPool
+from pluma.core.baseclasses import ConsoleError
+
+
+@pytest.fixture
+def ssh_console():
+    console = MagicMock(SSHConsole)
+    console.target = 'target'
+    console.new_session.side_effect = lambda: MagicMock(SSHConsole)
+    return console
+
+
+def test_SSHSessionPool_should_error_on_invalid_size(ssh_console):
+    with pytest.raises(ValueError):
+        SSHSessionPool(ssh_console, size=0)
+
+
+def test_SSHSessionPool_checkout_opens_and_reuses_sessions(ssh_console):
+    pool = SSHSessionPool(ssh_console, size=2)
+
+    with pool.checkout() as first:
+        first.require_open.assert_called_once()
+    with pool.checkout() as second:
+        pass
+
+    assert first is second
+    ssh_console.new_session.assert_called_once()
+
+
+def test_SSHSessionPool_checkout_limits_concurrent_sessions(ssh_console):
+    pool = SSHSessionPool(ssh_console, size=2)
+    sessions_in_use = []
+    max_in_use = []
+
+    def use_session():
+        with pool.checkout() as session:
+            sessions_in_use.append(session)
+            max_in_use.append(len(sessions_in_use))
+            time.sleep(0.1)
+            sessions_in_use.remove(session)
+
+    threads = [threading.Thread(target=use_session) for __ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max(max_in_use) == 2
+    assert ssh_console.new_session.call_count == 2
+
+
+def test_SSHSessionPool_checkout_should_error_on_timeout(ssh_console):
+    pool = SSHSessionPool(ssh_console, size=1)
+
+    with pool.checkout():
+        with pytest.raises(ConsoleError):
+            with pool.checkout(timeout=0.1):
+                pass
+
+
+def test_SSHSessionPool_should_not_reuse_closed_session(ssh_console):
+    pool = SSHSessionPool(ssh_console, size=1)
+
+    with pool.checkout() as first:
+        first.is_open = False
+    with pool.checkout() as second:
+        pass
+
+    assert first is not second
+
+
+def test_SSHSessionPool_close_closes_all_sessions(ssh_console):
+    pool = SSHSessionPool(ssh_console, size=2)
+    with pool.checkout() as first, pool.checkout() as second:
+        pass
+
+    pool.close()
+
+    first.close.assert_called_once()
+    second.close.assert_called_once()
@@ -2,6 +2,7 @@ import os
 import pytest
 import tempfile
 import time
+from unittest.mock import patch
 from pluma.core.exceptions import ConsoleLoginFailedError
 from pluma.core import SerialConsole
 
@@ -332,3 +333,54 @@ def test_SerialConsole_raw_log_file(pty_pair):
         console.close()
 
         assert tmpfile.read() == received.encode(console.engine.encoding)
+
+
+def test_SerialConsole_supports_file_copy(serial_console_proxy):
+    assert serial_console_proxy.console.support_file_copy
+
+
+def test_SerialConsole_sends_end_marker_only_once_shell_conditioned():
+    console = SerialConsole(port='/dev/null', baud=115200)
+    assert not console.sends_end_marker
+
+    console.prompt_token = 'PLUMA-id$ '
+    assert console.sends_end_marker
+
+    console.runs_in_shell = False
+    assert not console.sends_end_marker
+
+
+def test_SerialConsole_tune_send_rate_finds_fastest_safe_rate():
+    console = SerialConsole(port='/dev/null', baud=115200)
+    safe_rate = 3000
+
+    with patch.object(SerialConsole, '_probe_send_rate',
+                      side_effect=lambda rate, probe_size, timeout: rate <= safe_rate):
+        rate = console.tune_send_rate(refine_steps=4)
+
+    assert rate == console.send_rate
+    assert safe_rate * 0.9 < rate <= safe_rate
+
+
+def test_SerialConsole_tune_send_rate_keeps_lowest_rate_probed_if_none_is_safe():
+    console = SerialConsole(port='/dev/null', baud=115200)
+    rates_probed = []
+
+    def probe(rate, probe_size, timeout):
+        rates_probed.append(rate)
+        return False
+
+    with patch.object(SerialConsole, '_probe_send_rate', side_effect=probe):
+        rate = console.tune_send_rate()
+
+    assert rate == console.send_rate == min(rates_probed)
+    assert console._send_rate_tuned is False
+
+
+def test_SerialConsole_tune_send_rate_sets_no_limit_if_line_rate_is_safe():
+    console = SerialConsole(port='/dev/null', baud=115200)
+
+    with patch.object(SerialConsole, '_probe_send_rate', return_value=True):
+        assert console.tune_send_rate() is None
+
+    assert console.send_rate is None
@@ -0,0 +1,102 @@
+import os
+import subprocess
+
+import pytest
+
+from pluma import FileTransferSettings, HostConsole, ShellFileTransfer
+from pluma.core.baseclasses import ConsoleFileTransferError
+from pluma.core.shellfiletransfer import posix_cksum
+
+pytestmark = pytest.mark.xfail(os.getenv('PLUMA_ENV') == 'CI',
+                               reason='CI fails to properly spawn a shell')
+
+
+@pytest.fixture
+def shell_console():
+    console = HostConsole('/bin/sh')
+    console.open()
+    yield console
+    console.close()
+
+
+@pytest.fixture
+def source_file(tmp_path) -> str:
+    path = tmp_path / 'source.bin'
+    path.write_bytes(os.urandom(5000))
+    path.chmod(0o750)
+    return str(path)
+
+
+def read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('data', [b'', b'a', bytes(range(256)) * 4],
+                         ids=['empty', 'byte', 'all_bytes'])
+def test_ShellFileTransfer_posix_cksum_matches_cksum_command(data):
+    output = subprocess.run(['cksum'], input=data, stdout=subprocess.PIPE, check=True).stdout
+    assert output.split()[:2] == [str(posix_cksum(data)).encode(), str(len(data)).encode()]
+
+
+@pytest.mark.parametrize('encoding', ['base64', 'printf'])
+def test_ShellFileTransfer_copies_file(shell_console, source_file, tmp_path, encoding):
+    destination = str(tmp_path / 'destination.bin')
+    transfer = ShellFileTransfer(shell_console, FileTransferSettings(chunk_size=512,
+                                                                     encoding=encoding))
+    stats = transfer.copy_to_target(source_file, destination, timeout=5)
+
+    assert read_file(destination) == read_file(source_file)
+    assert os.stat(destination).st_mode & 0o777 == 0o750
+    assert (stats.size, stats.chunks, stats.retransmissions) == (5000, 10, 0)
+    assert stats.bytes_sent > stats.size
+    assert stats.throughput > 0
+
+
+def test_ShellFileTransfer_copies_into_directory(shell_console, source_file, tmp_path):
+    destination = tmp_path / 'folder'
+    destination.mkdir()
+
+    ShellFileTransfer(shell_console).copy_to_target(source_file, str(destination), timeout=5)
+
+    assert read_file(str(destination / 'source.bin')) == read_file(source_file)
+
+
+def test_ShellFileTransfer_retransmits_corrupted_chunk(shell_console, source_file, tmp_path):
+    transfer = ShellFileTransfer(shell_console, FileTransferSettings(chunk_size=512))
+    chunk_command = transfer._chunk_command
+    corrupted = []
+
+    def corrupt_chunk_3_once(transfer_id, index, sequence, chunk):
+        if index == 3 and not corrupted:
+            corrupted.append(sequence)
+            chunk = b'x' + chunk[1:]
+        return chunk_command(transfer_id, index, sequence, chunk)
+
+    transfer._chunk_command = corrupt_chunk_3_once
+    destination = str(tmp_path / 'destination.bin')
+    stats = transfer.copy_to_target(source_file, destination, timeout=5)
+
+    assert corrupted
+    assert stats.retransmissions == 1
+    assert read_file(destination) == read_file(source_file)
+
+
+def test_ShellFileTransfer_window_limited_by_tty_buffer(shell_console):
+    transfer = ShellFileTransfer(shell_console, FileTransferSettings(
+        chunk_size=512, window=8, tty_buffer_size=2048))
+    assert transfer._window('transfer') == 2
+
+
+def test_ShellFileTransfer_error_if_chunk_does_not_fit_tty_buffer(shell_console,
+                                                                  source_file, tmp_path):
+    transfer = ShellFileTransfer(shell_console, FileTransferSettings(chunk_size=4096))
+
+    with pytest.raises(ConsoleFileTransferError):
+        transfer.copy_to_target(source_file, str(tmp_path / 'destination'), timeout=5)
+
+
+def test_ShellFileTransfer_error_if_destination_not_writable(shell_console, source_file):
+    with pytest.raises(ConsoleFileTransferError):
+        ShellFileTransfer(shell_console).copy_to_target(
+            source_file, '/non/existent/folder/file', timeout=5)
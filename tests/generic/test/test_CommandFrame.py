@@ -0,0 +1,89 @@
+import threading
+import tty
+
+import pytest
+
+from pluma.core.baseclasses import PexpectEngine
+from pluma.test import CommandFrame, OutputStream
+
+
+@pytest.fixture
+def pty_console(basic_console_class, pty_pair_raw):
+    console = basic_console_class(engine=PexpectEngine(encoding='utf-8'))
+    console.engine.open(console_fd=pty_pair_raw.main.fd)
+    yield console
+    console.engine.close()
+
+
+def frame_output(frame: CommandFrame, retcode: int, output: bytes, error: bytes = b'') -> bytes:
+    '''Return what the shell prints for the framed command'''
+    tag = f'PLUMA-{frame.frame_id}'.encode()
+    data = tag + b'\n' + output + b'\n' + tag + b'-end %d\n' % retcode
+    if frame.separate_stderr:
+        data += error + b'\n' + tag + b'-err\n'
+
+    return data
+
+
+def test_CommandFrame_shell_command_does_not_contain_header():
+    frame = CommandFrame('echo abc')
+
+    assert 'echo abc' in frame.shell_command
+    assert f'PLUMA-{frame.frame_id}' not in frame.shell_command
+
+
+def test_CommandFrame_shell_command_puts_command_on_its_own_line():
+    frame = CommandFrame('sleep 1 & # note')
+
+    assert frame.shell_lines[1] == 'sleep 1 & # note'
+    assert len(frame.shell_lines) == 3
+
+
+def test_CommandFrame_reads_exact_output(pty_console, pty_pair_raw):
+    tty.setraw(pty_pair_raw.secondary.fd)
+    frame = CommandFrame('cmd')
+    pty_pair_raw.secondary.write(b'$ echoed PLUMA command\n'
+                                 + frame_output(frame, 3, b'a\nPLUMA-\n\r\nb'))
+
+    result = frame.read(pty_console, timeout=0.5)
+
+    assert (result.command, result.output, result.retcode) == ('cmd', 'a\nPLUMA-\n\r\nb', 3)
+    assert result.stderr is None
+    assert frame.unframed_output == '$ echoed PLUMA command\n'
+
+
+def test_CommandFrame_reads_output_with_translated_newlines(pty_console, pty_pair_raw):
+    frame = CommandFrame('cmd', separate_stderr=True)
+    pty_pair_raw.secondary.write(frame_output(frame, 0, 'é\r\n\n'.encode(), b'err\n') + b'$ ')
+
+    result = frame.read(pty_console, timeout=0.5)
+
+    assert (result.output, result.stderr) == ('é\r\n\n', 'err\n')
+    assert pty_console.read_all() == '$ '
+
+
+def test_CommandFrame_returns_none_if_output_incomplete(pty_console, pty_pair_raw):
+    frame = CommandFrame('cmd')
+    pty_pair_raw.secondary.write(frame_output(frame, 0, b'abcdef')[:-20])
+
+    assert frame.read(pty_console, timeout=0.1) is None
+
+
+def test_CommandFrame_streams_output_in_parts(pty_console, pty_pair_raw):
+    frame = CommandFrame('cmd')
+    output = b''.join(b'line %d\n' % i for i in range(20000))
+    stream = OutputStream(excerpt_size=8, match_regex=['^line 19999$'])
+
+    data = frame_output(frame, 0, output)
+    # Written from a thread, as more than the terminal buffer is sent
+    writer = threading.Thread(target=pty_pair_raw.secondary.write, args=(data,))
+    writer.start()
+    result = frame.read(pty_console, timeout=2, output_stream=stream)
+    writer.join()
+    stream.close()
+
+    assert stream.size == len(output)
+    assert stream.matched_all
+    assert result.output == stream.excerpt
+    assert result.output.startswith('line 0\nl')
+    assert pty_console.engine.reception_buffer_size == 0
@@ -1,11 +1,14 @@
+import os
 import pytest
+import shutil
 import tempfile
 from pathlib import Path
 
 from pytest import fixture
 from unittest.mock import MagicMock, patch
 
-from pluma.test import ExecutableTest
+from pluma import HostConsole
+from pluma.test import CommandResult, ExecutableTest, TaskFailed
 
 
 @fixture
@@ -99,14 +102,25 @@ def test_ExecutableTest_test_body_on_host_execute_file(executable_test,
     executable_test.run_on_host = True
     executable_test.host_file = True
 
-    with patch('pluma.test.CommandRunner.run') as run:
+    with patch('pluma.test.CommandRunner.run_on_host') as run_on_host:
+        run_on_host.return_value = CommandResult(command='', output='', retcode=0)
         executable_test.test_body()
 
-        run.assert_called_once()
-        run_kwargs = run.call_args[1]
+        run_on_host.assert_called_once()
+        run_kwargs = run_on_host.call_args[1]
         assert run_kwargs['command'] == executable_test.executable_file
 
 
+def test_ExecutableTest_test_body_on_host_fails_on_error_retcode(executable_test):
+    executable_test.run_on_host = True
+    executable_test.host_file = True
+
+    with patch('pluma.test.CommandRunner.run_on_host') as run_on_host:
+        run_on_host.return_value = CommandResult(command='', output='', retcode=3)
+        with pytest.raises(TaskFailed):
+            executable_test.test_body()
+
+
 def test_ExecutableTest_test_body_deploy_on_target(executable_test,
                                                    mock_console):
     executable_test.run_on_host = False
@@ -143,3 +157,70 @@ def test_ExecutableTest_test_body_on_target_execute_file(executable_test,
 
         run.assert_called_once()
         assert run.call_args[1]['command'] == executable_test.executable_file
+
+
+@fixture
+def cached_executable_test(mock_board, tmp_path):
+    executable = tmp_path / 'myapp'
+    executable.write_bytes(b'#!/bin/sh\necho running\n')
+    executable.chmod(0o755)
+    return ExecutableTest(mock_board, executable_file=str(executable),
+                          cache_directory=str(tmp_path / 'cache'), cache_max_entries=2)
+
+
+def test_ExecutableTest_should_error_with_invalid_cache_size(mock_board):
+    with pytest.raises(ValueError):
+        ExecutableTest(mock_board, executable_file='somename', host_file=False,
+                       cache_max_entries=0)
+
+
+def test_ExecutableTest_deploy_in_cache_reuses_cached_file(cached_executable_test,
+                                                           mock_console):
+    with patch('pluma.test.CommandRunner.run_framed') as run_framed, \
+            patch('pluma.test.CommandRunner.run') as run:
+        run_framed.return_value = CommandResult(command='', output='', retcode=0)
+        destination = cached_executable_test.deploy_file_in_cache(
+            file=cached_executable_test.executable_file, console=mock_console)
+
+    assert destination.startswith(cached_executable_test.cache_directory)
+    assert destination.endswith('/myapp')
+    run.assert_not_called()
+    mock_console.copy_to_target.assert_not_called()
+
+
+def test_ExecutableTest_deploy_in_cache_copies_missing_file(cached_executable_test,
+                                                            mock_console):
+    with patch('pluma.test.CommandRunner.run_framed') as run_framed, \
+            patch('pluma.test.CommandRunner.run') as run:
+        run_framed.return_value = CommandResult(command='', output='', retcode=1)
+        destination = cached_executable_test.deploy_file_in_cache(
+            file=cached_executable_test.executable_file, console=mock_console)
+
+    assert 'tail -n +3' in run.call_args[1]['command']
+    mock_console.copy_to_target.assert_called_once_with(
+        source=cached_executable_test.executable_file, destination=destination)
+
+
+@pytest.mark.xfail(os.getenv('PLUMA_ENV') == 'CI', reason='CI fails to properly spawn a shell')
+def test_ExecutableTest_cache_deploys_once_and_evicts_least_recently_used(
+        cached_executable_test, mock_board, tmp_path):
+    console = HostConsole('/bin/sh')
+    console.copy_to_target = MagicMock(
+        side_effect=lambda source, destination: shutil.copy(source, destination))
+    mock_board.console = console
+    cache = tmp_path / 'cache'
+
+    with patch.object(HostConsole, 'support_file_copy', True):
+        cached_executable_test.test_body()
+        cached_executable_test.test_body()
+        assert console.copy_to_target.call_count == 1
+        first_entry = os.listdir(cache)
+
+        for content in [b'#!/bin/sh\necho v2\n', b'#!/bin/sh\necho v3\n']:
+            with open(cached_executable_test.executable_file, 'wb') as f:
+                f.write(content)
+            cached_executable_test.test_body()
+
+    assert console.copy_to_target.call_count == 3
+    assert len(os.listdir(cache)) == 2
+    assert first_entry[0] not in os.listdir(cache)
@@ -0,0 +1,43 @@
+from pluma.test import OutputStream
+
+
+def test_OutputStream_excerpt_returns_short_output_in_full():
+    stream = OutputStream(excerpt_size=10)
+    for chunk in ['abcdef', 'ghijk', 'lmno']:
+        stream.write(chunk)
+
+    assert stream.size == 15
+    assert stream.excerpt == 'abcdefghijklmno'
+
+
+def test_OutputStream_excerpt_keeps_head_and_tail_only():
+    stream = OutputStream(excerpt_size=4)
+    for i in range(1000):
+        stream.write(f'{i:04}')
+
+    assert stream.size == 4000
+    assert stream.excerpt == '0000\n[... 3992 characters not shown ...]\n0999'
+
+
+def test_OutputStream_matches_patterns_split_across_chunks():
+    stream = OutputStream(match_regex=['^ready$', 'done'], error_regex=['error', 'panic'])
+    for chunk in ['boot\nrea', 'dy\nno err', 'or\nstill do', 'ne']:
+        stream.write(chunk)
+
+    assert stream.unmatched_regex == ['done']
+    stream.close()
+
+    assert stream.matched_all
+    assert stream.matched_error_regex == ['error']
+
+
+def test_OutputStream_writes_to_file_and_callback(tmp_path):
+    path = tmp_path / 'output.log'
+    chunks = []
+    with OutputStream(path=str(path), callback=chunks.append) as stream:
+        stream.write('abc\n')
+    with OutputStream(path=str(path), append=True) as stream:
+        stream.write('def\n')
+
+    assert path.read_text() == 'abc\ndef\n'
+    assert chunks == ['abc\n']
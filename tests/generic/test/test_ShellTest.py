@@ -0,0 +1,133 @@
+import os
+import shutil
+import pytest
+from unittest.mock import patch
+
+from pluma import HostConsole
+from pluma.test import CommandRunner, ShellTest, TaskFailed
+
+
+@pytest.mark.xfail(os.getenv('PLUMA_ENV') == 'CI', reason='CI fails to properly spawn a shell')
+def test_ShellTest_batch_returns_all_outputs(mock_board):
+    test = ShellTest(mock_board, script=['echo abc', 'echo def'], run_on_host=True,
+                     batch=True, should_not_match_regex=['error'])
+
+    assert test.run_commands() == 'abcdef'
+
+
+@pytest.mark.xfail(os.getenv('PLUMA_ENV') == 'CI', reason='CI fails to properly spawn a shell')
+def test_ShellTest_batch_should_fail_on_error_retcode(mock_board):
+    test = ShellTest(mock_board, script=['echo abc', 'false'], run_on_host=True, batch=True)
+
+    with pytest.raises(TaskFailed):
+        test.run_commands()
+
+
+def test_ShellTest_batch_should_error_if_not_in_shell(mock_board):
+    with pytest.raises(ValueError):
+        ShellTest(mock_board, script='echo abc', batch=True, runs_in_shell=False)
+
+
+@pytest.mark.xfail(os.getenv('PLUMA_ENV') == 'CI', reason='CI fails to properly spawn a shell')
+def test_ShellTest_on_host_shares_shell_session(mock_board):
+    test = ShellTest(mock_board, script=['cd /', 'pluma_a=$((1+1))', 'echo "$PWD-$pluma_a"'],
+                     run_on_host=True)
+
+    assert test.run_commands() == '/-2'
+
+
+def test_ShellTest_subprocess_on_host_should_error_if_not_on_host(mock_board):
+    with pytest.raises(ValueError):
+        ShellTest(mock_board, script='echo abc', subprocess_on_host=True)
+
+
+def test_ShellTest_subprocess_on_host_runs_without_console(mock_board):
+    test = ShellTest(mock_board, script=['echo abc', 'echo def'], run_on_host=True,
+                     subprocess_on_host=True, should_match_regex=['^[a-f]{3}$'])
+
+    with patch('pluma.test.shelltest.CommandRunner.run') as run:
+        assert test.run_commands() == 'abcdef'
+
+    run.assert_not_called()
+
+
+def test_ShellTest_subprocess_on_host_should_stop_on_error_retcode(mock_board):
+    test = ShellTest(mock_board, script=['false', 'echo never'], run_on_host=True,
+                     subprocess_on_host=True)
+
+    with patch('pluma.test.shelltest.CommandRunner.run_on_host',
+               wraps=CommandRunner.run_on_host) as run_on_host:
+        with pytest.raises(TaskFailed):
+            test.run_commands()
+
+    run_on_host.assert_called_once()
+
+
+@pytest.fixture
+def shell_board(mock_board):
+    mock_board.console = HostConsole('/bin/sh')
+    mock_board.console.runs_in_shell = True
+    yield mock_board
+    mock_board.console.close()
+
+
+@pytest.mark.xfail(os.getenv('PLUMA_ENV') == 'CI', reason='CI fails to properly spawn a shell')
+def test_ShellTest_upload_runs_script_as_a_single_file(shell_board):
+    test = ShellTest(shell_board, script=['pluma_a=$((1+1))', 'echo "value-$pluma_a"'],
+                     upload=True, should_match_regex=['^value-2$'])
+
+    with patch('pluma.test.shelltest.CommandRunner.run_framed',
+               wraps=CommandRunner.run_framed) as run_framed:
+        assert test.run_commands() == 'value-2'
+
+    # The heredoc checksum, then the script
+    assert run_framed.call_count == 2
+    assert run_framed.call_args.kwargs['command'].startswith('sh /tmp/pluma-script-')
+
+
+@pytest.mark.xfail(os.getenv('PLUMA_ENV') == 'CI', reason='CI fails to properly spawn a shell')
+def test_ShellTest_upload_should_stop_on_error(shell_board):
+    test = ShellTest(shell_board, script=['false', 'echo never'], upload=True,
+                     should_not_match_regex=['never'])
+
+    with pytest.raises(TaskFailed):
+        test.run_commands()
+
+
+@pytest.mark.xfail(os.getenv('PLUMA_ENV') == 'CI', reason='CI fails to properly spawn a shell')
+def test_ShellTest_upload_copies_script_if_supported(shell_board):
+    test = ShellTest(shell_board, script='echo "copied-$((1+1))"', upload=True)
+
+    with patch.object(HostConsole, 'support_file_copy', True), \
+            patch.object(HostConsole, 'copy_to_target', autospec=True,
+                         side_effect=lambda self, source, destination, timeout:
+                         shutil.copy(source, destination)) as copy_to_target:
+        assert test.run_commands() == 'copied-2'
+
+    copy_to_target.assert_called_once()
+
+
+def test_ShellTest_upload_should_error_with_batch(mock_board):
+    with pytest.raises(ValueError):
+        ShellTest(mock_board, script='echo abc', upload=True, batch=True)
+
+
+def test_ShellTest_stream_output_writes_output_file(mock_board, tmp_path):
+    output_file = tmp_path / 'output.log'
+    test = ShellTest(mock_board, script=['seq 1 50000', 'echo 50000'], run_on_host=True,
+                     subprocess_on_host=True, output_file=str(output_file),
+                     should_match_regex=['^50000$'])
+
+    output = test.run_commands()
+
+    assert output_file.read_text() == ''.join(f'{i}\n' for i in range(1, 50001)) + '50000\n'
+    assert len(output) < 10000
+
+
+def test_ShellTest_stream_output_should_fail_on_error_pattern(mock_board):
+    test = ShellTest(mock_board, script='seq 1 50000', run_on_host=True,
+                     subprocess_on_host=True, stream_output=True,
+                     should_not_match_regex=['^1234$'])
+
+    with pytest.raises(TaskFailed):
+        test.run_commands()
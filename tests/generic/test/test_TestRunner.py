@@ -1,6 +1,10 @@
+import time
+
 from pluma.test.testgroup import GroupedTest
 from pluma.test.testbase import NoopTest
-from unittest.mock import Mock, patch
+from unittest.mock import MagicMock, Mock, patch
+from pluma import Board, ConsoleWatcher, SSHSessionPool
+from pluma.core.baseclasses import ConsoleBase
 from pluma.test import TestRunner, TestBase
 from utils import PlumaOutputMatcher
 
@@ -492,9 +496,60 @@ def test_TestRunner_should_have_expected_data_on_test_body_failure(mock_board):
     assert PlumaOutputMatcher('test_TestRunner.MyTest', expected_data) == runner.data
 
 
+def test_TestRunner_should_stop_watcher_after_run(mock_board):
+    mock_board.watcher = MagicMock(ConsoleWatcher)
+    test = NoopTest(mock_board)
+    test.test_body = Mock(side_effect=Exception('failed'))
+
+    TestRunner(board=mock_board, tests=test).run()
+
+    mock_board.watcher.start.assert_called_once()
+    mock_board.watcher.stop.assert_called_once()
+
+
 def test_TestRunner_board_should_be_optional():
     runner = TestRunner(
         tests=NoopTest()
     )
 
     runner.run()
+
+
+class SessionTest(NoopTest):
+    parallel_safe = True
+
+    def __init__(self, board, consoles_seen):
+        super().__init__(board)
+        self.consoles_seen = consoles_seen
+
+    def test_body(self):
+        time.sleep(0.3)
+        self.consoles_seen.append(self.board.console)
+
+
+def test_TestRunner_should_run_parallel_safe_tests_concurrently():
+    sessions = [MagicMock(ConsoleBase) for __ in range(3)]
+    session_pool = SSHSessionPool(MagicMock(new_session=Mock(side_effect=sessions)), size=3)
+    board = Board('board', console=MagicMock(ConsoleBase), session_pool=session_pool)
+    consoles_seen = []
+    tests = [SessionTest(board, consoles_seen) for __ in range(3)]
+
+    start = time.time()
+    assert TestRunner(board=board, tests=tests).run()
+
+    assert time.time() - start < 0.8
+    assert sorted(map(id, consoles_seen)) == sorted(map(id, sessions))
+    for session in sessions:
+        session.close.assert_called_once()
+
+
+def test_TestRunner_should_run_tests_sequentially_without_session_pool(mock_board):
+    mock_board.session_pool = None
+    consoles_seen = []
+    tests = [SessionTest(mock_board, consoles_seen) for __ in range(2)]
+
+    start = time.time()
+    assert TestRunner(board=mock_board, tests=tests).run()
+
+    assert time.time() - start >= 0.6
+    assert consoles_seen == [mock_board.console, mock_board.console]